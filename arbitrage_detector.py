@@ -5,13 +5,60 @@ This module generates realistic fake triangular arbitrage opportunities
 for testing and demonstration purposes.
 """
 
+import asyncio
+import heapq
 import random
 import numpy as np
-from typing import List, Dict
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+from dataclasses import dataclass
 from arbitrage_optimizer import (
     ArbitrageOpportunity,
+    OpportunityBatch,
+    calculate_cycle_profits,
     calculate_triangular_arbitrage_profit,
+    calculate_triangular_arbitrage_profit_batch,
 )
+from currency_registry import CurrencyRegistry, DEFAULT_REGISTRY
+
+
+@dataclass
+class MarketSnapshot:
+    """Dense view of a currency universe at one point in time"""
+
+    currencies: List[str]
+    rates: np.ndarray  # rates[a, b]: units of currency b received per unit of a
+    fees: np.ndarray  # fees[a, b]: fee fraction charged when converting a -> b
+    liquidity: np.ndarray  # liquidity[a, b]: available depth for a -> b (USD)
+
+
+def _snapshot_triangle_batch(
+    snapshot: MarketSnapshot,
+    triangles: np.ndarray,
+    profits: np.ndarray,
+    confidence_score: float,
+    registry: Optional[CurrencyRegistry] = None,
+) -> OpportunityBatch:
+    """Build the batch for triangles a -> b -> c -> a of a snapshot"""
+    registry = registry if registry is not None else DEFAULT_REGISTRY
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    legs = ((a, b), (b, c), (c, a))
+
+    # Closing leg is quoted as quote/base, i.e. the inverse of c -> a
+    exchange_rates = np.column_stack([snapshot.rates[u, v] for u, v in legs])
+    exchange_rates[:, 2] = 1.0 / exchange_rates[:, 2]
+
+    # Snapshot indices -> registry ids
+    currency_ids = registry.register_many(snapshot.currencies)
+
+    return OpportunityBatch(
+        registry=registry,
+        triangles=currency_ids[triangles],
+        exchange_rates=exchange_rates,
+        liquidity=np.column_stack([snapshot.liquidity[u, v] for u, v in legs]),
+        transaction_fees=np.column_stack([snapshot.fees[u, v] for u, v in legs]),
+        expected_profit=profits,
+        confidence_score=np.full(len(profits), confidence_score),
+    )
 
 
 class FakeArbitrageAnalyzer:
@@ -19,17 +66,20 @@ class FakeArbitrageAnalyzer:
     Simulates an external arbitrage analyzer that provides triangular arbitrage opportunities
     """
 
-    def __init__(self, seed: int = None):
+    def __init__(self, seed: int = None, registry: CurrencyRegistry = None):
         """
         Initialize the fake analyzer
 
         Args:
             seed: Random seed for reproducible results (None for random seed)
+            registry: Currency/pair registry (shared default registry if None)
         """
         if seed is not None:
             random.seed(seed)
             np.random.seed(seed)
 
+        self.registry = registry if registry is not None else DEFAULT_REGISTRY
+
         # Common crypto trading pairs
         self.currencies = ["BTC", "ETH", "USDT", "ADA", "DOT", "LINK", "XRP", "LTC"]
         self.stable_coins = ["USDT", "USDC", "DAI"]
@@ -48,6 +98,82 @@ class FakeArbitrageAnalyzer:
             "DOT/BTC": 0.00056 + random.uniform(-0.0001, 0.0001),
         }
 
+        # Market capitalisations used to derive synthetic rates (simplified)
+        self.market_caps = {
+            "BTC": 800_000_000_000,
+            "ETH": 360_000_000_000,
+            "USDT": 80_000_000_000,
+            "ADA": 35_000_000_000,
+            "DOT": 30_000_000_000,
+            "LINK": 15_000_000_000,
+            "XRP": 40_000_000_000,
+            "LTC": 12_000_000_000,
+        }
+
+        # Order book depth ranges per currency (in USD equivalent)
+        self.liquidity_ranges = {
+            "BTC": (1_000_000, 10_000_000),  # $1M-$10M
+            "ETH": (500_000, 5_000_000),  # $500K-$5M
+            "USDT": (2_000_000, 20_000_000),  # $2M-$20M
+            "ADA": (100_000, 1_000_000),  # $100K-$1M
+            "DOT": (150_000, 1_500_000),  # $150K-$1.5M
+            "LINK": (100_000, 1_000_000),  # $100K-$1M
+            "XRP": (200_000, 2_000_000),  # $200K-$2M
+            "LTC": (80_000, 800_000),  # $80K-$800K
+        }
+
+        self._build_triangle_tables()
+
+    def _build_triangle_tables(self):
+        """
+        Precompute lookup tables used by the vectorized opportunity generator
+
+        Every (base, intermediate, quote) triple the scalar generator can draw is
+        enumerated once, grouped by base currency, together with the anchor rate
+        of every ordered currency pair.
+        """
+        self.universe = list(dict.fromkeys(self.currencies + self.stable_coins))
+        self._universe_ids = self.registry.register_many(self.universe)
+        index = {currency: i for i, currency in enumerate(self.universe)}
+        size = len(self.universe)
+
+        # Anchor rate for "c1/c2" and whether it comes from the quoted base rates
+        self._pair_anchor = np.ones((size, size))
+        self._pair_quoted = np.zeros((size, size), dtype=bool)
+        for c1 in self.universe:
+            for c2 in self.universe:
+                pair = f"{c1}/{c2}"
+                if pair in self.base_rates:
+                    self._pair_anchor[index[c1], index[c2]] = self.base_rates[pair]
+                    self._pair_quoted[index[c1], index[c2]] = True
+                else:
+                    self._pair_anchor[index[c1], index[c2]] = self.market_caps.get(
+                        c1, 1_000_000_000
+                    ) / self.market_caps.get(c2, 1_000_000_000)
+
+        # Liquidity range of the currency quoted first in each pair
+        self._liquidity_low = np.full(size, 100_000.0)
+        self._liquidity_high = np.full(size, 100_000.0)
+        for currency, (low, high) in self.liquidity_ranges.items():
+            self._liquidity_low[index[currency]] = low
+            self._liquidity_high[index[currency]] = high
+
+        # All triangles, grouped by base currency
+        triangles = []
+        self._triangle_offsets = np.zeros(len(self.stable_coins), dtype=np.int64)
+        self._triangle_counts = np.zeros(len(self.stable_coins), dtype=np.int64)
+        for b, base in enumerate(self.stable_coins):
+            self._triangle_offsets[b] = len(triangles)
+            available_currencies = [c for c in self.currencies if c != base]
+            for intermediate in available_currencies:
+                for quote in available_currencies:
+                    if quote != intermediate:
+                        triangles.append(
+                            (index[base], index[intermediate], index[quote])
+                        )
+            self._triangle_counts[b] = len(triangles) - self._triangle_offsets[b]
+        self._triangles = np.array(triangles, dtype=np.int64)
+
     def generate_exchange_rates(
         self, base: str, intermediate: str, quote: str
     ) -> Dict[str, float]:
@@ -68,9 +194,7 @@ class FakeArbitrageAnalyzer:
         rate_variation = 0.002  # 0.2% variation
 
         # Direct rates
-        pair1 = f"{intermediate}/{base}"
-        pair2 = f"{quote}/{intermediate}"
-        pair3 = f"{quote}/{base}"
+        pair1, pair2, pair3 = self.registry.triangle_pairs(base, intermediate, quote)
 
         # Generate rates based on base rates with variations
         if pair1 in self.base_rates:
@@ -104,18 +228,7 @@ class FakeArbitrageAnalyzer:
     def _generate_synthetic_rate(self, currency1: str, currency2: str) -> float:
         """Generate a synthetic exchange rate between two currencies"""
         # Simple synthetic rate generation based on market caps (simplified)
-        market_caps = {
-            "BTC": 800_000_000_000,
-            "ETH": 360_000_000_000,
-            "USDT": 80_000_000_000,
-            "ADA": 35_000_000_000,
-            "DOT": 30_000_000_000,
-            "LINK": 15_000_000_000,
-            "XRP": 40_000_000_000,
-            "LTC": 12_000_000_000,
-        }
-
-        ratio = market_caps.get(currency1, 1_000_000_000) / market_caps.get(
+        ratio = self.market_caps.get(currency1, 1_000_000_000) / self.market_caps.get(
             currency2, 1_000_000_000
         )
         return ratio * random.uniform(0.8, 1.2)
@@ -131,19 +244,13 @@ class FakeArbitrageAnalyzer:
         """
         # Base liquidity amounts (in USD equivalent)
         base_liquidity = {
-            "BTC": random.uniform(1_000_000, 10_000_000),  # $1M-$10M
-            "ETH": random.uniform(500_000, 5_000_000),  # $500K-$5M
-            "USDT": random.uniform(2_000_000, 20_000_000),  # $2M-$20M
-            "ADA": random.uniform(100_000, 1_000_000),  # $100K-$1M
-            "DOT": random.uniform(150_000, 1_500_000),  # $150K-$1.5M
-            "LINK": random.uniform(100_000, 1_000_000),  # $100K-$1M
-            "XRP": random.uniform(200_000, 2_000_000),  # $200K-$2M
-            "LTC": random.uniform(80_000, 800_000),  # $80K-$800K
+            currency: random.uniform(low, high)
+            for currency, (low, high) in self.liquidity_ranges.items()
         }
 
         # Convert to base currency units
         liquidity = {}
-        pairs = [f"{intermediate}/{base}", f"{quote}/{intermediate}", f"{quote}/{base}"]
+        pairs = self.registry.triangle_pairs(base, intermediate, quote)
 
         for pair in pairs:
             currency = pair.split("/")[0]
@@ -179,20 +286,38 @@ class FakeArbitrageAnalyzer:
         return fees
 
     def generate_arbitrage_opportunities(
-        self, num_opportunities: int = 10
+        self,
+        num_opportunities: int = 10,
+        vectorized: bool = False,
+        top_k: Optional[int] = None,
     ) -> List[ArbitrageOpportunity]:
         """
         Generate a list of fake triangular arbitrage opportunities
 
         Args:
             num_opportunities: Number of opportunities to generate
+            vectorized: Draw all candidates with NumPy in one batch and only
+                build objects for the profitable ones (see
+                generate_opportunity_batch). The scalar path scores every
+                candidate as it is drawn, because the confidence of the
+                profitable ones is drawn in between; batching the scoring
+                would shift that random stream and change seeded results
+            top_k: Only keep the top_k opportunities by expected profit *
+                confidence. The vectorized path uses np.argpartition, the
+                scalar path a bounded heap, so the tail is never sorted.
 
         Returns:
             List of ArbitrageOpportunity objects
         """
+        if vectorized:
+            return self.generate_opportunity_batch(
+                num_opportunities, top_k=top_k
+            ).to_list()
+
         opportunities = []
+        heap = []  # (score, draw, opportunity) min-heap holding the top_k
 
-        for _ in range(num_opportunities):
+        for draw in range(num_opportunities):
             # Randomly select three currencies for triangular arbitrage
             base = random.choice(self.stable_coins)  # Usually start with stablecoin
             available_currencies = [c for c in self.currencies if c != base]
@@ -206,24 +331,32 @@ class FakeArbitrageAnalyzer:
             # Generate liquidity data
             liquidity = self.generate_liquidity_data(base, intermediate, quote)
 
+            # Cached pair keys: intermediate/base, quote/intermediate, quote/base
+            pair1, pair2, pair3 = self.registry.triangle_pairs(
+                base, intermediate, quote
+            )
+
             # Generate transaction fees
             transaction_fees = {
-                f"{intermediate}/{base}": random.uniform(0.0008, 0.002),  # 0.08%-0.2%
-                f"{quote}/{intermediate}": random.uniform(0.0008, 0.002),
-                f"{quote}/{base}": random.uniform(0.0008, 0.002),
+                pair1: random.uniform(0.0008, 0.002),  # 0.08%-0.2%
+                pair2: random.uniform(0.0008, 0.002),
+                pair3: random.uniform(0.0008, 0.002),
             }
 
             # Calculate expected profit
-            rate_ab = exchange_rates[f"{intermediate}/{base}"]
-            rate_bc = exchange_rates[f"{quote}/{intermediate}"]
-            rate_ca = 1.0 / exchange_rates[f"{quote}/{base}"]  # Inverse rate
+            rate_ab = exchange_rates[pair1]
+            rate_bc = exchange_rates[pair2]
+            rate_ca = 1.0 / exchange_rates[pair3]  # Inverse rate
 
             fees_tuple = (
-                transaction_fees[f"{intermediate}/{base}"],
-                transaction_fees[f"{quote}/{intermediate}"],
-                transaction_fees[f"{quote}/{base}"],
+                transaction_fees[pair1],
+                transaction_fees[pair2],
+                transaction_fees[pair3],
             )
 
+            # Scored here rather than in one batch: whether the candidate is
+            # profitable decides whether a confidence is drawn before the next
+            # candidate, so the seeded stream depends on it
             expected_profit = calculate_triangular_arbitrage_profit(
                 rate_ab, rate_bc, rate_ca, fees_tuple
             )
@@ -232,6 +365,12 @@ class FakeArbitrageAnalyzer:
             if expected_profit > 0:
                 # Generate confidence score based on market conditions
                 confidence_score = random.uniform(0.7, 0.95)
+                score = expected_profit * confidence_score
+
+                # Skip candidates that cannot enter a full top_k heap
+                if top_k is not None and len(heap) >= top_k:
+                    if not heap or score <= heap[0][0]:
+                        continue
 
                 opportunity = ArbitrageOpportunity(
                     base_currency=base,
@@ -244,7 +383,15 @@ class FakeArbitrageAnalyzer:
                     confidence_score=confidence_score,
                 )
 
-                opportunities.append(opportunity)
+                if top_k is None:
+                    opportunities.append(opportunity)
+                elif len(heap) < top_k:
+                    heapq.heappush(heap, (score, draw, opportunity))
+                else:
+                    heapq.heapreplace(heap, (score, draw, opportunity))
+
+        if top_k is not None:
+            opportunities = [opportunity for _, _, opportunity in heap]
 
         # Sort by expected profit (descending)
         opportunities.sort(
@@ -253,21 +400,242 @@ class FakeArbitrageAnalyzer:
 
         return opportunities
 
+    def generate_opportunity_batch(
+        self, num_opportunities: int = 10, top_k: Optional[int] = None
+    ) -> OpportunityBatch:
+        """
+        Generate triangular arbitrage candidates as NumPy arrays in one shot
+
+        Triangles, rates, liquidity, fees and confidence scores are drawn for all
+        candidates at once, profits are computed vectorized and unprofitable
+        candidates are dropped with a boolean mask. No ArbitrageOpportunity
+        objects are created.
+
+        Args:
+            num_opportunities: Number of candidates to draw
+            top_k: Only keep the top_k profitable candidates by expected
+                profit * confidence (selected with np.argpartition)
+
+        Returns:
+            OpportunityBatch of the profitable candidates, sorted by expected
+            profit * confidence (descending)
+        """
+        profitable = self._draw_opportunity_batch(num_opportunities)
+        if top_k is not None:
+            return profitable.top_k(top_k)
+        return profitable.sort_by_score()
+
+    def _draw_opportunity_batch(self, n: int) -> OpportunityBatch:
+        """Draw n candidates and keep the profitable ones, in draw order"""
+        # Base currency first, then a triangle uniformly among that base's triangles
+        base_choice = np.random.randint(0, len(self.stable_coins), size=n)
+        offsets = self._triangle_offsets[base_choice]
+        counts = self._triangle_counts[base_choice]
+        triangle_ids = offsets + (np.random.random(n) * counts).astype(np.int64)
+        triangles = self._triangles[triangle_ids]
+        base, intermediate, quote = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+
+        # Direct rates: quoted pairs vary by ±0.2%, synthetic pairs by ±20%
+        rate_variation = 0.002
+        legs = ((intermediate, base), (quote, intermediate))
+        direct_rates = []
+        for c1, c2 in legs:
+            quoted = self._pair_quoted[c1, c2]
+            variation = np.where(
+                quoted,
+                1 + np.random.uniform(-rate_variation, rate_variation, size=n),
+                np.random.uniform(0.8, 1.2, size=n),
+            )
+            direct_rates.append(self._pair_anchor[c1, c2] * variation)
+
+        # Closing rate is set below the cross rate to create the arbitrage margin
+        arbitrage_margin = np.random.uniform(0.008, 0.025, size=n)
+        closing_rate = direct_rates[0] * direct_rates[1] * (1 - arbitrage_margin)
+        exchange_rates = np.column_stack(direct_rates + [closing_rate])
+
+        # Liquidity follows the first currency of each pair
+        intermediate_depth = np.random.uniform(
+            self._liquidity_low[intermediate], self._liquidity_high[intermediate]
+        )
+        quote_depth = np.random.uniform(
+            self._liquidity_low[quote], self._liquidity_high[quote]
+        )
+        liquidity = np.column_stack(
+            [intermediate_depth, quote_depth, quote_depth]
+        ) * np.random.uniform(0.5, 1.5, size=(n, 3))
+
+        transaction_fees = np.random.uniform(0.0008, 0.002, size=(n, 3))
+
+        expected_profit = calculate_triangular_arbitrage_profit_batch(
+            exchange_rates[:, 0],
+            exchange_rates[:, 1],
+            1.0 / exchange_rates[:, 2],
+            transaction_fees,
+        )
+        confidence_score = np.random.uniform(0.7, 0.95, size=n)
+
+        batch = OpportunityBatch(
+            registry=self.registry,
+            triangles=self._universe_ids[triangles],
+            exchange_rates=exchange_rates,
+            liquidity=liquidity,
+            transaction_fees=transaction_fees,
+            expected_profit=expected_profit,
+            confidence_score=confidence_score,
+        )
+        return batch.filter(expected_profit > 0)
+
+    def stream_opportunities(
+        self,
+        num_opportunities: int,
+        chunk_size: int = 256,
+        min_score: Optional[float] = None,
+        as_batches: bool = False,
+    ) -> Iterator[Union[ArbitrageOpportunity, OpportunityBatch]]:
+        """
+        Yield opportunities as soon as they are found
+
+        Candidates are drawn chunk_size at a time, so at most one chunk is held
+        in memory. Opportunities come out in discovery order, not sorted.
+
+        Args:
+            num_opportunities: Total number of candidates to draw
+            chunk_size: Number of candidates drawn per step
+            min_score: Only yield opportunities with expected profit *
+                confidence of at least min_score
+            as_batches: Yield one OpportunityBatch per chunk instead of
+                individual opportunities
+
+        Yields:
+            ArbitrageOpportunity objects, or OpportunityBatch chunks
+        """
+        remaining = num_opportunities
+        while remaining > 0:
+            n = min(chunk_size, remaining)
+            remaining -= n
+
+            batch = self._draw_opportunity_batch(n)
+            if min_score is not None:
+                batch = batch.filter(batch.scores >= min_score)
+            if not len(batch):
+                continue
+
+            if as_batches:
+                yield batch
+            else:
+                yield from batch
+
+    async def astream_opportunities(
+        self,
+        num_opportunities: int,
+        chunk_size: int = 256,
+        min_score: Optional[float] = None,
+        as_batches: bool = False,
+        buffer_size: int = 4,
+    ) -> AsyncIterator[Union[ArbitrageOpportunity, OpportunityBatch]]:
+        """
+        Async version of stream_opportunities
+
+        Chunks are drawn in a worker thread and handed over through a queue of
+        at most buffer_size chunks, so detection runs ahead of the consumer
+        (e.g. an optimizer building its model) but never by more than the
+        buffer.
+
+        Args:
+            num_opportunities: Total number of candidates to draw
+            chunk_size: Number of candidates drawn per step
+            min_score: Only yield opportunities with expected profit *
+                confidence of at least min_score
+            as_batches: Yield one OpportunityBatch per chunk instead of
+                individual opportunities
+            buffer_size: Maximum number of chunks waiting for the consumer
+
+        Yields:
+            ArbitrageOpportunity objects, or OpportunityBatch chunks
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=buffer_size)
+        done = object()
+        chunks = self.stream_opportunities(
+            num_opportunities, chunk_size, min_score, as_batches=True
+        )
+
+        async def produce():
+            try:
+                while True:
+                    batch = await loop.run_in_executor(None, next, chunks, done)
+                    await queue.put(batch)
+                    if batch is done:
+                        break
+            except Exception as exc:
+                await queue.put(exc)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                if as_batches:
+                    yield item
+                else:
+                    for opportunity in item:
+                        yield opportunity
+        finally:
+            producer.cancel()
+
+    def generate_rate_ticks(
+        self, snapshot: MarketSnapshot, num_ticks: int, volatility: float = 0.002
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Generate single-pair rate ticks against a market snapshot
+
+        Args:
+            snapshot: Snapshot whose current rates the ticks perturb
+            num_ticks: Number of ticks to generate
+            volatility: Standard deviation of the relative rate move
+
+        Returns:
+            List of (from_currency, to_currency, new_rate) tuples
+        """
+        size = len(snapshot.currencies)
+        sources = np.random.randint(0, size, size=num_ticks)
+        targets = (sources + np.random.randint(1, size, size=num_ticks)) % size
+        moves = np.exp(np.random.normal(0.0, volatility, size=num_ticks))
+
+        return [
+            (
+                snapshot.currencies[u],
+                snapshot.currencies[v],
+                float(snapshot.rates[u, v] * move),
+            )
+            for u, v, move in zip(sources.tolist(), targets.tolist(), moves.tolist())
+        ]
+
     def simulate_market_update(
-        self, opportunities: List[ArbitrageOpportunity]
-    ) -> List[ArbitrageOpportunity]:
+        self, opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch]
+    ) -> Union[List[ArbitrageOpportunity], OpportunityBatch]:
         """
         Simulate market changes that affect existing arbitrage opportunities
 
         Args:
-            opportunities: Existing arbitrage opportunities
+            opportunities: Existing arbitrage opportunities (list or batch)
 
         Returns:
-            Updated list of opportunities
+            Updated opportunities, in the same container type as the input
         """
-        updated_opportunities = []
+        if isinstance(opportunities, OpportunityBatch):
+            return self.simulate_batch_update(opportunities)[0]
 
-        for opp in opportunities:
+        updated_rates_list = []
+        updated_liquidity_list = []
+        leg_rates = np.empty((len(opportunities), 3))
+        leg_fees = np.empty((len(opportunities), 3))
+
+        for k, opp in enumerate(opportunities):
             # Simulate market volatility
             volatility = random.uniform(0.995, 1.005)  # ±0.5% change
 
@@ -282,37 +650,684 @@ class FakeArbitrageAnalyzer:
                 liquidity_change = random.uniform(0.9, 1.1)  # ±10% change
                 updated_liquidity[pair] = liq * liquidity_change
 
-            # Recalculate profit with updated rates
-            rate_ab = updated_rates[f"{opp.intermediate_currency}/{opp.base_currency}"]
-            rate_bc = updated_rates[f"{opp.quote_currency}/{opp.intermediate_currency}"]
-            rate_ca = 1.0 / updated_rates[f"{opp.quote_currency}/{opp.base_currency}"]
+            updated_rates_list.append(updated_rates)
+            updated_liquidity_list.append(updated_liquidity)
 
-            fees_tuple = (
-                opp.transaction_fees[
-                    f"{opp.intermediate_currency}/{opp.base_currency}"
-                ],
-                opp.transaction_fees[
-                    f"{opp.quote_currency}/{opp.intermediate_currency}"
-                ],
-                opp.transaction_fees[f"{opp.quote_currency}/{opp.base_currency}"],
+            pair1, pair2, pair3 = self.registry.triangle_pairs(
+                opp.base_currency, opp.intermediate_currency, opp.quote_currency
             )
-
-            updated_profit = calculate_triangular_arbitrage_profit(
-                rate_ab, rate_bc, rate_ca, fees_tuple
+            leg_rates[k] = (
+                updated_rates[pair1],
+                updated_rates[pair2],
+                updated_rates[pair3],
             )
+            leg_fees[k] = (
+                opp.transaction_fees[pair1],
+                opp.transaction_fees[pair2],
+                opp.transaction_fees[pair3],
+            )
+
+        # Recalculate all profits with updated rates in one call
+        updated_profits = calculate_triangular_arbitrage_profit_batch(
+            leg_rates[:, 0], leg_rates[:, 1], 1.0 / leg_rates[:, 2], leg_fees
+        )
 
+        updated_opportunities = []
+        for k in np.nonzero(updated_profits > 0)[0].tolist():
             # Only keep profitable opportunities
-            if updated_profit > 0:
-                updated_opp = ArbitrageOpportunity(
-                    base_currency=opp.base_currency,
-                    intermediate_currency=opp.intermediate_currency,
-                    quote_currency=opp.quote_currency,
-                    exchange_rates=updated_rates,
-                    liquidity=updated_liquidity,
-                    transaction_fees=opp.transaction_fees,
-                    expected_profit=updated_profit,
-                    confidence_score=opp.confidence_score * random.uniform(0.95, 1.05),
-                )
-                updated_opportunities.append(updated_opp)
+            opp = opportunities[k]
+            updated_opp = ArbitrageOpportunity(
+                base_currency=opp.base_currency,
+                intermediate_currency=opp.intermediate_currency,
+                quote_currency=opp.quote_currency,
+                exchange_rates=updated_rates_list[k],
+                liquidity=updated_liquidity_list[k],
+                transaction_fees=opp.transaction_fees,
+                expected_profit=float(updated_profits[k]),
+                confidence_score=opp.confidence_score * random.uniform(0.95, 1.05),
+            )
+            updated_opportunities.append(updated_opp)
 
         return updated_opportunities
+
+    def simulate_batch_update(
+        self, batch: OpportunityBatch
+    ) -> Tuple[OpportunityBatch, np.ndarray]:
+        """
+        Vectorized market update over a whole OpportunityBatch
+
+        Shocks are applied to the full rate and liquidity arrays, profits are
+        recomputed with one batch call, and the rows that stay profitable are
+        kept.
+
+        Args:
+            batch: Existing arbitrage opportunities
+
+        Returns:
+            Tuple (updated batch of the surviving rows, survival mask over the
+            rows of the input batch)
+        """
+        n = len(batch)
+
+        # Market-wide move per opportunity plus idiosyncratic noise per leg
+        volatility = np.random.uniform(0.995, 1.005, size=(n, 1))  # ±0.5% change
+        exchange_rates = (
+            batch.exchange_rates
+            * volatility
+            * np.random.uniform(0.998, 1.002, size=(n, 3))
+        )
+
+        # Liquidity can increase or decrease by up to 10%
+        liquidity = batch.liquidity * np.random.uniform(0.9, 1.1, size=(n, 3))
+
+        expected_profit = calculate_triangular_arbitrage_profit_batch(
+            exchange_rates[:, 0],
+            exchange_rates[:, 1],
+            1.0 / exchange_rates[:, 2],
+            batch.transaction_fees,
+        )
+        confidence_score = batch.confidence_score * np.random.uniform(
+            0.95, 1.05, size=n
+        )
+
+        survived = expected_profit > 0
+        updated = OpportunityBatch(
+            registry=batch.registry,
+            triangles=batch.triangles,
+            exchange_rates=exchange_rates,
+            liquidity=liquidity,
+            transaction_fees=batch.transaction_fees,
+            expected_profit=expected_profit,
+            confidence_score=confidence_score,
+        )
+        return updated.filter(survived), survived
+
+    def generate_profit_scenarios(
+        self, batch: OpportunityBatch, num_scenarios: int, chunk_size: int = 1 << 20
+    ) -> np.ndarray:
+        """
+        Sample the realized profit of every opportunity in many scenarios
+
+        Each scenario applies the shocks of simulate_batch_update (a ±0.5%
+        move per opportunity and ±0.2% noise per leg) and recomputes the
+        cycle profit. A cycle completes with probability equal to its
+        confidence score; otherwise it fails after the first leg, which is
+        unwound at twice its fee plus the rate move against it.
+
+        Args:
+            batch: Opportunities to simulate
+            num_scenarios: Number of scenarios S
+            chunk_size: Scenario-opportunity cells drawn at once, to bound
+                the memory used by temporaries
+
+        Returns:
+            (S, N) realized profit per unit invested
+        """
+        n = len(batch)
+        scenarios = np.empty((num_scenarios, n))
+        rows = max(1, chunk_size // max(n, 1))
+
+        for start in range(0, num_scenarios, rows):
+            block = scenarios[start : start + rows]
+            shape = block.shape
+            volatility = np.random.uniform(0.995, 1.005, size=shape + (1,))
+            moves = volatility * np.random.uniform(0.998, 1.002, size=shape + (3,))
+            rates = batch.exchange_rates * moves
+
+            cycle_rates = np.concatenate(
+                [rates[..., :2], 1.0 / rates[..., 2:]], axis=-1
+            )
+            profit = calculate_cycle_profits(
+                cycle_rates, np.broadcast_to(batch.transaction_fees, shape + (3,))
+            )
+            unwind = -2 * batch.transaction_fees[:, 0] - np.abs(moves[..., 0] - 1)
+
+            completed = np.random.random(shape) < batch.confidence_score
+            block[:] = np.where(completed, profit, unwind)
+
+        return scenarios
+
+    def generate_market_snapshot(
+        self, num_synthetic_currencies: int = 0, mispricing: float = 0.004
+    ) -> MarketSnapshot:
+        """
+        Generate a dense rate/fee/liquidity snapshot over the currency universe
+
+        Stablecoins come first so that triangle scans rooted at the lowest
+        currency index naturally start from a stablecoin.
+
+        Args:
+            num_synthetic_currencies: Extra synthetic currencies appended to the
+                universe (useful for benchmarking large universes)
+            mispricing: Standard deviation of the log-rate noise around fair value
+
+        Returns:
+            MarketSnapshot with N x N rate, fee and liquidity matrices
+        """
+        currencies = list(dict.fromkeys(self.stable_coins + self.currencies))
+        currencies += [f"SYN{k}" for k in range(num_synthetic_currencies)]
+        size = len(currencies)
+
+        # Fair USD prices: stablecoins at par, quoted currencies from base rates
+        prices = np.empty(size)
+        for i, currency in enumerate(currencies):
+            if currency in self.stable_coins:
+                prices[i] = 1.0
+            elif f"{currency}/USDT" in self.base_rates:
+                prices[i] = self.base_rates[f"{currency}/USDT"]
+            else:
+                prices[i] = 10 ** np.random.uniform(-2, 3)
+
+        # Noisy conversion rates; the reverse direction pays a spread so that
+        # round trips between two currencies are never profitable
+        noise = np.random.normal(0.0, mispricing, size=(size, size))
+        spread = np.random.uniform(0.0005, 0.002, size=(size, size))
+        upper = np.triu(noise, k=1)
+        log_noise = upper - upper.T - np.tril(spread + spread.T, k=-1)
+        rates = np.outer(prices, 1.0 / prices) * np.exp(log_noise)
+        np.fill_diagonal(rates, 1.0)
+
+        fees = np.random.uniform(0.0008, 0.002, size=(size, size))
+        np.fill_diagonal(fees, 0.0)
+
+        # Pair depth is limited by the shallower of the two books
+        low = np.array(
+            [self.liquidity_ranges.get(c, (100_000, 100_000))[0] for c in currencies]
+        )
+        high = np.array(
+            [self.liquidity_ranges.get(c, (100_000, 100_000))[1] for c in currencies]
+        )
+        depth = np.random.uniform(low, high)
+        liquidity = np.minimum.outer(depth, depth) * np.random.uniform(
+            0.5, 1.5, size=(size, size)
+        )
+        np.fill_diagonal(liquidity, 0.0)
+
+        return MarketSnapshot(
+            currencies=currencies, rates=rates, fees=fees, liquidity=liquidity
+        )
+
+
+class TriangleScanner:
+    """
+    Exhaustive triangular arbitrage detector over a dense log-rate matrix
+
+    Every directed triangle a -> b -> c -> a is scored at once by broadcasting
+    log r_ab + log r_bc + log r_ca plus the log fee terms, in blocks of root
+    currencies to bound memory. Each cycle is reported once, rooted at its
+    lowest currency index.
+    """
+
+    def __init__(self, snapshot: MarketSnapshot, block_size: int = 32):
+        """
+        Initialize the scanner
+
+        Args:
+            snapshot: Market snapshot to scan
+            block_size: Number of root currencies scored per broadcast block
+        """
+        self.snapshot = snapshot
+        self.block_size = block_size
+
+        # Log of the net conversion factor for every directed pair
+        with np.errstate(divide="ignore"):
+            self.log_weights = np.log(snapshot.rates) + np.log1p(-snapshot.fees)
+        np.fill_diagonal(self.log_weights, -np.inf)
+
+    def scan(self, min_profit: float = 0.0) -> Dict[str, np.ndarray]:
+        """
+        Score every triangle and return the profitable ones
+
+        Args:
+            min_profit: Minimum profit fraction for a triangle to be reported
+
+        Returns:
+            Dictionary with 'triangles' ((K, 3) currency indices a, b, c) and
+            'expected_profit' ((K,) profit fractions), sorted by profit
+            (descending)
+        """
+        weights = self.log_weights
+        size = weights.shape[0]
+        threshold = np.log1p(min_profit)
+        index = np.arange(size)
+
+        found_triangles = []
+        found_scores = []
+        for start in range(0, size, self.block_size):
+            roots = index[start : start + self.block_size]
+
+            # A canonical cycle only visits currencies above its root, so the
+            # block only needs the trailing sub-matrix
+            tail = weights[start:, start:]
+            local = roots - start
+
+            # score[a, b, c] = w[a, b] + w[b, c] + w[c, a]
+            score = tail[local][:, :, None] + tail[None, :, :]
+            score += tail.T[local][:, None, :]
+
+            # Keep each cycle once: the root must be its lowest index
+            above_root = np.arange(size - start)[None, :] > local[:, None]
+            canonical = above_root[:, :, None] & above_root[:, None, :]
+            a, b, c = np.nonzero(canonical & (score > threshold))
+            found_triangles.append(np.column_stack([roots[a], b + start, c + start]))
+            found_scores.append(score[a, b, c])
+
+        triangles = np.concatenate(found_triangles).astype(np.int64)
+        scores = np.concatenate(found_scores)
+        order = np.argsort(-scores, kind="stable")
+
+        return {
+            "triangles": triangles[order],
+            "expected_profit": np.expm1(scores[order]),
+        }
+
+    def find_opportunities(
+        self,
+        min_profit: float = 0.0,
+        max_results: Optional[int] = None,
+        confidence_score: float = 0.85,
+    ) -> List[ArbitrageOpportunity]:
+        """
+        Scan the snapshot and return the profitable triangles as opportunities
+
+        Args:
+            min_profit: Minimum profit fraction for a triangle to be reported
+            max_results: Only return the best max_results triangles
+            confidence_score: Confidence assigned to every detected opportunity
+
+        Returns:
+            List of ArbitrageOpportunity objects sorted by expected profit
+        """
+        return self.find_batch(min_profit, max_results, confidence_score).to_list()
+
+    def find_batch(
+        self,
+        min_profit: float = 0.0,
+        max_results: Optional[int] = None,
+        confidence_score: float = 0.85,
+    ) -> OpportunityBatch:
+        """
+        Scan the snapshot and return the profitable triangles as a batch
+
+        Args:
+            min_profit: Minimum profit fraction for a triangle to be reported
+            max_results: Only return the best max_results triangles
+            confidence_score: Confidence assigned to every detected opportunity
+
+        Returns:
+            OpportunityBatch sorted by expected profit
+        """
+        result = self.scan(min_profit)
+        return _snapshot_triangle_batch(
+            self.snapshot,
+            result["triangles"][:max_results],
+            result["expected_profit"][:max_results],
+            confidence_score,
+        )
+
+
+class NegativeCycleDetector:
+    """
+    Finds every profitable arbitrage cycle of length 3..K on a market snapshot
+
+    Each conversion a -> b becomes an edge of weight -log(r_ab * (1 - fee_ab)),
+    so a profitable cycle is a negative cycle. From every root currency all
+    simple walks through currencies above the root are extended one leg at a
+    time, and every walk of at least two legs is closed back to the root.
+
+    Before the search, a backward hop-limited Bellman-Ford from the root
+    gives for every currency the lowest weight of returning to the root
+    within the legs that are left (over walks, simple or not). A walk is
+    dropped once its weight plus that bound cannot reach the threshold;
+    since the bound never overestimates, no profitable simple cycle is lost.
+    """
+
+    def __init__(
+        self,
+        snapshot: MarketSnapshot,
+        max_length: int = 5,
+        registry: Optional[CurrencyRegistry] = None,
+        block_size: int = 4096,
+    ):
+        """
+        Initialize the detector
+
+        Args:
+            snapshot: Market snapshot to search
+            max_length: Maximum number of legs in a cycle (at least 3)
+            registry: Currency/pair registry naming the opportunities' pairs
+                (shared default registry if None)
+            block_size: Number of walks extended per broadcast block
+        """
+        if max_length < 3:
+            raise ValueError("max_length must be at least 3")
+
+        self.snapshot = snapshot
+        self.max_length = max_length
+        self.block_size = block_size
+        self.registry = registry if registry is not None else DEFAULT_REGISTRY
+        self.currency_ids = self.registry.register_many(snapshot.currencies)
+
+        with np.errstate(divide="ignore"):
+            self.weights = -(np.log(snapshot.rates) + np.log1p(-snapshot.fees))
+        np.fill_diagonal(self.weights, np.inf)
+
+    def _return_bounds(self, root: int, allowed: np.ndarray) -> List[np.ndarray]:
+        """
+        Lower bounds on extending a walk and closing it back to the root
+
+        Returns:
+            List whose entry r (2 <= r < max_length) holds, for every
+            currency, the lowest weight of a walk of 2..r legs from it back
+            to the root through allowed currencies
+        """
+        legs = np.where(allowed[None, :], self.weights, np.inf)
+        back = self.weights[:, root]  # Walks of at most r - 1 legs
+        bounds = [None, None]
+        for _ in range(2, self.max_length):
+            bounds.append(np.min(legs + back[None, :], axis=1))
+            back = np.minimum(back, bounds[-1])
+        return bounds
+
+    def find_cycles(
+        self, min_profit: float = 0.0, max_cycles: Optional[int] = None
+    ) -> List[Tuple[Tuple[int, ...], float]]:
+        """
+        Search for profitable cycles
+
+        Args:
+            min_profit: Minimum profit fraction for a cycle to be reported
+            max_cycles: Stop as soon as this many cycles have been found
+
+        Returns:
+            List of (currency index cycle, profit fraction) sorted by profit
+            (descending). Cycles start at their lowest currency index.
+        """
+        weights = self.weights
+        size = weights.shape[0]
+        threshold = -np.log1p(min_profit)
+        found_cycles = []
+        found_weights = []
+        num_found = 0
+
+        for root in range(size):
+            if max_cycles is not None and num_found >= max_cycles:
+                break
+
+            # Only currencies above the root may be visited, so every cycle is
+            # reached exactly once, from its lowest currency
+            allowed = np.arange(size) > root
+            legs = np.where(allowed[None, :], weights, np.inf)
+            bounds = self._return_bounds(root, allowed)
+
+            walks = np.flatnonzero(allowed)[:, None]
+            dist = weights[root, walks[:, 0]]
+            keep = dist + bounds[self.max_length - 1][walks[:, 0]] < threshold
+            walks, dist = walks[keep], dist[keep]
+
+            # Walks of `hops` legs, closed by one more leg back to the root
+            for hops in range(2, self.max_length):
+                extended_walks, extended_dist = [], []
+                for start in range(0, len(walks), self.block_size):
+                    block = walks[start : start + self.block_size]
+                    candidate = (
+                        dist[start : start + len(block), None] + legs[block[:, -1]]
+                    )
+                    candidate[np.arange(len(block))[:, None], block] = np.inf
+
+                    closing = candidate + weights[:, root][None, :]
+                    hit_w, hit_v = np.nonzero(closing < threshold)
+                    if max_cycles is not None:
+                        hit_w = hit_w[: max_cycles - num_found]
+                        hit_v = hit_v[: max_cycles - num_found]
+                    if len(hit_w):
+                        cycles = np.column_stack(
+                            [np.full(len(hit_w), root), block[hit_w], hit_v]
+                        )
+                        found_cycles.extend(map(tuple, cycles.tolist()))
+                        found_weights.append(closing[hit_w, hit_v])
+                        num_found += len(hit_w)
+                    if max_cycles is not None and num_found >= max_cycles:
+                        break
+
+                    # Keep the walks that can still close below the threshold
+                    # in the legs that are left
+                    if hops < self.max_length - 1:
+                        bound = bounds[self.max_length - hops]
+                        more_w, more_v = np.nonzero(candidate + bound < threshold)
+                        extended_walks.append(np.column_stack([block[more_w], more_v]))
+                        extended_dist.append(candidate[more_w, more_v])
+
+                if not extended_walks or (
+                    max_cycles is not None and num_found >= max_cycles
+                ):
+                    break
+                walks = np.concatenate(extended_walks)
+                dist = np.concatenate(extended_dist)
+
+        if not found_cycles:
+            return []
+
+        profits = np.expm1(-np.concatenate(found_weights))
+        order = np.argsort(-profits, kind="stable")
+        return [(found_cycles[k], float(profits[k])) for k in order]
+
+    def find_opportunities(
+        self,
+        min_profit: float = 0.0,
+        max_cycles: Optional[int] = None,
+        confidence_score: float = 0.85,
+    ) -> List[ArbitrageOpportunity]:
+        """
+        Search for profitable cycles and return them as opportunities
+
+        Triangles come back exactly as TriangleScanner reports them; longer
+        cycles carry their full currency path and one rate/fee/liquidity entry
+        per leg, in ArbitrageOpportunity.leg_pairs() order.
+
+        Args:
+            min_profit: Minimum profit fraction for a cycle to be reported
+            max_cycles: Stop as soon as this many cycles have been found
+            confidence_score: Confidence assigned to every detected opportunity
+
+        Returns:
+            List of ArbitrageOpportunity objects sorted by expected profit
+        """
+        snapshot = self.snapshot
+        currencies = snapshot.currencies
+        cycles = self.find_cycles(min_profit, max_cycles)
+        opportunities = []
+        if not cycles:
+            return opportunities
+
+        # Legs of all cycles, in cycle order
+        tails = np.array([k for cycle, _ in cycles for k in cycle])
+        heads = np.array([k for cycle, _ in cycles for k in cycle[1:] + cycle[:1]])
+        closing = np.zeros(len(tails), dtype=bool)
+        closing[np.cumsum([len(cycle) for cycle, _ in cycles]) - 1] = True
+
+        # Intermediate legs a -> b are quoted as b/a; the closing leg as
+        # last/base, i.e. the inverse of last -> base
+        ids = self.currency_ids
+        pair_ids = self.registry.pair_ids(
+            np.where(closing, ids[tails], ids[heads]),
+            np.where(closing, ids[heads], ids[tails]),
+        )
+        pairs = [self.registry.pair_keys[p] for p in pair_ids.tolist()]
+        rates = snapshot.rates[tails, heads]
+        rates = np.where(closing, 1.0 / rates, rates).tolist()
+        depths = snapshot.liquidity[tails, heads].tolist()
+        fees = snapshot.fees[tails, heads].tolist()
+
+        end = 0
+        for cycle, profit in cycles:
+            path = tuple(currencies[k] for k in cycle)
+            legs = slice(end, end + len(cycle))
+            end = legs.stop
+
+            exchange_rates = dict(zip(pairs[legs], rates[legs]))
+            liquidity = dict(zip(pairs[legs], depths[legs]))
+            transaction_fees = dict(zip(pairs[legs], fees[legs]))
+
+            opportunities.append(
+                ArbitrageOpportunity(
+                    base_currency=path[0],
+                    intermediate_currency=path[1],
+                    quote_currency=path[-1],
+                    exchange_rates=exchange_rates,
+                    liquidity=liquidity,
+                    transaction_fees=transaction_fees,
+                    expected_profit=profit,
+                    confidence_score=confidence_score,
+                    path=path if len(path) > 3 else None,
+                )
+            )
+
+        return opportunities
+
+
+class IncrementalTriangleEngine:
+    """
+    Keeps the profitable triangle set of a snapshot up to date on rate ticks
+
+    All directed triangles are enumerated once (rooted at their lowest
+    currency, as in TriangleScanner) together with an inverted index from
+    every directed pair to the triangles using it. A tick on one pair only
+    re-scores the triangles touching that pair, so the update cost is
+    proportional to the pair's fan-out (about N triangles), not to the N^3
+    triangles of the universe.
+    """
+
+    def __init__(self, snapshot: MarketSnapshot, min_profit: float = 0.0):
+        """
+        Initialize the engine and score every triangle once
+
+        Args:
+            snapshot: Market snapshot to track; its matrices are updated in place
+            min_profit: Minimum profit fraction for a triangle to be live
+        """
+        self.snapshot = snapshot
+        self.threshold = np.log1p(min_profit)
+        self.currency_index = {c: i for i, c in enumerate(snapshot.currencies)}
+        size = len(snapshot.currencies)
+
+        with np.errstate(divide="ignore"):
+            self.log_weights = np.log(snapshot.rates) + np.log1p(-snapshot.fees)
+        np.fill_diagonal(self.log_weights, -np.inf)
+
+        # Directed triangles a -> b -> c -> a with a < b, a < c and b != c, in
+        # lexicographic order, written one root at a time so that only
+        # (N - a)^2 temporaries exist besides the int32 result
+        above = np.arange(size - 1, -1, -1)  # Currencies above every root
+        offsets = np.concatenate([[0], np.cumsum(above * (above - 1))])
+        self.triangles = np.empty((offsets[-1], 3), dtype=np.int32)
+        for root in range(size - 2):
+            others = np.arange(root + 1, size, dtype=np.int32)
+            b = np.repeat(others, len(others))
+            c = np.tile(others, len(others))
+            distinct = b != c
+            block = self.triangles[offsets[root] : offsets[root + 1]]
+            block[:, 0] = root
+            block[:, 1] = b[distinct]
+            block[:, 2] = c[distinct]
+
+        # Inverted index: pair id (u * N + v) -> triangles using leg u -> v
+        t = self.triangles
+        legs = np.concatenate(
+            [
+                t[:, 0] * size + t[:, 1],
+                t[:, 1] * size + t[:, 2],
+                t[:, 2] * size + t[:, 0],
+            ]
+        )
+        owners = np.tile(np.arange(len(t), dtype=np.int64), 3)
+        order = np.argsort(legs, kind="stable")
+        self._pair_triangles = owners[order]
+        self._pair_offsets = np.searchsorted(legs[order], np.arange(size * size + 1))
+
+        self.scores = self._score(np.arange(len(t)))
+        self.live = self.scores > self.threshold
+
+    def _score(self, triangle_ids: np.ndarray) -> np.ndarray:
+        """Log growth of the given triangles"""
+        t = self.triangles[triangle_ids]
+        w = self.log_weights
+        return w[t[:, 0], t[:, 1]] + w[t[:, 1], t[:, 2]] + w[t[:, 2], t[:, 0]]
+
+    def triangles_for_pair(self, from_currency: str, to_currency: str) -> np.ndarray:
+        """Ids of the triangles that convert from_currency -> to_currency"""
+        size = len(self.snapshot.currencies)
+        pair = (
+            self.currency_index[from_currency] * size + self.currency_index[to_currency]
+        )
+        return self._pair_triangles[
+            self._pair_offsets[pair] : self._pair_offsets[pair + 1]
+        ]
+
+    def update_rate(
+        self,
+        from_currency: str,
+        to_currency: str,
+        rate: float,
+        fee: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Apply a rate tick on one directed pair and re-score affected triangles
+
+        Args:
+            from_currency: Currency sold on the pair
+            to_currency: Currency bought on the pair
+            rate: New rate (units of to_currency per unit of from_currency)
+            fee: New fee fraction for the pair (unchanged if None)
+
+        Returns:
+            Tuple (appeared, disappeared) of triangle ids that entered or left
+            the live profitable set
+        """
+        u = self.currency_index[from_currency]
+        v = self.currency_index[to_currency]
+        self.snapshot.rates[u, v] = rate
+        if fee is not None:
+            self.snapshot.fees[u, v] = fee
+        self.log_weights[u, v] = np.log(rate) + np.log1p(-self.snapshot.fees[u, v])
+
+        affected = self.triangles_for_pair(from_currency, to_currency)
+        scores = self._score(affected)
+        live = scores > self.threshold
+        was_live = self.live[affected]
+
+        self.scores[affected] = scores
+        self.live[affected] = live
+        return affected[live & ~was_live], affected[was_live & ~live]
+
+    def profitable_triangles(self) -> Dict[str, np.ndarray]:
+        """
+        Current live set
+
+        Returns:
+            Dictionary with 'triangle_ids', 'triangles' ((K, 3) currency
+            indices) and 'expected_profit', sorted by profit (descending)
+        """
+        ids = np.nonzero(self.live)[0]
+        ids = ids[np.argsort(-self.scores[ids], kind="stable")]
+        return {
+            "triangle_ids": ids,
+            "triangles": self.triangles[ids].astype(np.int64),
+            "expected_profit": np.expm1(self.scores[ids]),
+        }
+
+    def get_batch(self, confidence_score: float = 0.85) -> OpportunityBatch:
+        """Current live set as an OpportunityBatch"""
+        result = self.profitable_triangles()
+        return _snapshot_triangle_batch(
+            self.snapshot,
+            result["triangles"],
+            result["expected_profit"],
+            confidence_score,
+        )
+
+    def get_opportunities(
+        self, confidence_score: float = 0.85
+    ) -> List[ArbitrageOpportunity]:
+        """Materialize the live set as ArbitrageOpportunity objects"""
+        return self.get_batch(confidence_score).to_list()
@@ -8,9 +8,24 @@ minimum holding values, and volume limitations.
 
 import pulp as pl
 import numpy as np
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Optional, Union
+from dataclasses import dataclass, replace
 import logging
+import time
+from currency_registry import CurrencyRegistry, DEFAULT_REGISTRY
+from lp_model import LinearProgram, LinearProgramBuilder
+from lp_solvers import (
+    FALLBACK,
+    FEASIBLE_STATUSES,
+    CBCBackend,
+    DecompositionBackend,
+    GreedyBackend,
+    LPSolution,
+    SolverBackend,
+    TIME_LIMITED,
+    fallback_allocation,
+    get_backend,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,6 +46,400 @@ class ArbitrageOpportunity:
     transaction_fees: Dict[str, float]  # Fee percentage for each trading pair
     expected_profit: float
     confidence_score: float
+    # Full currency cycle for opportunities with more than three legs,
+    # e.g. ('USDT', 'BTC', 'ETH', 'ADA'); None for plain triangles
+    path: Optional[Tuple[str, ...]] = None
+
+    @property
+    def currency_path(self) -> Tuple[str, ...]:
+        """Currencies visited by the cycle, starting from the base currency"""
+        if self.path is not None:
+            return self.path
+        return (self.base_currency, self.intermediate_currency, self.quote_currency)
+
+    def leg_pairs(self) -> List[str]:
+        """
+        Trading pair of every leg in execution order
+
+        Intermediate legs are quoted as "to/from"; the closing leg is quoted
+        against the base currency, as for triangles (e.g. 'ETH/USDT').
+        """
+        path = self.currency_path
+        pairs = [f"{path[k + 1]}/{path[k]}" for k in range(len(path) - 1)]
+        pairs.append(f"{path[-1]}/{path[0]}")
+        return pairs
+
+
+@dataclass
+class OpportunityBatch:
+    """
+    Columnar (struct-of-arrays) collection of triangular arbitrage opportunities
+
+    Leg arrays have shape (N, 3) and follow the pair order of a triangle:
+    intermediate/base, quote/intermediate, quote/base. Basic slicing returns
+    views of the underlying arrays; masks and index arrays copy, as in NumPy.
+    """
+
+    registry: CurrencyRegistry  # Resolves the currency ids in triangles
+    triangles: np.ndarray  # (N, 3) base, intermediate, quote currency ids
+    exchange_rates: np.ndarray  # (N, 3) rate of each leg's pair
+    liquidity: np.ndarray  # (N, 3) available liquidity of each leg's pair
+    transaction_fees: np.ndarray  # (N, 3) fee of each leg's pair
+    expected_profit: np.ndarray  # (N,)
+    confidence_score: np.ndarray  # (N,)
+
+    def __len__(self) -> int:
+        return len(self.expected_profit)
+
+    def __getitem__(
+        self, index: Union[int, slice, np.ndarray]
+    ) -> Union[ArbitrageOpportunity, "OpportunityBatch"]:
+        """An integer returns an opportunity view; anything else a sub-batch"""
+        if isinstance(index, (int, np.integer)):
+            return self.opportunity(int(index))
+
+        return OpportunityBatch(
+            registry=self.registry,
+            triangles=self.triangles[index],
+            exchange_rates=self.exchange_rates[index],
+            liquidity=self.liquidity[index],
+            transaction_fees=self.transaction_fees[index],
+            expected_profit=self.expected_profit[index],
+            confidence_score=self.confidence_score[index],
+        )
+
+    def __iter__(self) -> Iterator[ArbitrageOpportunity]:
+        """Lazily yield ArbitrageOpportunity views, one at a time"""
+        for i in range(len(self)):
+            yield self.opportunity(i)
+
+    @property
+    def currencies(self) -> List[str]:
+        """Currency names indexed by the ids in triangles"""
+        return self.registry.currencies
+
+    @property
+    def scores(self) -> np.ndarray:
+        """Risk-adjusted score (expected profit * confidence) of every row"""
+        return self.expected_profit * self.confidence_score
+
+    def filter(self, mask: np.ndarray) -> "OpportunityBatch":
+        """Keep the rows where mask is True"""
+        return self[np.asarray(mask, dtype=bool)]
+
+    def sort_by_score(self, descending: bool = True) -> "OpportunityBatch":
+        """Return the batch ordered by risk-adjusted score"""
+        scores = -self.scores if descending else self.scores
+        return self[np.argsort(scores, kind="stable")]
+
+    def top_k(self, k: int) -> "OpportunityBatch":
+        """
+        The k best rows by risk-adjusted score, sorted (descending)
+
+        Uses np.argpartition so only the selected rows are sorted.
+        """
+        if k >= len(self):
+            return self.sort_by_score()
+        if k <= 0:
+            return self[:0]
+
+        scores = self.scores
+        best = np.argpartition(-scores, k - 1)[:k]
+        return self[best[np.argsort(-scores[best], kind="stable")]]
+
+    def pair_ids(self) -> np.ndarray:
+        """(N, 3) registry pair id of each leg"""
+        return self.registry.triangle_pair_ids(self.triangles)
+
+    def pair_names(self, i: int) -> Tuple[str, str, str]:
+        """Trading pair of each leg of row i"""
+        base, intermediate, quote = (self.currencies[c] for c in self.triangles[i])
+        return self.registry.triangle_pairs(base, intermediate, quote)
+
+    def opportunity(self, i: int) -> ArbitrageOpportunity:
+        """Materialize row i as an ArbitrageOpportunity"""
+        base, intermediate, quote = (self.currencies[c] for c in self.triangles[i])
+        pairs = self.registry.triangle_pairs(base, intermediate, quote)
+
+        return ArbitrageOpportunity(
+            base_currency=base,
+            intermediate_currency=intermediate,
+            quote_currency=quote,
+            exchange_rates=dict(zip(pairs, self.exchange_rates[i].tolist())),
+            liquidity=dict(zip(pairs, self.liquidity[i].tolist())),
+            transaction_fees=dict(zip(pairs, self.transaction_fees[i].tolist())),
+            expected_profit=float(self.expected_profit[i]),
+            confidence_score=float(self.confidence_score[i]),
+        )
+
+    def to_list(self) -> List[ArbitrageOpportunity]:
+        """Materialize every row as an ArbitrageOpportunity"""
+        return list(self)
+
+    @classmethod
+    def from_opportunities(
+        cls,
+        opportunities: List[ArbitrageOpportunity],
+        registry: Optional[CurrencyRegistry] = None,
+    ) -> "OpportunityBatch":
+        """
+        Build a batch from triangular ArbitrageOpportunity objects
+
+        Args:
+            opportunities: Triangular opportunities (cycles with a longer path
+                are not supported)
+            registry: Registry assigning the currency ids (shared default
+                registry if None)
+
+        Returns:
+            OpportunityBatch with one row per opportunity
+        """
+        registry = registry if registry is not None else DEFAULT_REGISTRY
+        n = len(opportunities)
+
+        triangles = np.empty((n, 3), dtype=np.int64)
+        legs = {
+            "exchange_rates": np.empty((n, 3)),
+            "liquidity": np.empty((n, 3)),
+            "transaction_fees": np.empty((n, 3)),
+        }
+
+        for row, opp in enumerate(opportunities):
+            if len(opp.currency_path) != 3:
+                raise ValueError("OpportunityBatch only holds triangular opportunities")
+            triangles[row] = [registry.register(c) for c in opp.currency_path]
+
+            pairs = registry.triangle_pairs(*opp.currency_path)
+            for field, values in legs.items():
+                source = getattr(opp, field)
+                values[row] = [source.get(pair, 0.0) for pair in pairs]
+
+        return cls(
+            registry=registry,
+            triangles=triangles,
+            expected_profit=np.array([o.expected_profit for o in opportunities]),
+            confidence_score=np.array([o.confidence_score for o in opportunities]),
+            **legs,
+        )
+
+    @classmethod
+    def concatenate(cls, batches: List["OpportunityBatch"]) -> "OpportunityBatch":
+        """Stack batches that share the same registry"""
+        registry = batches[0].registry
+        if any(batch.registry is not registry for batch in batches):
+            raise ValueError("Batches must share the same currency registry")
+
+        return cls(
+            registry=registry,
+            triangles=np.concatenate([b.triangles for b in batches]),
+            exchange_rates=np.concatenate([b.exchange_rates for b in batches]),
+            liquidity=np.concatenate([b.liquidity for b in batches]),
+            transaction_fees=np.concatenate([b.transaction_fees for b in batches]),
+            expected_profit=np.concatenate([b.expected_profit for b in batches]),
+            confidence_score=np.concatenate([b.confidence_score for b in batches]),
+        )
+
+
+# Ways of combining the liquidity reported for the same pair by several
+# opportunities (see aggregate_liquidity)
+LIQUIDITY_POLICIES = ("max", "min", "latest", "sum")
+
+
+@dataclass
+class CurrencyNetwork:
+    """
+    Directed graph of the legs traded by a set of opportunities
+
+    Every distinct conversion (from currency, to currency) is one arc, however
+    many opportunities trade it. A flow of y units of the arc's tail currency
+    delivers gains * y units of its head currency.
+    """
+
+    registry: CurrencyRegistry  # Resolves the currency ids
+    tails: np.ndarray  # (A,) currency id each arc converts from
+    heads: np.ndarray  # (A,) currency id each arc converts to
+    gains: np.ndarray  # (A,) units of head per unit of tail, after fees
+    fees: np.ndarray  # (A,) transaction fee of each arc
+    liquidity: np.ndarray  # (A,) available liquidity of each arc
+    entries: np.ndarray  # (A,) whether the arc is the first leg of some cycle
+    values: np.ndarray  # Value of one unit of every currency id (numeraire units)
+    numeraire: int  # Currency id the values are expressed in
+    max_legs: int  # Legs of the longest cycle
+
+    def __len__(self) -> int:
+        return len(self.tails)
+
+    @property
+    def nodes(self) -> np.ndarray:
+        """Currency ids touched by some arc, sorted"""
+        return np.union1d(self.tails, self.heads)
+
+    def arc_names(self) -> List[str]:
+        """FROM_TO name of every arc"""
+        currencies = self.registry.currencies
+        return [
+            f"{currencies[t]}_{currencies[h]}"
+            for t, h in zip(self.tails.tolist(), self.heads.tolist())
+        ]
+
+    def incidence(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Node-arc incidence matrix in COO form
+
+        Returns:
+            Tuple (currency ids, arcs, values): -1 at the tail and +gain at the
+            head of every arc, so that the matrix times the arc flows is the
+            net change of every currency
+        """
+        arcs = np.arange(len(self))
+        return (
+            np.concatenate([self.tails, self.heads]),
+            np.concatenate([arcs, arcs]),
+            np.concatenate([-np.ones(len(self)), self.gains]),
+        )
+
+    def net_changes(self, flows: np.ndarray) -> np.ndarray:
+        """Net change of every currency id under the given arc flows"""
+        currencies, arcs, values = self.incidence()
+        return np.bincount(
+            currencies, weights=values * flows[arcs], minlength=len(self.registry)
+        )
+
+    @classmethod
+    def from_opportunities(
+        cls,
+        opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch],
+        registry: Optional[CurrencyRegistry] = None,
+        liquidity_policy: str = "max",
+        numeraire: Optional[str] = None,
+    ) -> "CurrencyNetwork":
+        """
+        Merge the legs of opportunities into a network
+
+        Leg k of a cycle converts path[k] into path[k + 1] at rate * (1 - fee),
+        except the closing leg, which is quoted as last/base and converts at
+        (1 - fee) / rate. An arc reported by several opportunities gets the
+        lowest of their conversions (no arbitrage is assumed that not every
+        quote supports), their mean fee, and their liquidity combined with
+        the liquidity policy.
+
+        Currencies are valued at consensus prices: the log prices that best
+        fit all quoted rates (before fees) in the least-squares sense, in
+        units of the numeraire. The fit runs over the arcs, through the
+        small currencies x currencies normal equations, so its cost does
+        not grow with the number of legs.
+
+        Args:
+            opportunities: Opportunities (list or OpportunityBatch)
+            registry: Registry of the currency ids (the batch's registry, or
+                the shared default registry if None)
+            liquidity_policy: How leg liquidity is combined per arc (see
+                aggregate_liquidity)
+            numeraire: Currency the values are expressed in (the most common
+                base currency if None)
+
+        Returns:
+            CurrencyNetwork with one arc per distinct conversion
+        """
+        if isinstance(opportunities, OpportunityBatch):
+            registry = opportunities.registry
+            paths = opportunities.triangles
+            rates = opportunities.exchange_rates.copy()
+            rates[:, 2] = 1.0 / rates[:, 2]
+            tails = paths.ravel()
+            heads = np.roll(paths, -1, axis=1).ravel()
+            rates = rates.ravel()
+            fees = opportunities.transaction_fees.ravel()
+            liquidity = opportunities.liquidity.ravel()
+            first = np.tile([True, False, False], len(opportunities))
+            starts = paths[:, 0]
+            max_legs = 3
+        else:
+            registry = registry if registry is not None else DEFAULT_REGISTRY
+            legs = []
+            for opp in opportunities:
+                path = registry.register_many(opp.currency_path).tolist()
+                pairs = opp.leg_pairs()
+                for k, pair in enumerate(pairs):
+                    rate = opp.exchange_rates.get(pair, 0.0)
+                    if k == len(pairs) - 1 and rate:
+                        rate = 1.0 / rate
+                    legs.append(
+                        (
+                            path[k],
+                            path[(k + 1) % len(path)],
+                            rate,
+                            opp.transaction_fees.get(pair, 0.001),
+                            opp.liquidity.get(pair, 0.0),
+                            k == 0,
+                        )
+                    )
+            columns = list(zip(*legs))
+            tails, heads = (np.array(c, dtype=np.int64) for c in columns[:2])
+            rates, fees, liquidity = (np.array(c, dtype=float) for c in columns[2:5])
+            first = np.array(columns[5], dtype=bool)
+            starts = registry.register_many(
+                [opp.base_currency for opp in opportunities]
+            )
+            max_legs = max(len(opp.currency_path) for opp in opportunities)
+
+        size = len(registry)
+        keys, arc_rows = np.unique(tails * size + heads, return_inverse=True)
+        num_arcs = len(keys)
+        gains = np.full(num_arcs, np.inf)
+        np.minimum.at(gains, arc_rows, rates * (1 - fees))
+        counts = np.bincount(arc_rows, minlength=num_arcs)
+        arc_tails, arc_heads = keys // size, keys % size
+
+        # Consensus prices: log value(tail) - log value(head) = log rate on
+        # every quoted leg. The legs of an arc share one equation, so the
+        # least-squares fit solves the normal equations L v = b, where L is
+        # the graph Laplacian weighted by the quotes per arc and b sums the
+        # log rates; lstsq picks the minimum-norm solution as on the legs
+        quoted = rates > 0
+        weights = np.bincount(arc_rows[quoted], minlength=num_arcs).astype(float)
+        log_rates = np.bincount(
+            arc_rows[quoted], weights=np.log(rates[quoted]), minlength=num_arcs
+        )
+        nodes, local = np.unique(
+            np.concatenate([arc_tails, arc_heads]), return_inverse=True
+        )
+        arc_tail_nodes, arc_head_nodes = local[:num_arcs], local[num_arcs:]
+        laplacian = np.zeros((len(nodes), len(nodes)))
+        for rows, cols, sign in (
+            (arc_tail_nodes, arc_tail_nodes, 1.0),
+            (arc_head_nodes, arc_head_nodes, 1.0),
+            (arc_tail_nodes, arc_head_nodes, -1.0),
+            (arc_head_nodes, arc_tail_nodes, -1.0),
+        ):
+            np.add.at(laplacian, (rows, cols), sign * weights)
+        sums = np.bincount(
+            arc_tail_nodes, weights=log_rates, minlength=len(nodes)
+        ) - np.bincount(arc_head_nodes, weights=log_rates, minlength=len(nodes))
+        log_values = np.linalg.lstsq(laplacian, sums, rcond=None)[0]
+        numeraire_id = (
+            np.bincount(starts).argmax()
+            if numeraire is None
+            else registry.currency_id(numeraire)
+        )
+        log_values -= log_values[np.searchsorted(nodes, numeraire_id)]
+        values = np.ones(size)
+        values[nodes] = np.exp(log_values)
+
+        return cls(
+            registry=registry,
+            tails=arc_tails,
+            heads=arc_heads,
+            gains=gains,
+            fees=np.bincount(arc_rows, weights=fees, minlength=num_arcs) / counts,
+            liquidity=aggregate_liquidity(
+                arc_rows, liquidity, num_arcs, liquidity_policy
+            ),
+            entries=np.bincount(arc_rows, weights=first, minlength=num_arcs) > 0,
+            values=values,
+            numeraire=int(numeraire_id),
+            max_legs=max_legs,
+        )
 
 
 @dataclass
@@ -48,24 +457,53 @@ class TriangularArbitrageOptimizer:
     Optimizes triangular arbitrage opportunities using linear programming
     """
 
-    def __init__(self, portfolio_constraints: PortfolioConstraints):
+    def __init__(
+        self,
+        portfolio_constraints: PortfolioConstraints,
+        registry: Optional[CurrencyRegistry] = None,
+        liquidity_policy: str = "max",
+    ):
+        """
+        Initialize the optimizer
+
+        Args:
+            portfolio_constraints: Portfolio and trading constraints
+            registry: Registry resolving currency and pair ids (shared
+                default registry if None)
+            liquidity_policy: How the liquidity reported by the opportunities
+                trading a pair is combined into the pair's capacity: 'max',
+                'min', 'latest' (last opportunity wins) or 'sum' (e.g.
+                across venues)
+        """
+        if liquidity_policy not in LIQUIDITY_POLICIES:
+            raise ValueError(f"Unknown liquidity policy: {liquidity_policy}")
+
         self.portfolio_constraints = portfolio_constraints
+        self.registry = registry if registry is not None else DEFAULT_REGISTRY
+        self.liquidity_policy = liquidity_policy
         self.problem = None
+        self.model = None
+        self.network = None
+        self.currency_index = {}
         self.variables = {}
+        self.result = None
         self.solution = {}
 
     def create_optimization_problem(
-        self, opportunities: List[ArbitrageOpportunity]
+        self, opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch]
     ) -> pl.LpProblem:
         """
         Creates the linear programming problem for arbitrage optimization
 
         Args:
-            opportunities: List of available arbitrage opportunities
+            opportunities: Available arbitrage opportunities (list or batch)
 
         Returns:
             PuLP LpProblem instance
         """
+        if isinstance(opportunities, OpportunityBatch):
+            opportunities = opportunities.to_list()
+
         # Create the problem
         self.problem = pl.LpProblem("Triangular_Arbitrage_Optimization", pl.LpMaximize)
 
@@ -90,103 +528,132 @@ class TriangularArbitrageOptimizer:
 
         # Add constraints
         self._add_liquidity_constraints(opportunities)
-        self._add_balance_constraints(opportunities)
-        self._add_minimum_holding_constraints(opportunities)
+        self._add_currency_constraints(opportunities)
         self._add_risk_constraints(opportunities)
 
         return self.problem
 
     def _add_liquidity_constraints(self, opportunities: List[ArbitrageOpportunity]):
         """Add liquidity constraints for each trading pair"""
-        # Track liquidity usage across all opportunities
-        liquidity_usage = {}
+        # Group legs by pair id in a single pass: usage terms and reported
+        # liquidity per pair row
+        pair_rows = {}
+        liquidity_usage = []
+        leg_rows = []
+        leg_liquidity = []
 
         for i, opp in enumerate(opportunities):
-            for pair, _ in opp.liquidity.items():
-                if pair not in liquidity_usage:
-                    liquidity_usage[pair] = []
+            for pair, liquidity in opp.liquidity.items():
+                pair_id = self.registry.pair_id_for_key(pair)
+                row = pair_rows.get(pair_id)
+                if row is None:
+                    row = pair_rows[pair_id] = len(liquidity_usage)
+                    liquidity_usage.append([])
 
                 # Estimate liquidity consumption based on investment amount
                 # This is a simplified model - in practice, you'd need more sophisticated modeling
                 consumption_factor = self._estimate_liquidity_consumption(opp, pair)
-                liquidity_usage[pair].append(
+                liquidity_usage[row].append(
                     consumption_factor * self.variables[f"invest_opp_{i}"]
                 )
+                leg_rows.append(row)
+                leg_liquidity.append(liquidity)
+
+        available = aggregate_liquidity(
+            np.array(leg_rows, dtype=np.int64),
+            np.array(leg_liquidity, dtype=float),
+            len(liquidity_usage),
+            self.liquidity_policy,
+        )
 
         # Add constraints to ensure we don't exceed available liquidity
-        for pair, usage_list in liquidity_usage.items():
-            max_liquidity = max([opp.liquidity.get(pair, 0) for opp in opportunities])
-            if max_liquidity > 0:
-                self.problem += pl.lpSum(usage_list) <= max_liquidity
+        for pair_id, usage_list, capacity in zip(
+            pair_rows, liquidity_usage, available.tolist()
+        ):
+            if capacity > 0:
+                name = "liquidity_" + self.registry.pair_key(pair_id).replace("/", "_")
+                self.problem += pl.lpSum(usage_list) <= capacity, name
+
+    def build_currency_index(
+        self, opportunities: List[ArbitrageOpportunity]
+    ) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Build the currency -> legs incidence index of a cycle
 
-    def _add_balance_constraints(self, opportunities: List[ArbitrageOpportunity]):
-        """Add balance constraints to ensure we don't exceed available funds"""
-        # Calculate total investment needed for each currency
-        currency_investment = {}
+        Args:
+            opportunities: Opportunities of the cycle
 
+        Returns:
+            Dictionary mapping every traded currency, in order of first
+            appearance, to the (opportunity index, position in the currency
+            path) of its occurrences; position 0 is the base currency
+        """
+        index = {}
         for i, opp in enumerate(opportunities):
-            currencies = [
-                opp.base_currency,
-                opp.intermediate_currency,
-                opp.quote_currency,
-            ]
-            for currency in currencies:
-                if currency not in currency_investment:
-                    currency_investment[currency] = []
-
-                # Add investment amount (simplified - assumes investment is in base currency)
-                if currency == opp.base_currency:
-                    currency_investment[currency].append(
-                        self.variables[f"invest_opp_{i}"]
-                    )
+            for position, currency in enumerate(opp.currency_path):
+                index.setdefault(currency, []).append((i, position))
+        return index
 
-        # Ensure we don't exceed available balances
-        for currency, investments in currency_investment.items():
-            available_balance = self.portfolio_constraints.initial_balances.get(
-                currency, 0
-            )
-            if available_balance > 0:
-                self.problem += pl.lpSum(investments) <= available_balance
+    def _add_currency_constraints(self, opportunities: List[ArbitrageOpportunity]):
+        """
+        Add balance and minimum holding constraints
 
-    def _add_minimum_holding_constraints(
-        self, opportunities: List[ArbitrageOpportunity]
-    ):
-        """Add minimum holding constraints"""
-        for currency, min_holding in self.portfolio_constraints.min_holdings.items():
-            # Calculate net change in holdings for this currency
+        Both families are generated in one pass over the currency -> legs
+        index, so the cost is linear in the number of legs.
+        """
+        self.currency_index = self.build_currency_index(opportunities)
+        initial_balances = self.portfolio_constraints.initial_balances
+        min_holdings = self.portfolio_constraints.min_holdings
+
+        balance_rows = []
+        holding_rows = {}
+        for currency, legs in self.currency_index.items():
+            investments = []
             net_change = []
+            for i, position in legs:
+                variable = self.variables[f"invest_opp_{i}"]
+                # Investment is made in the base currency (simplified)
+                if position == 0:
+                    investments.append(variable)
+                    net_change.append(-variable)
+                else:
+                    # Estimate net gain from the arbitrage (simplified)
+                    estimated_gain = opportunities[i].expected_profit * 0.5
+                    net_change.append(estimated_gain * variable)
 
-            for i, opp in enumerate(opportunities):
-                if currency in [
-                    opp.base_currency,
-                    opp.intermediate_currency,
-                    opp.quote_currency,
-                ]:
-                    # Simplified calculation - in practice, you'd model the exact flow
-                    if currency == opp.base_currency:
-                        net_change.append(-self.variables[f"invest_opp_{i}"])
-                    else:
-                        # Estimate net gain from the arbitrage
-                        estimated_gain = opp.expected_profit * 0.5  # Simplified
-                        net_change.append(
-                            estimated_gain * self.variables[f"invest_opp_{i}"]
-                        )
+            # Ensure we don't exceed available balances
+            available_balance = initial_balances.get(currency, 0)
+            if investments and available_balance > 0:
+                balance_rows.append(
+                    (pl.lpSum(investments) <= available_balance, f"balance_{currency}")
+                )
 
-            current_balance = self.portfolio_constraints.initial_balances.get(
-                currency, 0
-            )
+            if currency in min_holdings:
+                holding_rows[currency] = net_change
+
+        for row, name in balance_rows:
+            self.problem += row, name
+
+        # Keep holdings above their minimum, in min_holdings order, written
+        # as -(net change) <= current - minimum like the other '<=' rows
+        for currency, min_holding in min_holdings.items():
+            net_change = holding_rows.get(currency)
             if net_change:
-                self.problem += current_balance + pl.lpSum(net_change) >= min_holding
+                current_balance = initial_balances.get(currency, 0)
+                self.problem += (
+                    -pl.lpSum(net_change) <= current_balance - min_holding,
+                    f"min_holding_{currency}",
+                )
 
     def _add_risk_constraints(self, opportunities: List[ArbitrageOpportunity]):
         """Add risk management constraints"""
-        # Maximum position size constraint
+        # Maximum position size, as a bound of the investment variable
         for i, opp in enumerate(opportunities):
             max_position = self.portfolio_constraints.max_position_size.get(
                 opp.base_currency, float("inf")
             )
             if max_position < float("inf"):
-                self.problem += self.variables[f"invest_opp_{i}"] <= max_position
+                self.variables[f"invest_opp_{i}"].upBound = max_position
 
         # Risk tolerance constraint (limit total exposure)
         total_investment = pl.lpSum(
@@ -196,7 +663,247 @@ class TriangularArbitrageOptimizer:
             self.portfolio_constraints.initial_balances.values()
         )
         max_exposure = total_portfolio_value * self.portfolio_constraints.risk_tolerance
-        self.problem += total_investment <= max_exposure
+        self.problem += total_investment <= max_exposure, "total_exposure"
+
+    def build_sparse_model(
+        self, batch: OpportunityBatch, pair_liquidity: Optional[np.ndarray] = None
+    ) -> LinearProgram:
+        """
+        Assemble the arbitrage model as sparse arrays
+
+        Builds the same objective and constraints as create_optimization_problem
+        (liquidity, balance, minimum holding and risk) from the batch arrays
+        with vectorized NumPy code, so build time is linear in the number of
+        nonzeros. Per-opportunity position limits become column upper bounds.
+
+        Args:
+            batch: Triangular arbitrage opportunities
+            pair_liquidity: Liquidity capacity indexed by registry pair id
+                (aggregated over the batch with the liquidity policy if None)
+
+        Returns:
+            LinearProgram with one column invest_opp_{i} per row of the batch
+        """
+        n = len(batch)
+        constraints = self.portfolio_constraints
+        currencies = np.asarray(self.registry.currencies, dtype=object)
+        bases = batch.triangles[:, 0]
+
+        # Risk: per-opportunity position limits as column bounds
+        max_position = np.array(
+            [
+                constraints.max_position_size.get(currency, float("inf"))
+                for currency in self.registry.currencies
+            ]
+        )
+        builder = LinearProgramBuilder(
+            objective=batch.expected_profit * batch.confidence_score,
+            upper_bounds=max_position[bases],
+            column_names=[f"invest_opp_{i}" for i in range(n)],
+        )
+        opp_index = np.arange(n)
+
+        # Liquidity: one row per traded pair, capacity set by the policy
+        pair_ids = batch.pair_ids().ravel()
+        legs_opp = np.repeat(opp_index, 3)
+        consumption = 0.1 + batch.transaction_fees.ravel() * 10
+        pairs, pair_rows = np.unique(pair_ids, return_inverse=True)
+        if pair_liquidity is None:
+            available = aggregate_liquidity(
+                pair_rows, batch.liquidity.ravel(), len(pairs), self.liquidity_policy
+            )
+        else:
+            available = pair_liquidity[pairs]
+
+        keep = available > 0
+        kept_rows = np.cumsum(keep) - 1
+        legs = keep[pair_rows]
+        builder.add_rows(
+            kept_rows[pair_rows[legs]],
+            legs_opp[legs],
+            consumption[legs],
+            available[keep],
+            [
+                "liquidity_" + self.registry.pair_key(p).replace("/", "_")
+                for p in pairs[keep].tolist()
+            ],
+        )
+
+        # Balance: investments per base currency within the available balance
+        balances = np.array(
+            [
+                constraints.initial_balances.get(currency, 0)
+                for currency in self.registry.currencies
+            ],
+            dtype=float,
+        )
+        base_ids, base_rows = np.unique(bases, return_inverse=True)
+        keep = balances[base_ids] > 0
+        kept_rows = np.cumsum(keep) - 1
+        legs = keep[base_rows]
+        builder.add_rows(
+            kept_rows[base_rows[legs]],
+            opp_index[legs],
+            np.ones(int(legs.sum())),
+            balances[base_ids[keep]],
+            [f"balance_{c}" for c in currencies[base_ids[keep]]],
+        )
+
+        # Minimum holdings: current + net change >= minimum, written as
+        # -net change <= current - minimum
+        holding_row = np.full(len(self.registry), -1)
+        holding_currencies = []
+        for currency in constraints.min_holdings:
+            if currency in self.registry.currencies:
+                holding_row[self.registry.currency_id(currency)] = len(
+                    holding_currencies
+                )
+                holding_currencies.append(currency)
+
+        leg_currency = batch.triangles.ravel()
+        leg_coefficient = np.column_stack(
+            [
+                np.ones(n),
+                -0.5 * batch.expected_profit,
+                -0.5 * batch.expected_profit,
+            ]
+        ).ravel()
+        rows = holding_row[leg_currency]
+        touched = np.unique(rows[rows >= 0])
+        kept_rows = np.full(len(holding_currencies), -1)
+        kept_rows[touched] = np.arange(len(touched))
+        legs = rows >= 0
+        builder.add_rows(
+            kept_rows[rows[legs]],
+            legs_opp[legs],
+            leg_coefficient[legs],
+            [
+                constraints.initial_balances.get(holding_currencies[r], 0)
+                - constraints.min_holdings[holding_currencies[r]]
+                for r in touched.tolist()
+            ],
+            [f"min_holding_{holding_currencies[r]}" for r in touched.tolist()],
+        )
+
+        # Risk tolerance: limit total exposure
+        total_portfolio_value = sum(constraints.initial_balances.values())
+        builder.add_rows(
+            np.zeros(n, dtype=np.int64),
+            opp_index,
+            np.ones(n),
+            [total_portfolio_value * constraints.risk_tolerance],
+            ["total_exposure"],
+        )
+
+        return builder.build()
+
+    def build_network_model(self, network: CurrencyNetwork) -> LinearProgram:
+        """
+        Assemble the flow formulation of the arbitrage model
+
+        Columns are arc flows in units of the arc's tail currency. The net
+        change of every currency is the incidence matrix times the flows,
+        so conservation is exact and legs shared by several opportunities
+        are traded (and use liquidity) once. The objective is the net change
+        valued at the network's consensus prices. Rows:
+
+        - liquidity_<FROM>_<TO>: liquidity used by an arc, as in the
+          opportunity model but on the value of the flow
+        - min_holding_<CCY>: final holding (current + net change) at least
+          the larger of the current holding and the minimum;
+          conservation_<CCY> keeps the final holding of every other currency
+          at least the current one. No holding is sold down, so only closed
+          cycles earn and the consensus prices merely weigh gains in
+          different currencies
+        - total_exposure: value entered into cycles, i.e. sold on arcs that
+          are the first leg of some opportunity. As in the opportunity
+          model a position counts once, not once per leg
+        - leg_budget: value traded over all arcs at most what max_legs legs
+          of a cycle can trade per unit entered, 1 + p + ... + p**(max_legs
+          - 1) with p the largest value premium (head value * gain / tail
+          value) of an arc. Flow thus only circulates in cycles that are
+          entered, and is limited by total_exposure also through currencies
+          that are not held
+
+        The value sold of a currency in one arc is bounded by its maximum
+        position, like the investment of one opportunity.
+
+        Args:
+            network: Arcs of the opportunities (see CurrencyNetwork)
+
+        Returns:
+            LinearProgram with one column flow_<FROM>_<TO> per arc
+        """
+        constraints = self.portfolio_constraints
+        currencies = self.registry.currencies
+        num_arcs = len(network)
+        arcs = np.arange(num_arcs)
+        names = network.arc_names()
+        tail_values = network.values[network.tails]
+
+        max_position = np.array(
+            [
+                constraints.max_position_size.get(currency, float("inf"))
+                for currency in currencies
+            ]
+        )
+        builder = LinearProgramBuilder(
+            objective=network.values[network.heads] * network.gains - tail_values,
+            upper_bounds=max_position[network.tails] / tail_values,
+            column_names=[f"flow_{name}" for name in names],
+        )
+
+        # Liquidity: consumption per unit of value, as in build_sparse_model
+        keep = network.liquidity > 0
+        builder.add_rows(
+            np.arange(int(keep.sum())),
+            arcs[keep],
+            (0.1 + network.fees[keep] * 10) * tail_values[keep],
+            network.liquidity[keep],
+            [f"liquidity_{name}" for name, kept in zip(names, keep.tolist()) if kept],
+        )
+
+        # Node balances: -(net change) <= min(0, current - minimum)
+        nodes = network.nodes
+        node_rows = np.full(len(currencies), -1)
+        node_rows[nodes] = np.arange(len(nodes))
+        node_ids, node_arcs, values = network.incidence()
+        rhs, row_names = [], []
+        for currency in (currencies[c] for c in nodes.tolist()):
+            if currency in constraints.min_holdings:
+                current = constraints.initial_balances.get(currency, 0)
+                rhs.append(min(0.0, current - constraints.min_holdings[currency]))
+                row_names.append(f"min_holding_{currency}")
+            else:
+                rhs.append(0.0)
+                row_names.append(f"conservation_{currency}")
+        builder.add_rows(node_rows[node_ids], node_arcs, -values, rhs, row_names)
+
+        # Risk tolerance: limit the value entered, and the value traded to
+        # at most one full cycle per unit entered
+        premium = max(
+            1.0,
+            float(np.max(network.values[network.heads] * network.gains / tail_values)),
+        )
+        legs_per_entry = sum(premium**k for k in range(network.max_legs))
+        total_portfolio_value = sum(constraints.initial_balances.values())
+        entries = arcs[network.entries]
+        builder.add_rows(
+            np.zeros(len(entries), dtype=np.int64),
+            entries,
+            tail_values[entries],
+            [total_portfolio_value * constraints.risk_tolerance],
+            ["total_exposure"],
+        )
+        builder.add_rows(
+            np.zeros(num_arcs, dtype=np.int64),
+            arcs,
+            tail_values * np.where(network.entries, 1.0 - legs_per_entry, 1.0),
+            [0.0],
+            ["leg_budget"],
+        )
+
+        return builder.build()
 
     def _estimate_liquidity_consumption(
         self, opp: ArbitrageOpportunity, pair: str
@@ -213,146 +920,1959 @@ class TriangularArbitrageOptimizer:
 
         return base_factor + fee_adjustment
 
-    def solve(self, opportunities: List[ArbitrageOpportunity]) -> Dict:
+    def solve(
+        self,
+        opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch],
+        builder: str = "auto",
+        backend: Union[str, SolverBackend] = "cbc",
+        time_budget: Optional[float] = None,
+    ) -> Dict:
         """
         Solve the optimization problem
 
         Args:
-            opportunities: List of arbitrage opportunities
+            opportunities: Arbitrage opportunities (list or OpportunityBatch)
+            builder: 'sparse' assembles the model as arrays with
+                build_sparse_model, 'pulp' term by term with
+                create_optimization_problem; 'auto' uses 'sparse' unless some
+                opportunity has more than three legs
+            backend: Solver backend name ('cbc', 'simplex', 'greedy',
+                'decomposition') or instance; the solution's 'solver' entry
+                names the backend that produced it (greedy may fall back).
+                'decomposition' solves one subproblem per base currency in
+                parallel and coordinates them through prices on the shared
+                rows (total exposure, shared pair liquidity)
+            time_budget: Wall-clock budget in seconds for building and
+                solving (None for no limit). When it runs out the best
+                feasible allocation found so far is returned with status
+                'Time Limited Feasible', or the greedy allocation with status
+                'Fallback' if the solver found none. The 'simplex' backend
+                stops exactly at the deadline; CBC applies the limit itself
+                and may overrun it.
 
         Returns:
-            Dictionary containing optimization results
+            Dictionary containing optimization results, including the model
+            build and solve wall-clock times and whether the allocation is
+            proven optimal
         """
-        if not opportunities:
+        if not len(opportunities):
             logger.warning("No arbitrage opportunities provided")
             return {"status": "No opportunities", "investments": {}}
 
-        # Create and solve the problem
-        self.create_optimization_problem(opportunities)
-
-        # Solve using CBC solver (default)
-        logger.info("Solving optimization problem...")
-        status = self.problem.solve()
+        requested, backend = backend, get_backend(backend)
+        use_pulp = isinstance(backend, CBCBackend)
 
-        # Extract results
-        self.solution = {
-            "status": pl.LpStatus[status],
-            "objective_value": pl.value(self.problem.objective),
-            "investments": {},
-            "total_investment": 0,
-            "expected_profit": 0,
-        }
+        if builder == "auto":
+            triangular = isinstance(opportunities, OpportunityBatch) or all(
+                len(opp.currency_path) == 3 for opp in opportunities
+            )
+            builder = "sparse" if triangular else "pulp"
 
-        if status == pl.LpStatusOptimal:
-            for i, opp in enumerate(opportunities):
-                var_name = f"invest_opp_{i}"
-                investment_amount = pl.value(self.variables[var_name])
-
-                if investment_amount > 0.001:  # Only include significant investments
-                    self.solution["investments"][f"opportunity_{i}"] = {
-                        "amount": investment_amount,
-                        "opportunity": opp,
-                        "expected_profit": investment_amount
-                        * opp.expected_profit
-                        * opp.confidence_score,
-                    }
-                    self.solution["total_investment"] += investment_amount
-                    self.solution["expected_profit"] += (
-                        investment_amount * opp.expected_profit * opp.confidence_score
-                    )
+        # Create the problem
+        build_start = time.perf_counter()
+        deadline = None if time_budget is None else build_start + time_budget
+        self.problem, self.model, self.variables = None, None, {}
+        if builder == "sparse":
+            if not isinstance(opportunities, OpportunityBatch):
+                opportunities = OpportunityBatch.from_opportunities(
+                    opportunities, self.registry
+                )
+            self.model = self.build_sparse_model(opportunities)
+            if use_pulp:
+                self.problem, variables = self.model.to_pulp(
+                    "Triangular_Arbitrage_Optimization"
+                )
+                self.variables = {variable.name: variable for variable in variables}
+        elif builder == "pulp":
+            if isinstance(opportunities, OpportunityBatch):
+                opportunities = opportunities.to_list()
+            self.create_optimization_problem(opportunities)
+            if not use_pulp:
+                self.model = LinearProgram.from_pulp(
+                    self.problem, list(self.variables.values())
+                )
+        else:
+            raise ValueError(f"Unknown model builder: {builder}")
+        if self.model is not None:
+            rows = self.model.row_names, self.model.rhs
+        else:
+            rows = self._problem_rows()
+        build_time = time.perf_counter() - build_start
 
-            logger.info(
-                f"Optimization successful. Expected profit: {self.solution['expected_profit']:.4f}"
+        logger.info(f"Solving optimization problem with {backend.name}...")
+        solve_start = time.perf_counter()
+        time_limit = None if deadline is None else deadline - solve_start
+        if time_limit is not None and time_limit <= 0:
+            self.result = LPSolution("Not Solved", np.zeros(len(opportunities)), None)
+        elif use_pulp:
+            self.result = backend.solve_problem(
+                self.problem,
+                list(self.variables.values()),
+                rows[0],
+                time_limit,
+            )
+        elif isinstance(backend, DecompositionBackend):
+            self.result = backend.solve(
+                self.model, time_limit, blocks=self._base_blocks(opportunities)
             )
+            if backend is not requested:
+                # Built for this call only; pass an instance to reuse its pool
+                backend.close()
         else:
-            logger.warning(f"Optimization failed with status: {pl.LpStatus[status]}")
+            self.result = backend.solve(self.model, time_limit)
+
+        if deadline is not None and self.result.status == "Not Solved":
+            if self.model is None:
+                self.model = LinearProgram.from_pulp(
+                    self.problem, list(self.variables.values())
+                )
+            self.result = self._fallback_result(self.model)
+        solve_time = time.perf_counter() - solve_start
 
+        self.solution = self._extract_solution(opportunities, self.result)
+        self.solution.update(self._sensitivity_report(*rows, self.result))
+        self.solution["build_time"] = build_time
+        self.solution["solve_time"] = solve_time
         return self.solution
 
-    def get_execution_plan(self) -> List[Dict]:
+    def solve_column_generation(
+        self,
+        opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch],
+        initial_columns: int = 1000,
+        columns_per_round: Optional[int] = None,
+        max_rounds: int = 50,
+        backend: Union[str, SolverBackend] = "simplex",
+    ) -> Dict:
         """
-        Generate a detailed execution plan for the optimized arbitrage trades
+        Solve over a large candidate pool by column generation
+
+        Starts from the initial_columns best candidates by score, solves the
+        model over this working set, prices every other candidate with the
+        duals of the working model's rows and adds the ones with a positive
+        reduced cost, until none is left. Liquidity capacities are
+        aggregated over the whole pool, so the working model is the full
+        model restricted to the working set and the final allocation is
+        optimal for the pool. Only the working set is ever built.
+
+        Args:
+            opportunities: Candidate pool (list or OpportunityBatch)
+            initial_columns: Size of the initial working set
+            columns_per_round: Candidates added per round, best reduced cost
+                first (initial_columns if None)
+            max_rounds: Limit on solve/price rounds
+            backend: Solver backend; it must report duals
 
         Returns:
-            List of trade execution steps
+            Dictionary as returned by solve, with investments keyed by pool
+            index, plus the number of 'rounds' and the final
+            'working_set_size'. If max_rounds runs out while candidates are
+            still entering, the allocation of the last working set is
+            returned with status 'Time Limited Feasible' and no reduced costs
         """
-        if not self.solution or self.solution["status"] != "Optimal":
-            return []
+        if not len(opportunities):
+            logger.warning("No arbitrage opportunities provided")
+            return {"status": "No opportunities", "investments": {}}
 
-        execution_plan = []
+        backend = get_backend(backend)
+        columns_per_round = columns_per_round or initial_columns
+        batch = (
+            opportunities
+            if isinstance(opportunities, OpportunityBatch)
+            else OpportunityBatch.from_opportunities(opportunities, self.registry)
+        )
+        pair_ids = batch.pair_ids()
+        pair_liquidity = aggregate_liquidity(
+            pair_ids.ravel(),
+            batch.liquidity.ravel(),
+            self.registry.num_pairs,
+            self.liquidity_policy,
+        )
 
-        for opp_id, investment_data in self.solution["investments"].items():
-            opp = investment_data["opportunity"]
-            amount = investment_data["amount"]
+        scores = batch.scores
+        working = np.zeros(len(batch), dtype=bool)
+        if initial_columns >= len(batch):
+            working[:] = True
+        else:
+            working[np.argpartition(-scores, initial_columns - 1)[:initial_columns]] = (
+                True
+            )
 
-            # Generate the three trades for triangular arbitrage
-            trades = [
-                {
-                    "step": 1,
-                    "action": "buy",
-                    "pair": f"{opp.intermediate_currency}/{opp.base_currency}",
-                    "amount": amount,
-                    "expected_rate": opp.exchange_rates.get(
-                        f"{opp.intermediate_currency}/{opp.base_currency}", 0
-                    ),
-                    "fee": opp.transaction_fees.get(
-                        f"{opp.intermediate_currency}/{opp.base_currency}", 0.001
-                    ),
-                },
-                {
-                    "step": 2,
-                    "action": "buy",
-                    "pair": f"{opp.quote_currency}/{opp.intermediate_currency}",
-                    "amount": amount
-                    * opp.exchange_rates.get(
-                        f"{opp.intermediate_currency}/{opp.base_currency}", 1
-                    ),
-                    "expected_rate": opp.exchange_rates.get(
-                        f"{opp.quote_currency}/{opp.intermediate_currency}", 0
-                    ),
-                    "fee": opp.transaction_fees.get(
-                        f"{opp.quote_currency}/{opp.intermediate_currency}", 0.001
-                    ),
-                },
-                {
-                    "step": 3,
-                    "action": "sell",
-                    "pair": f"{opp.quote_currency}/{opp.base_currency}",
-                    "amount": "calculated_from_step_2",
-                    "expected_rate": opp.exchange_rates.get(
-                        f"{opp.quote_currency}/{opp.base_currency}", 0
-                    ),
-                    "fee": opp.transaction_fees.get(
-                        f"{opp.quote_currency}/{opp.base_currency}", 0.001
-                    ),
-                },
-            ]
+        build_time = solve_time = 0.0
+        rounds = 0
+        priced_out = False
+        while rounds < max_rounds:
+            rounds += 1
+            build_start = time.perf_counter()
+            columns = np.flatnonzero(working)
+            self.model = self.build_sparse_model(batch[columns], pair_liquidity)
+            solve_start = time.perf_counter()
+            self.result = backend.solve(self.model)
+            solve_time += time.perf_counter() - solve_start
+            build_time += solve_start - build_start
 
-            execution_plan.append(
-                {
-                    "opportunity_id": opp_id,
-                    "investment_amount": amount,
-                    "trades": trades,
-                    "expected_profit": investment_data["expected_profit"],
-                }
+            if self.result.status != "Optimal":
+                break
+            if self.result.duals is None:
+                raise ValueError(f"Backend {backend.name} does not report duals")
+
+            # Pricing: candidates outside the working set that would improve
+            # the objective
+            reduced = self._reduced_costs(batch, pair_ids, self.model, self.result)
+            if self.result.reduced_costs is not None:
+                reduced[columns] = self.result.reduced_costs
+            entering = np.flatnonzero(
+                (reduced > 1e-9 * max(1.0, scores.max())) & ~working
+            )
+            if not len(entering):
+                priced_out = True
+                break
+            if len(entering) > columns_per_round:
+                entering = entering[
+                    np.argpartition(-reduced[entering], columns_per_round - 1)[
+                        :columns_per_round
+                    ]
+                ]
+            working[entering] = True
+            logger.info(
+                f"Column generation round {rounds}: {len(entering)} columns added"
             )
 
-        return execution_plan
+        x = np.zeros(len(batch))
+        x[columns] = self.result.x
+        if self.result.status == "Optimal" and priced_out:
+            # Reduced costs over the whole pool, from the last pricing
+            self.result = replace(self.result, reduced_costs=reduced)
+        elif self.result.status == "Optimal":
+            # Optimal for the working set only: candidates were still entering
+            logger.warning("Column generation stopped at max_rounds")
+            self.result = replace(self.result, status=TIME_LIMITED, reduced_costs=None)
+        self.result = replace(self.result, x=x)
+        self.problem, self.variables = None, {}
+        self.solution = self._extract_solution(batch, self.result)
+        self.solution.update(
+            self._sensitivity_report(self.model.row_names, self.model.rhs, self.result)
+        )
+        self.solution["build_time"] = build_time
+        self.solution["solve_time"] = solve_time
+        self.solution["rounds"] = rounds
+        self.solution["working_set_size"] = len(columns)
+        return self.solution
 
+    def risk_frontier(
+        self,
+        opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch],
+        risk_range: Tuple[float, float] = (0.0, 1.0),
+        backend: Union[str, SolverBackend] = "simplex",
+        tolerance: float = 1e-7,
+    ) -> Dict:
+        """
+        Efficient frontier of profit against risk tolerance
 
-def calculate_triangular_arbitrage_profit(
-    rate_ab: float,
-    rate_bc: float,
-    rate_ca: float,
-    fees: Tuple[float, float, float] = (0.001, 0.001, 0.001),
-) -> float:
-    """
-    Calculate the expected profit from a triangular arbitrage opportunity
+        The optimal objective is a concave piecewise-linear function of the
+        right-hand side of the total_exposure row, with a breakpoint wherever
+        the optimal basis changes and the row's shadow price as the slope in
+        between. The model is built once; breakpoints are located by
+        intersecting the tangent lines at the ends of an interval (value and
+        shadow price of one solve each) and solving at the intersection: if
+        the value there lies on both tangents it is a breakpoint, otherwise
+        the interval is split. This takes about two solves per segment.
 
-    Args:
-        rate_ab: Exchange rate from currency A to B
-        rate_bc: Exchange rate from currency B to C
-        rate_ca: Exchange rate from currency C to A
+        Args:
+            opportunities: Arbitrage opportunities (list or OpportunityBatch)
+            risk_range: Lowest and highest risk tolerance of the curve
+            backend: Solver backend; it must report duals
+            tolerance: Relative tolerance of the breakpoint test
+
+        Returns:
+            Dictionary with the breakpoint 'risk_tolerance', 'max_exposure',
+            'objective_value' and optimal 'allocations' (one row per
+            breakpoint; allocations between two breakpoints are the linear
+            interpolation), the 'marginal_profit' per unit of exposure on
+            every segment and the number of 'solves'
+        """
+        backend = get_backend(backend)
+        _, model = self._build_model(opportunities)
+        row = model.row_names.index("total_exposure")
+        portfolio_value = sum(self.portfolio_constraints.initial_balances.values())
+        points = {}
+
+        def evaluate(risk: float) -> Tuple[float, float]:
+            """Objective and its slope (per unit of risk tolerance) at risk"""
+            rhs = model.rhs.copy()
+            rhs[row] = portfolio_value * risk
+            result = backend.solve(replace(model, rhs=rhs))
+            if result.status != "Optimal":
+                raise ValueError(
+                    f"Risk tolerance {risk:g} could not be solved: {result.status}"
+                )
+            if result.duals is None:
+                raise ValueError(f"Backend {backend.name} does not report duals")
+            slope = float(result.duals[row]) * portfolio_value
+            points[risk] = (result.objective_value, slope, result.x)
+            return result.objective_value, slope
+
+        low, high = risk_range
+        pending = [(low, *evaluate(low), high, *evaluate(high))]
+        while pending:
+            left, left_value, left_slope, right, right_value, right_slope = (
+                pending.pop()
+            )
+            if left_slope - right_slope <= tolerance * max(1.0, abs(left_slope)):
+                continue  # Same slope: linear between left and right
+
+            # Intersection of the tangent lines at both ends
+            middle = (
+                right_value - left_value + left_slope * left - right_slope * right
+            ) / (left_slope - right_slope)
+            if not left < middle < right:
+                continue
+            bound = left_value + left_slope * (middle - left)
+            value, slope = evaluate(middle)
+            if bound - value <= tolerance * max(1.0, abs(bound)):
+                continue  # The tangents meet on the curve: a breakpoint
+            pending.append((left, left_value, left_slope, middle, value, slope))
+            pending.append((middle, value, slope, right, right_value, right_slope))
+
+        # Keep the ends and the points where the slope changes
+        risks = sorted(points)
+        values = np.array([points[risk][0] for risk in risks])
+        risks = np.array(risks)
+        slopes = np.diff(values) / np.maximum(np.diff(risks), 1e-300)
+        keep = np.ones(len(risks), dtype=bool)
+        keep[1:-1] = np.abs(np.diff(slopes)) > tolerance * np.maximum(
+            1.0, np.abs(slopes[1:])
+        )
+        risks, values = risks[keep], values[keep]
+
+        return {
+            "risk_tolerance": risks,
+            "max_exposure": risks * portfolio_value,
+            "objective_value": values,
+            "allocations": np.array([points[risk][2] for risk in risks.tolist()]),
+            "marginal_profit": np.diff(values)
+            / np.maximum(np.diff(risks) * portfolio_value, 1e-300),
+            "solves": len(points),
+        }
+
+    def solve_stochastic(
+        self,
+        opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch],
+        scenarios: np.ndarray,
+        risk_measure: str = "expected",
+        alpha: float = 0.05,
+        risk_weight: float = 0.5,
+        backend: Union[str, SolverBackend] = "cbc",
+        max_rounds: int = 50,
+        tolerance: float = 1e-9,
+    ) -> Dict:
+        """
+        Two-stage stochastic allocation over sampled market scenarios
+
+        The investments are chosen first, subject to the usual constraints;
+        each of the S equally likely scenarios then realizes the profit
+        scenarios[s] @ x (see FakeArbitrageAnalyzer.generate_profit_scenarios).
+        'expected' maximizes the mean scenario profit. 'cvar' maximizes
+        (1 - risk_weight) * mean + risk_weight * CVaR, where CVaR is the mean
+        profit of the worst alpha share of scenarios, written as the maximum
+        over eta of eta - E[(eta - profit)+] / alpha.
+
+        The CVaR needs a shortfall column and row per scenario, but only the
+        scenarios that end up below eta matter. Those rows are generated
+        lazily: the LP is solved over a working set (at first the tail of
+        the expected-profit allocation), the scenarios furthest below eta
+        outside of it are added, and the loop stops once there are none. The
+        LP then has a small multiple of alpha * S scenario rows rather than
+        S, and the rest of the scenario work is matrix-vector products over
+        the (S, N) array.
+
+        Args:
+            opportunities: Arbitrage opportunities (list or OpportunityBatch)
+            scenarios: (S, N) realized profit per unit invested
+            risk_measure: 'expected' or 'cvar'
+            alpha: Tail probability of the CVaR
+            risk_weight: Weight of the CVaR against the mean
+            backend: Solver backend; the scenario rows are dense, which
+                suits CBC better than the NumPy simplex
+            max_rounds: Limit on scenario generation rounds
+            tolerance: Shortfall below which a scenario is not added
+
+        Returns:
+            Dictionary as returned by solve, plus the 'num_scenarios', the
+            'scenario_expected_profit', 'value_at_risk' and 'cvar' of the
+            allocation, the generation 'rounds', the number of
+            'active_scenarios' in the final LP and the build and solve times
+        """
+        if risk_measure not in ("expected", "cvar"):
+            raise ValueError(f"Unknown risk measure: {risk_measure}")
+        backend = get_backend(backend)
+
+        build_start = time.perf_counter()
+        opportunities, model = self._build_model(opportunities)
+        scenarios = np.asarray(scenarios, dtype=float)
+        num_scenarios, n = scenarios.shape
+        if n != model.num_columns:
+            raise ValueError("Scenarios must have one column per opportunity")
+        mean = scenarios.mean(axis=0)
+        build_time = time.perf_counter() - build_start
+
+        solve_start = time.perf_counter()
+        self.result = backend.solve(replace(model, objective=mean))
+        rounds, active = 0, 0
+        if risk_measure == "cvar" and self.result.status == "Optimal":
+            self.result, rounds, active = self._solve_cvar(
+                model,
+                scenarios,
+                alpha,
+                risk_weight,
+                backend,
+                self.result.x,
+                max_rounds,
+                tolerance,
+            )
+        solve_time = time.perf_counter() - solve_start
+
+        self.model, self.problem, self.variables = model, None, {}
+        self.solution = self._extract_solution(opportunities, self.result)
+        profits = scenarios @ self.result.x
+        value_at_risk, cvar = _cvar(profits, alpha)
+        self.solution.update(
+            {
+                "num_scenarios": num_scenarios,
+                "scenario_expected_profit": float(profits.mean()),
+                "value_at_risk": value_at_risk,
+                "cvar": cvar,
+                "rounds": rounds,
+                "active_scenarios": active,
+                "build_time": build_time,
+                "solve_time": solve_time,
+            }
+        )
+        return self.solution
+
+    def _solve_cvar(
+        self,
+        model: LinearProgram,
+        scenarios: np.ndarray,
+        alpha: float,
+        weight: float,
+        backend: SolverBackend,
+        start: np.ndarray,
+        max_rounds: int,
+        tolerance: float,
+    ) -> Tuple[LPSolution, int, int]:
+        """
+        Scenario generation loop of solve_stochastic for the CVaR objective
+
+        Columns are x, eta + L and one shortfall per working scenario, where
+        L bounds any scenario loss so that the shifted threshold is
+        nonnegative. Scenario s contributes the row
+        eta + L - scenarios[s] @ x - shortfall_s <= L. Leaving a scenario out
+        assumes it has no shortfall, so every round is a relaxation and the
+        first one with no scenario below eta outside the set is optimal.
+
+        Args:
+            start: Allocation whose tail seeds the working set
+
+        Returns:
+            Tuple (result over the x columns, rounds, working set size)
+        """
+        num_scenarios, n = scenarios.shape
+        exposure = model.rhs[model.row_names.index("total_exposure")]
+        loss_bound = max(0.0, -float(scenarios.min())) * exposure
+        mean = scenarios.mean(axis=0)
+
+        tail = int(np.ceil(alpha * num_scenarios))
+        working = np.zeros(num_scenarios, dtype=bool)
+        working[np.argsort(scenarios @ start)[: 2 * tail]] = True
+        missed = working.copy()
+        for rounds in range(1, max_rounds + 1):
+            members = np.flatnonzero(working)
+            size = len(members)
+            builder = LinearProgramBuilder(
+                np.concatenate(
+                    [
+                        (1 - weight) * mean,
+                        [weight],
+                        np.full(size, -weight / (alpha * num_scenarios)),
+                    ]
+                ),
+                upper_bounds=np.concatenate(
+                    [model.upper_bounds, np.full(1 + size, np.inf)]
+                ),
+                column_names=model.column_names
+                + ["cvar_threshold"]
+                + [f"shortfall_{s}" for s in members.tolist()],
+            )
+            builder.add_rows(
+                model.row_indices,
+                model.column_indices,
+                model.values,
+                model.rhs,
+                model.row_names,
+            )
+            rows, columns = np.nonzero(scenarios[members])
+            local = np.arange(size)
+            builder.add_rows(
+                np.concatenate([rows, local, local]),
+                np.concatenate([columns, np.full(size, n), n + 1 + local]),
+                np.concatenate(
+                    [-scenarios[members][rows, columns], np.ones(size), -np.ones(size)]
+                ),
+                np.full(size, loss_bound),
+                [f"scenario_{s}" for s in members.tolist()],
+            )
+            result = backend.solve(builder.build())
+            if result.status != "Optimal":
+                break
+
+            x = result.x[:n]
+            eta = result.x[n] - loss_bound
+            shortfall = np.where(working, 0.0, eta - scenarios @ x)
+            missed = shortfall > tolerance
+            if not missed.any():
+                break
+
+            # Add the scenarios furthest below eta, at most twice the tail
+            added = np.argsort(-shortfall)[: min(2 * tail, int(missed.sum()))]
+            working[added] = True
+
+        x = result.x[:n]
+        if result.status == "Optimal" and missed.any():
+            status = TIME_LIMITED  # Feasible, optimality not proven
+        else:
+            status = result.status
+        return (
+            replace(
+                result,
+                status=status,
+                x=x,
+                objective_value=(
+                    None
+                    if result.objective_value is None
+                    else (1 - weight) * float(mean @ x)
+                    + weight * _cvar(scenarios @ x, alpha)[1]
+                ),
+                duals=None,
+                reduced_costs=None,
+                slacks=None,
+            ),
+            rounds,
+            size,
+        )
+
+    def scenario_budget(
+        self,
+        opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch],
+        sample_scenarios: Callable[[OpportunityBatch, int], np.ndarray],
+        scenario_counts: Iterable[int] = (100, 500, 1000, 5000),
+        **kwargs,
+    ) -> List[Dict]:
+        """
+        Solve time and solution quality of solve_stochastic against S
+
+        Args:
+            opportunities: Arbitrage opportunities (list or OpportunityBatch)
+            sample_scenarios: Draws (S, N) scenarios for the opportunities,
+                e.g. FakeArbitrageAnalyzer.generate_profit_scenarios
+            scenario_counts: Scenario counts S to try
+            **kwargs: Passed on to solve_stochastic
+
+        Returns:
+            One dictionary per S with 'num_scenarios', 'sampling_time',
+            'solve_time', 'objective_value', 'cvar', 'rounds' and
+            'active_scenarios'
+        """
+        opportunities, _ = self._build_model(opportunities)
+        report = []
+        for num_scenarios in scenario_counts:
+            sampling_start = time.perf_counter()
+            scenarios = sample_scenarios(opportunities, num_scenarios)
+            sampling_time = time.perf_counter() - sampling_start
+            solution = self.solve_stochastic(opportunities, scenarios, **kwargs)
+            report.append(
+                {
+                    "num_scenarios": num_scenarios,
+                    "sampling_time": sampling_time,
+                    "solve_time": solution["solve_time"],
+                    "objective_value": solution["objective_value"],
+                    "cvar": solution["cvar"],
+                    "rounds": solution["rounds"],
+                    "active_scenarios": solution["active_scenarios"],
+                }
+            )
+            logger.info(
+                f"{num_scenarios} scenarios: solved in {solution['solve_time']:.3f}s "
+                f"({solution['active_scenarios']} active scenarios)"
+            )
+        return report
+
+    def solve_with_slippage(
+        self,
+        opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch],
+        impact: float = 1.0,
+        initial_segments: int = 4,
+        max_refinements: int = 30,
+        tolerance: float = 1e-4,
+        backend: Union[str, SolverBackend] = "simplex",
+    ) -> Dict:
+        """
+        Solve with convex slippage on every traded pair
+
+        Every leg trades the invested amount through its pair, and all legs
+        on a pair walk the same book: a flow q through a pair of liquidity
+        depth D moves its price linearly and costs impact * q**2 / (2 * D).
+        The cost is modeled with segment columns per pair whose slopes are
+        the secants between breakpoints, so the LP stays linear and fills
+        the cheap segments first. Breakpoints start on a coarse grid over
+        [0, maximum exposure] and are refined only next to the current flow
+        of each pair, until the secant error around every flow is within
+        tolerance of the profit. If a refinement fails to solve, the last
+        refinement that did is kept.
+
+        Args:
+            opportunities: Arbitrage opportunities (list or OpportunityBatch)
+            impact: Price impact of trading the whole depth of a pair
+            initial_segments: Segments per pair before refinement
+            max_refinements: Limit on refinement rounds
+            tolerance: Relative tolerance of the slippage approximation
+            backend: Solver backend
+
+        Returns:
+            Dictionary as returned by solve, with the investments' profit
+            after slippage, their 'slippage' and the total 'slippage_cost',
+            the number of 'refinements' and of slippage 'segments' in the
+            model of the kept allocation, and whether the approximation
+            'converged' to tolerance within max_refinements
+        """
+        backend = get_backend(backend)
+
+        build_start = time.perf_counter()
+        opportunities, model = self._build_model(opportunities)
+        n = model.num_columns
+        legs_opp, leg_pairs, leg_liquidity = self._leg_pairs(opportunities)
+        pairs, pair_rows = np.unique(leg_pairs, return_inverse=True)
+        depth = aggregate_liquidity(
+            pair_rows, leg_liquidity, len(pairs), self.liquidity_policy
+        )
+        modeled = depth > 0
+        kept_rows = np.cumsum(modeled) - 1
+        legs = modeled[pair_rows]
+        legs_opp, flow_rows = legs_opp[legs], kept_rows[pair_rows[legs]]
+        pairs, depth = pairs[modeled], depth[modeled]
+        pair_names = [
+            self.registry.pair_key(p).replace("/", "_") for p in pairs.tolist()
+        ]
+        curvature = impact / (2 * depth)  # Cost of a flow q is curvature * q**2
+
+        exposure = model.rhs[model.row_names.index("total_exposure")]
+        breakpoints = [
+            np.linspace(0.0, exposure, initial_segments + 1) for _ in pair_names
+        ]
+        build_time = time.perf_counter() - build_start
+
+        solve_start = time.perf_counter()
+        kept = None
+        for refinements in range(max_refinements + 1):
+            widths = np.concatenate([np.diff(b) for b in breakpoints])
+            slopes = np.concatenate(
+                [c * (b[1:] + b[:-1]) for c, b in zip(curvature, breakpoints)]
+            )
+            segment_pairs = np.repeat(
+                np.arange(len(pairs)), [len(b) - 1 for b in breakpoints]
+            )
+            builder = LinearProgramBuilder(
+                np.concatenate([model.objective, -slopes]),
+                upper_bounds=np.concatenate([model.upper_bounds, widths]),
+                column_names=model.column_names
+                + [
+                    f"slippage_{pair_names[p]}_{k}"
+                    for p, b in enumerate(breakpoints)
+                    for k in range(len(b) - 1)
+                ],
+            )
+            builder.add_rows(
+                model.row_indices,
+                model.column_indices,
+                model.values,
+                model.rhs,
+                model.row_names,
+            )
+            # Flow through a pair is covered by its segments
+            builder.add_rows(
+                np.concatenate([flow_rows, segment_pairs]),
+                np.concatenate([legs_opp, n + np.arange(len(widths))]),
+                np.concatenate([np.ones(len(legs_opp)), -np.ones(len(widths))]),
+                np.zeros(len(pairs)),
+                [f"slippage_{name}" for name in pair_names],
+            )
+            result = backend.solve(builder.build())
+            if result.status != "Optimal":
+                # Keep the last refinement that solved
+                break
+
+            x = result.x[:n]
+            flow = np.bincount(flow_rows, weights=x[legs_opp], minlength=len(pairs))
+            cost = float(curvature @ flow**2)
+            profit = float(model.objective @ x) - cost
+
+            # Largest secant error, curvature * width**2 / 4, of the segments
+            # next to each flow; refine by splitting them at their midpoints
+            # and at the flow itself
+            errors = np.zeros(len(pairs))
+            splits = []
+            for p, (b, q) in enumerate(zip(breakpoints, flow.tolist())):
+                # Solver round-off can leave a flow just outside the grid
+                q = min(max(q, b[0]), b[-1])
+                k = int(np.searchsorted(b, q))
+                if k < len(b) and b[k] - q <= 1e-9 * max(1.0, q):
+                    adjacent = [s for s in (k - 1, k) if 0 <= s < len(b) - 1]
+                    points = []
+                else:
+                    adjacent = [k - 1]
+                    points = [q]
+                errors[p] = max(
+                    curvature[p] * (b[s + 1] - b[s]) ** 2 / 4 for s in adjacent
+                )
+                splits.append(points + [(b[s] + b[s + 1]) / 2 for s in adjacent])
+
+            allowed = tolerance * max(1.0, abs(profit))
+            converged = errors.sum() <= allowed
+            kept = result, x, flow, cost, profit, refinements, len(widths), converged
+            if converged or refinements == max_refinements:
+                break
+            for p in np.flatnonzero(errors > allowed / len(pairs)).tolist():
+                breakpoints[p] = np.union1d(breakpoints[p], splits[p])
+
+        if kept is not None:
+            result, x, flow, cost, profit, refinements, segments, converged = kept
+            leg_cost = curvature[flow_rows] * flow[flow_rows]
+            slippage = np.bincount(legs_opp, weights=leg_cost, minlength=n) * x
+            self.result = replace(
+                result,
+                x=x,
+                objective_value=profit,
+                duals=None,
+                reduced_costs=None,
+                slacks=None,
+            )
+        else:
+            self.result = replace(result, x=np.zeros(n), duals=None)
+            slippage, cost, segments, converged = np.zeros(n), 0.0, len(widths), False
+        solve_time = time.perf_counter() - solve_start
+
+        self.model, self.problem, self.variables = model, None, {}
+        self.solution = self._extract_solution(opportunities, self.result)
+        for key, investment in self.solution["investments"].items():
+            i = int(key.rsplit("_", 1)[1])
+            investment["slippage"] = float(slippage[i])
+            investment["expected_profit"] -= float(slippage[i])
+            self.solution["expected_profit"] -= float(slippage[i])
+        self.solution.update(
+            {
+                "slippage_cost": cost,
+                "refinements": refinements,
+                "segments": segments,
+                "converged": converged,
+                "build_time": build_time,
+                "solve_time": solve_time,
+            }
+        )
+        return self.solution
+
+    def solve_network(
+        self,
+        opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch],
+        backend: Union[str, SolverBackend] = "cbc",
+        numeraire: Optional[str] = None,
+    ) -> Dict:
+        """
+        Solve the flow formulation over the legs of the opportunities
+
+        Unlike solve, the allocation is not per opportunity: the solver may
+        combine legs of different opportunities into any profitable cycle
+        of the network. See build_network_model. Arcs merge the quotes of
+        every opportunity trading them, so the opportunities should come
+        from one consistent set of quotes, e.g. the cycles of a
+        MarketSnapshot.
+
+        Args:
+            opportunities: Arbitrage opportunities (list or OpportunityBatch)
+            backend: Solver backend
+            numeraire: Currency the gain is expressed in (the most common
+                base currency if None)
+
+        Returns:
+            Dictionary with the 'status', 'objective_value' (gain in
+            numeraire units), 'solver', 'proven_optimal', the significant arc
+            'flows' (in units of the currency sold) keyed FROM_TO, the
+            'net_changes' per currency, the 'total_traded' value, the
+            sensitivity report (reduced costs keyed like the flows) and the
+            build and solve times
+        """
+        if not len(opportunities):
+            logger.warning("No arbitrage opportunities provided")
+            return {"status": "No opportunities", "flows": {}}
+
+        backend = get_backend(backend)
+
+        build_start = time.perf_counter()
+        self.network = CurrencyNetwork.from_opportunities(
+            opportunities, self.registry, self.liquidity_policy, numeraire
+        )
+        self.model = self.build_network_model(self.network)
+        self.problem, self.variables = None, {}
+        build_time = time.perf_counter() - build_start
+
+        solve_start = time.perf_counter()
+        self.result = backend.solve(self.model)
+        solve_time = time.perf_counter() - solve_start
+
+        network, result = self.network, self.result
+        names = network.arc_names()
+        self.solution = {
+            "status": result.status,
+            "objective_value": result.objective_value,
+            "solver": result.solver,
+            "proven_optimal": result.status == "Optimal",
+            "flows": {},
+            "net_changes": {},
+            "total_traded": 0,
+        }
+        if result.status in FEASIBLE_STATUSES:
+            flows = result.x
+            self.solution["flows"] = {
+                names[a]: float(flows[a])
+                for a in np.flatnonzero(flows > 0.001).tolist()
+            }
+            changes = network.net_changes(flows)
+            self.solution["net_changes"] = {
+                self.registry.currencies[c]: float(changes[c])
+                for c in network.nodes.tolist()
+            }
+            self.solution["total_traded"] = float(network.values[network.tails] @ flows)
+            logger.info(
+                f"Network optimization successful. Gain: {result.objective_value:.4f}"
+            )
+        else:
+            logger.warning(f"Optimization failed with status: {result.status}")
+
+        report = self._sensitivity_report(
+            self.model.row_names, self.model.rhs, replace(result, reduced_costs=None)
+        )
+        if result.reduced_costs is not None:
+            report["reduced_costs"] = dict(zip(names, result.reduced_costs.tolist()))
+        self.solution.update(report)
+        self.solution["build_time"] = build_time
+        self.solution["solve_time"] = solve_time
+        return self.solution
+
+    def solve_milp(
+        self,
+        opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch],
+        min_order: Union[float, Dict[str, float]] = 0.0,
+        fixed_fee: Union[float, Dict[str, float]] = 0.0,
+        backend: Union[str, SolverBackend] = "simplex",
+        mip_backend: Optional[Union[str, CBCBackend]] = "cbc",
+        time_budget: Optional[float] = None,
+        max_repairs: int = 20,
+    ) -> Dict:
+        """
+        Solve with minimum order sizes and fixed per-trade fees
+
+        Every opportunity gets an on/off column trade_opp_{i}. An opportunity
+        that trades invests at least the minimum order of its base currency
+        and pays the fixed fee once per leg (withdrawal and network fees):
+        min_order * z_i <= x_i <= u_i * z_i, where u_i is the tightest bound
+        on x_i implied by its position limit or by a single row with
+        nonnegative coefficients. With this u_i the LP relaxation is the
+        plain model with every profit lowered by fee / u_i, so it is solved
+        on the original columns.
+
+        A rounding-and-repair heuristic (see _round_and_repair) turns the
+        relaxation into an incumbent in a few LP solves. The relaxation's
+        row prices then bound the value of trading each opportunity, and
+        only those that could beat the incumbent go to branch-and-bound in
+        CBC, warm-started from the incumbent and stopped at the time budget.
+        The fixing needs a backend that reports duals ('simplex', 'cbc').
+
+        Args:
+            opportunities: Arbitrage opportunities (list or OpportunityBatch)
+            min_order: Minimum investment of a trading opportunity, in units
+                of its base currency; one value or a dict by base currency
+            fixed_fee: Fixed cost of every leg, in units of the base
+                currency; one value or a dict by base currency
+            backend: Solver backend of the relaxation and the repair LPs
+            mip_backend: CBC backend for branch-and-bound ('cbc' or an
+                instance); None returns the heuristic incumbent
+            time_budget: Wall-clock budget in seconds for building and
+                solving (None for no limit). When it runs out the best
+                incumbent is returned with status 'Time Limited Feasible'
+            max_repairs: Limit on the LP solves of the heuristic
+
+        Returns:
+            Dictionary as returned by solve, with the investments' profit net
+            of fixed fees and their 'fixed_fee', plus the total
+            'fixed_fees', the number of 'trades', the relaxation 'bound', the
+            relative 'gap' to it, the 'heuristic_objective', the number of
+            'binaries' left to branch-and-bound after reduced-cost fixing,
+            and the heuristic, build and solve times. An incumbent that is not proven
+            optimal by CBC or by attaining the bound has status
+            'Time Limited Feasible'
+        """
+        if not len(opportunities):
+            logger.warning("No arbitrage opportunities provided")
+            return {"status": "No opportunities", "investments": {}}
+
+        backend = get_backend(backend)
+        if mip_backend is not None:
+            mip_backend = get_backend(mip_backend)
+            if not isinstance(mip_backend, CBCBackend):
+                raise ValueError(f"Branch-and-bound needs CBC, not {mip_backend.name}")
+
+        build_start = time.perf_counter()
+        deadline = None if time_budget is None else build_start + time_budget
+
+        def remaining() -> Optional[float]:
+            if deadline is None:
+                return None
+            return max(deadline - time.perf_counter(), 0.0)
+
+        opportunities, lp = self._build_model(opportunities)
+        n = lp.num_columns
+        if isinstance(opportunities, OpportunityBatch):
+            legs = np.full(n, 3)
+        else:
+            legs = np.array([len(opp.currency_path) for opp in opportunities])
+        minimum = self._base_values(opportunities, min_order)
+        fee = self._base_values(opportunities, fixed_fee) * legs
+
+        # Big-M of the on/off rows: column bounds tightened by every row
+        # whose coefficients are all nonnegative
+        row_min = np.full(lp.num_rows, np.inf)
+        np.minimum.at(row_min, lp.row_indices, lp.values)
+        entries = (lp.values > 0) & (row_min[lp.row_indices] >= 0)
+        capacity = lp.upper_bounds.copy()
+        np.minimum.at(
+            capacity,
+            lp.column_indices[entries],
+            np.maximum(lp.rhs[lp.row_indices[entries]], 0.0) / lp.values[entries],
+        )
+        if np.any(np.isinf(capacity)):
+            raise ValueError("Every opportunity needs a finite position limit")
+
+        # Opportunities that cannot place the minimum order or recover their
+        # fees stay off
+        tradable = (capacity >= minimum) & (lp.objective * capacity > fee)
+        capacity = np.where(tradable, capacity, 0.0)
+        on = np.flatnonzero(tradable)
+        k = len(on)
+
+        builder = LinearProgramBuilder(
+            objective=np.concatenate([lp.objective, -fee]),
+            upper_bounds=np.concatenate([capacity, tradable.astype(float)]),
+            column_names=lp.column_names + [f"trade_opp_{i}" for i in range(n)],
+            integer_columns=np.arange(2 * n) >= n,
+        )
+        builder.add_rows(
+            lp.row_indices, lp.column_indices, lp.values, lp.rhs, lp.row_names
+        )
+        builder.add_rows(
+            np.repeat(np.arange(k), 2),
+            np.column_stack([on, n + on]).ravel(),
+            np.column_stack([np.ones(k), -capacity[on]]).ravel(),
+            np.zeros(k),
+            [f"activate_opp_{i}" for i in on.tolist()],
+        )
+        ordered = on[minimum[on] > 0]
+        builder.add_rows(
+            np.repeat(np.arange(len(ordered)), 2),
+            np.column_stack([n + ordered, ordered]).ravel(),
+            np.column_stack([minimum[ordered], -np.ones(len(ordered))]).ravel(),
+            np.zeros(len(ordered)),
+            [f"min_order_opp_{i}" for i in ordered.tolist()],
+        )
+        model = builder.build()
+        build_time = time.perf_counter() - build_start
+
+        # Relaxation on the original columns, then rounding and repair
+        solve_start = time.perf_counter()
+        lowered = lp.objective - np.divide(
+            fee, capacity, out=np.zeros(n), where=tradable
+        )
+        relaxation = backend.solve(
+            replace(lp, objective=lowered, upper_bounds=capacity), remaining()
+        )
+        bound = None
+        usage = np.zeros(n)
+        if relaxation.status in FEASIBLE_STATUSES:
+            if relaxation.status == "Optimal":
+                bound = float(relaxation.objective_value)
+            np.divide(relaxation.x, capacity, out=usage, where=tradable)
+
+        # Round up the relaxation's support, and repair it closing first the
+        # least used opportunities, or the least valuable ones on their own
+        support = usage > 1e-9
+        x, _ = max(
+            (
+                self._round_and_repair(
+                    lp,
+                    minimum,
+                    fee,
+                    capacity,
+                    support,
+                    priority,
+                    backend,
+                    max_repairs,
+                    deadline,
+                )
+                for priority in (usage, lp.objective * capacity - fee)
+            ),
+            key=lambda repaired: repaired[1],
+        )
+        incumbent = np.concatenate([x, (x > 0).astype(float)])
+        heuristic_objective = float(model.objective @ incumbent)
+        heuristic_time = time.perf_counter() - solve_start
+
+        # Investing nothing is the heuristic's last resort; it is only
+        # feasible if every right-hand side is nonnegative
+        slacks = model.rhs - model.activity(incumbent)
+        feasible = bool(np.all(slacks >= -1e-6 * np.maximum(1.0, np.abs(model.rhs))))
+
+        # Reduced-cost fixing: for row prices y >= 0 and r = c - A^T y, an
+        # allocation trading opportunity j is worth at most
+        # L(y) - max(0, r_j u_j - F_j) + max(r_j m_j, r_j u_j) - F_j, with
+        # L(y) the Lagrangian bound. Opportunities that cannot beat the
+        # incumbent are left out of branch-and-bound
+        candidates = tradable.copy()
+        if relaxation.status in FEASIBLE_STATUSES and relaxation.duals is not None:
+            prices = np.maximum(relaxation.duals, 0.0)
+            reduced = lp.objective - np.bincount(
+                lp.column_indices,
+                weights=lp.values * prices[lp.row_indices],
+                minlength=n,
+            )
+            gain = np.maximum(reduced * capacity - fee, 0.0)
+            lagrangian = float(prices @ lp.rhs + gain.sum())
+            bound = lagrangian if bound is None else min(bound, lagrangian)
+            trading_bound = (
+                lagrangian
+                - gain
+                + np.maximum(reduced * minimum, reduced * capacity)
+                - fee
+            )
+            if feasible:
+                threshold = heuristic_objective + 1e-9 * max(
+                    1.0, abs(heuristic_objective)
+                )
+                candidates &= (trading_bound > threshold) | (x > 0)
+
+        proven = (
+            feasible
+            and bound is not None
+            and bound - heuristic_objective <= 1e-9 * max(1.0, abs(bound))
+        )
+        if relaxation.status == "Infeasible":
+            status = "Infeasible"
+        elif not feasible:
+            status = "Not Solved"
+        else:
+            status = "Optimal" if proven else TIME_LIMITED
+        result = LPSolution(
+            status=status,
+            x=incumbent if feasible else np.zeros(2 * n),
+            objective_value=heuristic_objective if feasible else None,
+            slacks=slacks,
+            solver="rounding",
+        )
+
+        time_limit = remaining()
+        binaries = 0
+        if (
+            mip_backend is not None
+            and status in (TIME_LIMITED, "Not Solved")
+            and time_limit != 0.0
+        ):
+            binaries = int(candidates.sum())
+            logger.info(
+                f"Branch-and-bound over {binaries} of {k} binaries "
+                f"with {mip_backend.name}"
+            )
+            columns = np.flatnonzero(np.concatenate([candidates, candidates]))
+            kept = np.zeros(2 * n, dtype=bool)
+            kept[columns] = True
+            rows = np.unique(model.row_indices[kept[model.column_indices]])
+            problem, variables = model.restrict(rows, columns).to_pulp("Arbitrage_MILP")
+            mip = mip_backend.solve_problem(
+                problem,
+                variables,
+                time_limit=time_limit,
+                initial_values=incumbent[columns] if feasible else None,
+            )
+            if mip.status in FEASIBLE_STATUSES and (
+                not feasible
+                or mip.objective_value
+                >= heuristic_objective - 1e-6 * max(1.0, abs(heuristic_objective))
+            ):
+                mip_x = np.zeros(2 * n)
+                mip_x[columns] = mip.x
+                trades = np.round(mip_x[n:])
+                mip_x = np.concatenate([np.where(trades > 0, mip_x[:n], 0.0), trades])
+                result = replace(
+                    mip,
+                    x=mip_x,
+                    objective_value=float(model.objective @ mip_x),
+                    slacks=model.rhs - model.activity(mip_x),
+                    reduced_costs=None,
+                )
+                if mip.status == "Optimal":
+                    bound = result.objective_value
+            elif mip.status == "Infeasible":
+                result = replace(result, status=mip.status, solver=mip.solver)
+        solve_time = time.perf_counter() - solve_start
+
+        self.model, self.problem, self.variables = model, None, {}
+        self.result = result
+        self.solution = self._extract_solution(
+            opportunities, replace(result, x=result.x[:n])
+        )
+        trading = result.x[n:] > 0.5
+        for key, investment in self.solution["investments"].items():
+            i = int(key.rsplit("_", 1)[1])
+            investment["fixed_fee"] = float(fee[i])
+            investment["expected_profit"] -= float(fee[i])
+            self.solution["expected_profit"] -= float(fee[i])
+        objective = result.objective_value
+        self.solution.update(
+            {
+                "fixed_fees": float(fee[trading].sum()),
+                "trades": int(trading.sum()),
+                "binaries": binaries,
+                "bound": bound,
+                "gap": (
+                    None
+                    if bound is None or objective is None
+                    else max(bound - objective, 0.0) / max(abs(bound), 1e-9)
+                ),
+                "heuristic_objective": heuristic_objective if feasible else None,
+                "heuristic_time": heuristic_time,
+                "build_time": build_time,
+                "solve_time": solve_time,
+            }
+        )
+        return self.solution
+
+    def _round_and_repair(
+        self,
+        model: LinearProgram,
+        minimum: np.ndarray,
+        fee: np.ndarray,
+        capacity: np.ndarray,
+        is_open: np.ndarray,
+        priority: np.ndarray,
+        backend: SolverBackend,
+        max_repairs: int,
+        deadline: Optional[float],
+    ) -> Tuple[np.ndarray, float]:
+        """
+        Rounding-and-repair heuristic of solve_milp
+
+        Solves the LP over the open opportunities with each shifted to its
+        minimum order. Before every solve, the lowest priority opportunities
+        of each row overfilled by the open minimum orders are closed; after
+        it, those that do not recover their fixed fee. If the LP is still
+        infeasible the lowest priority opportunity is closed. The row
+        activity of the open minimum orders is updated as opportunities are
+        closed, from their columns only.
+
+        Args:
+            model: LP over the opportunities (no on/off columns)
+            minimum: Minimum order of every opportunity
+            fee: Fixed fee of every opportunity
+            capacity: Upper bound of every opportunity (0 if it cannot trade)
+            is_open: Mask of the opportunities opened by rounding
+            priority: Priority of every opportunity, lowest closed first
+            backend: Solver backend of the repair LPs
+            max_repairs: Limit on the LP solves
+            deadline: perf_counter time to stop at (None for no limit)
+
+        Returns:
+            Tuple (x, value) of the best allocation found, net of fixed fees;
+            trading opportunities are the nonzero ones (zero if no repaired
+            allocation beats investing nothing)
+        """
+        n = model.num_columns
+        best_x, best_value = np.zeros(n), 0.0
+        is_open = is_open.copy()
+        indptr, indices, data = model.to_csr()
+        column_ptr, column_rows, column_data = model.to_csc()
+        all_rows = np.arange(model.num_rows)
+        tolerance = 1e-9 * np.maximum(1.0, np.abs(model.rhs))
+        floor_activity = model.activity(np.where(is_open, minimum, 0.0))
+
+        def close(columns: np.ndarray):
+            """Close open opportunities and remove their minimum orders"""
+            columns = columns[is_open[columns]]
+            is_open[columns] = False
+            starts = column_ptr[columns]
+            lengths = column_ptr[columns + 1] - starts
+            entries = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            entries += np.arange(len(entries))
+            np.subtract.at(
+                floor_activity,
+                column_rows[entries],
+                column_data[entries] * np.repeat(minimum[columns], lengths),
+            )
+
+        for _ in range(max_repairs):
+            if not np.any(is_open):
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+            excess = floor_activity - model.rhs
+            for row in np.flatnonzero(excess > tolerance).tolist():
+                overflow = floor_activity[row] - model.rhs[row]
+                if overflow <= tolerance[row]:
+                    continue
+                columns = indices[indptr[row] : indptr[row + 1]]
+                values = data[indptr[row] : indptr[row + 1]]
+                closable = is_open[columns] & (values > 0) & (minimum[columns] > 0)
+                columns, values = columns[closable], values[closable]
+                order = np.argsort(priority[columns], kind="stable")
+                freed = np.cumsum(values[order] * minimum[columns[order]])
+                count = int(np.searchsorted(freed, overflow - tolerance[row])) + 1
+                close(columns[order[:count]])
+
+            columns = np.flatnonzero(is_open)
+            if not len(columns):
+                break
+            floor = np.where(is_open, minimum, 0.0)
+            shifted = replace(
+                model.restrict(all_rows, columns),
+                rhs=model.rhs - floor_activity,
+                upper_bounds=capacity[columns] - minimum[columns],
+            )
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            result = backend.solve(shifted, remaining)
+            if result.status not in FEASIBLE_STATUSES:
+                close(columns[np.argmin(priority[columns])][None])
+                continue
+
+            x = floor.copy()
+            x[columns] += result.x
+            paying = model.objective * x > fee
+            value = float(model.objective @ x - fee[x > 0].sum())
+            if value > best_value:
+                best_x, best_value = x, value
+            if np.all(paying[is_open]):
+                break
+            close(np.flatnonzero(~paying))
+
+        return best_x, best_value
+
+    def _base_values(
+        self,
+        opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch],
+        value: Union[float, Dict[str, float]],
+    ) -> np.ndarray:
+        """
+        Value of every opportunity from one value or a dict by base currency
+
+        Base currencies missing from the dict get 0.
+        """
+        n = len(opportunities)
+        if not isinstance(value, dict):
+            return np.full(n, float(value))
+        if isinstance(opportunities, OpportunityBatch):
+            table = np.array(
+                [value.get(currency, 0.0) for currency in self.registry.currencies],
+                dtype=float,
+            )
+            return table[opportunities.triangles[:, 0]]
+        return np.array(
+            [value.get(opp.currency_path[0], 0.0) for opp in opportunities],
+            dtype=float,
+        )
+
+    def _leg_pairs(
+        self, opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Legs of the opportunities as arrays
+
+        Returns:
+            Tuple (opportunity index, registry pair id, reported liquidity)
+            with one entry per leg
+        """
+        if isinstance(opportunities, OpportunityBatch):
+            return (
+                np.repeat(np.arange(len(opportunities)), 3),
+                opportunities.pair_ids().ravel(),
+                opportunities.liquidity.ravel(),
+            )
+
+        legs_opp, pair_ids, liquidity = [], [], []
+        for i, opp in enumerate(opportunities):
+            for pair in opp.leg_pairs():
+                legs_opp.append(i)
+                pair_ids.append(self.registry.pair_id_for_key(pair))
+                liquidity.append(opp.liquidity.get(pair, 0.0))
+        return (
+            np.array(legs_opp, dtype=np.int64),
+            np.array(pair_ids, dtype=np.int64),
+            np.array(liquidity, dtype=float),
+        )
+
+    def _build_model(
+        self, opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch]
+    ) -> Tuple[Union[List[ArbitrageOpportunity], OpportunityBatch], LinearProgram]:
+        """
+        Build the model of opportunities as a LinearProgram
+
+        Triangular opportunities are converted to a batch and built with
+        build_sparse_model, longer cycles with create_optimization_problem.
+
+        Returns:
+            Tuple (opportunities, model) with opportunities in column order
+        """
+        triangular = isinstance(opportunities, OpportunityBatch) or all(
+            len(opp.currency_path) == 3 for opp in opportunities
+        )
+        if triangular:
+            if not isinstance(opportunities, OpportunityBatch):
+                opportunities = OpportunityBatch.from_opportunities(
+                    opportunities, self.registry
+                )
+            return opportunities, self.build_sparse_model(opportunities)
+
+        self.create_optimization_problem(opportunities)
+        return opportunities, LinearProgram.from_pulp(
+            self.problem, list(self.variables.values())
+        )
+
+    def _reduced_costs(
+        self,
+        batch: OpportunityBatch,
+        pair_ids: np.ndarray,
+        model: LinearProgram,
+        result: LPSolution,
+    ) -> np.ndarray:
+        """
+        Reduced cost of every candidate of the batch under the duals of model
+
+        Rows of build_sparse_model are looked up by name; rows missing from
+        the model (pairs or currencies no working column touches) are not
+        binding and price at zero.
+        """
+        duals = dict(zip(model.row_names, result.duals.tolist()))
+        currencies = self.registry.currencies
+        pair_dual = np.array(
+            [
+                duals.get("liquidity_" + key.replace("/", "_"), 0.0)
+                for key in self.registry.pair_keys
+            ]
+        )
+        balance_dual = np.array([duals.get(f"balance_{c}", 0.0) for c in currencies])
+        holding_dual = np.array(
+            [duals.get(f"min_holding_{c}", 0.0) for c in currencies]
+        )
+
+        consumption = 0.1 + batch.transaction_fees * 10
+        holding = np.column_stack(
+            [
+                np.ones(len(batch)),
+                -0.5 * batch.expected_profit,
+                -0.5 * batch.expected_profit,
+            ]
+        )
+        return (
+            batch.scores
+            - (pair_dual[pair_ids] * consumption).sum(axis=1)
+            - balance_dual[batch.triangles[:, 0]]
+            - (holding_dual[batch.triangles] * holding).sum(axis=1)
+            - duals.get("total_exposure", 0.0)
+        )
+
+    def _base_blocks(
+        self, opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch]
+    ) -> np.ndarray:
+        """Base currency id of every opportunity (decomposition blocks)"""
+        if isinstance(opportunities, OpportunityBatch):
+            return opportunities.triangles[:, 0]
+        return self.registry.register_many(opp.base_currency for opp in opportunities)
+
+    def _sensitivity_report(
+        self, row_names: List[str], rhs: np.ndarray, result: LPSolution
+    ) -> Dict:
+        """
+        Shadow prices, slacks and reduced costs of a backend result
+
+        Rows are keyed by their stable names (liquidity_<FIRST>_<SECOND>,
+        balance_<CCY>, min_holding_<CCY>, total_exposure), so reports of
+        different cycles can be diffed; every row is '<=' and its shadow price
+        is the objective gain per unit of extra right-hand side. Reduced
+        costs are keyed like the investments. Entries the backend did not
+        report are left out.
+        """
+        report = {}
+        if result.slacks is not None:
+            report["slacks"] = dict(zip(row_names, result.slacks.tolist()))
+            tight = result.slacks <= 1e-7 * np.maximum(1.0, np.abs(rhs))
+            report["binding_constraints"] = [
+                name for name, binding in zip(row_names, tight.tolist()) if binding
+            ]
+        if result.duals is not None:
+            report["shadow_prices"] = dict(zip(row_names, result.duals.tolist()))
+            if "binding_constraints" in report:
+                report["binding_constraints"].sort(
+                    key=lambda name: -report["shadow_prices"][name]
+                )
+        if result.reduced_costs is not None:
+            report["reduced_costs"] = {
+                f"opportunity_{i}": value
+                for i, value in enumerate(result.reduced_costs.tolist())
+            }
+        return report
+
+    def _problem_rows(
+        self, row_names: Optional[List[str]] = None
+    ) -> Tuple[List[str], np.ndarray]:
+        """
+        Names and right-hand sides of rows of the PuLP problem
+
+        Args:
+            row_names: Rows to report (every row of the problem if None)
+        """
+        if row_names is None:
+            row_names = [row.name for row in self.problem.constraints()]
+        rows = [self.problem.get_constraint_by_name(name) for name in row_names]
+        return row_names, np.array([-row.constant for row in rows], dtype=float)
+
+    def _fallback_result(self, model: LinearProgram) -> LPSolution:
+        """Greedy allocation used when the solver found nothing in time"""
+        logger.warning("No solver result within the time budget, using fallback")
+        x = fallback_allocation(model)
+        return LPSolution(
+            status=FALLBACK,
+            x=x,
+            objective_value=float(model.objective @ x),
+            slacks=model.rhs - model.activity(x),
+            solver=GreedyBackend.name,
+        )
+
+    def _extract_solution(
+        self,
+        opportunities: Union[List[ArbitrageOpportunity], OpportunityBatch],
+        result: LPSolution,
+    ) -> Dict:
+        """Build the solution dictionary from a backend result"""
+        solution = {
+            "status": result.status,
+            "objective_value": result.objective_value,
+            "solver": result.solver,
+            "proven_optimal": result.status == "Optimal",
+            "investments": {},
+            "total_investment": 0,
+            "expected_profit": 0,
+        }
+
+        if result.status in FEASIBLE_STATUSES:
+            # Only include significant investments
+            for i in np.flatnonzero(result.x > 0.001).tolist():
+                investment_amount = float(result.x[i])
+                opp = opportunities[i]
+                profit = investment_amount * opp.expected_profit * opp.confidence_score
+                solution["investments"][f"opportunity_{i}"] = {
+                    "amount": investment_amount,
+                    "opportunity": opp,
+                    "expected_profit": profit,
+                }
+                solution["total_investment"] += investment_amount
+                solution["expected_profit"] += profit
+
+            if result.status == "Optimal":
+                logger.info(
+                    f"Optimization successful. Expected profit: {solution['expected_profit']:.4f}"
+                )
+            else:
+                logger.warning(
+                    f"Optimization stopped early ({result.status}). Expected profit: {solution['expected_profit']:.4f}"
+                )
+        else:
+            logger.warning(f"Optimization failed with status: {result.status}")
+
+        return solution
+
+    def get_execution_plan(self) -> List[Dict]:
+        """
+        Generate a detailed execution plan for the optimized arbitrage trades
+
+        Returns:
+            List of trade execution steps
+        """
+        if not self.solution or self.solution["status"] not in FEASIBLE_STATUSES:
+            return []
+
+        execution_plan = []
+
+        for opp_id, investment_data in self.solution["investments"].items():
+            opp = investment_data["opportunity"]
+            amount = investment_data["amount"]
+
+            if len(opp.currency_path) > 3:
+                execution_plan.append(
+                    {
+                        "opportunity_id": opp_id,
+                        "investment_amount": amount,
+                        "trades": self._cycle_trades(opp, amount),
+                        "expected_profit": investment_data["expected_profit"],
+                    }
+                )
+                continue
+
+            # Generate the three trades for triangular arbitrage
+            pair1, pair2, pair3 = self.registry.triangle_pairs(
+                opp.base_currency, opp.intermediate_currency, opp.quote_currency
+            )
+            trades = [
+                {
+                    "step": 1,
+                    "action": "buy",
+                    "pair": pair1,
+                    "amount": amount,
+                    "expected_rate": opp.exchange_rates.get(pair1, 0),
+                    "fee": opp.transaction_fees.get(pair1, 0.001),
+                },
+                {
+                    "step": 2,
+                    "action": "buy",
+                    "pair": pair2,
+                    "amount": amount * opp.exchange_rates.get(pair1, 1),
+                    "expected_rate": opp.exchange_rates.get(pair2, 0),
+                    "fee": opp.transaction_fees.get(pair2, 0.001),
+                },
+                {
+                    "step": 3,
+                    "action": "sell",
+                    "pair": pair3,
+                    "amount": "calculated_from_step_2",
+                    "expected_rate": opp.exchange_rates.get(pair3, 0),
+                    "fee": opp.transaction_fees.get(pair3, 0.001),
+                },
+            ]
+
+            execution_plan.append(
+                {
+                    "opportunity_id": opp_id,
+                    "investment_amount": amount,
+                    "trades": trades,
+                    "expected_profit": investment_data["expected_profit"],
+                }
+            )
+
+        return execution_plan
+
+    def _cycle_trades(self, opp: ArbitrageOpportunity, amount: float) -> List[Dict]:
+        """Generate the trades of a cycle with more than three legs"""
+        pairs = opp.leg_pairs()
+        trades = []
+        leg_amount = amount
+
+        for step, pair in enumerate(pairs[:-1], start=1):
+            rate = opp.exchange_rates.get(pair, 0)
+            fee = opp.transaction_fees.get(pair, 0.001)
+            trades.append(
+                {
+                    "step": step,
+                    "action": "buy",
+                    "pair": pair,
+                    "amount": leg_amount,
+                    "expected_rate": rate,
+                    "fee": fee,
+                }
+            )
+            leg_amount = leg_amount * rate * (1 - fee)
+
+        trades.append(
+            {
+                "step": len(pairs),
+                "action": "sell",
+                "pair": pairs[-1],
+                "amount": leg_amount,
+                "expected_rate": opp.exchange_rates.get(pairs[-1], 0),
+                "fee": opp.transaction_fees.get(pairs[-1], 0.001),
+            }
+        )
+        return trades
+
+
+class PersistentArbitrageOptimizer(TriangularArbitrageOptimizer):
+    """
+    Long-lived arbitrage model that is updated in place between solves
+
+    The PuLP problem is built once. Opportunities occupy column slots
+    (variables invest_slot_{k}) that are recycled as opportunities come and
+    go, so a new cycle only touches the objective coefficients, constraint
+    rows and bounds that actually changed. Each solve is warm-started from
+    the previous solution.
+
+    Rows are named liquidity_<FIRST>_<SECOND>, balance_<CURRENCY>,
+    min_holding_<CURRENCY> and total_exposure, as in build_sparse_model.
+    """
+
+    def __init__(
+        self,
+        portfolio_constraints: PortfolioConstraints,
+        registry: Optional[CurrencyRegistry] = None,
+        liquidity_policy: str = "max",
+    ):
+        super().__init__(portfolio_constraints, registry, liquidity_policy)
+        self.problem = pl.LpProblem("Persistent_Arbitrage_Optimization", pl.LpMaximize)
+        self.problem.setObjective(pl.LpAffineExpression())
+
+        self.slots: List[pl.LpVariable] = []
+        self.opportunities: Dict[int, ArbitrageOpportunity] = {}
+        self.order: List[int] = []  # Slots in the order of the last sync
+        self._free_slots: List[int] = []
+        self._slot_keys: Dict[int, Tuple] = {}
+        self._slot_rows: Dict[int, List[str]] = {}
+
+        self._rows: Dict[str, pl.LpConstraint] = {}
+        self._active_rows: Dict[str, None] = {}  # Enforced rows, in order
+        self._placed_rows = set()  # Rows in the problem (active or relaxed)
+        self._row_liquidity: Dict[str, Dict[int, float]] = {}
+        self._dirty_rows = set()
+        self._min_holding_currencies = frozenset(portfolio_constraints.min_holdings)
+
+    def add_opportunity(self, opp: ArbitrageOpportunity) -> int:
+        """
+        Add an opportunity column
+
+        Returns:
+            Slot of the new column
+        """
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = len(self.slots)
+            self.slots.append(
+                self.problem.add_variable(
+                    f"invest_slot_{slot}", lowBound=0, cat="Continuous"
+                )
+            )
+
+        self._attach(slot, opp)
+        return slot
+
+    def remove_opportunity(self, slot: int):
+        """Remove the column in a slot and free the slot for reuse"""
+        self._detach(slot)
+        variable = self.slots[slot]
+        variable.upBound = 0
+        variable.setInitialValue(0)
+        # Keep the column declared in the solver input: a variable with
+        # bounds but no coefficients is rejected by CBC
+        self.problem.objective[variable] = 0
+        self._free_slots.append(slot)
+
+    def update_opportunity(self, slot: int, opp: ArbitrageOpportunity):
+        """Replace the coefficients of a column with those of opp"""
+        self._detach(slot)
+        self._attach(slot, opp)
+
+    def set_objective_coefficient(self, slot: int, value: float):
+        """Set the objective coefficient of a column"""
+        self.problem.objective[self.slots[slot]] = value
+
+    def set_upper_bound(self, slot: int, value: Optional[float]):
+        """Set the upper bound of a column (None or inf for unbounded)"""
+        if value is not None and value == float("inf"):
+            value = None
+        self.slots[slot].upBound = value
+
+    def set_rhs(self, row_name: str, value: float):
+        """
+        Set the right-hand side of a constraint row
+
+        The value holds until the row is next refreshed from the portfolio
+        constraints and opportunities (after update_constraints, or when a
+        column in the row changes).
+        """
+        self._rows[row_name].changeRHS(value)
+
+    def update_constraints(self, portfolio_constraints: PortfolioConstraints):
+        """
+        Switch to new portfolio constraints
+
+        Only right-hand sides and column bounds change, unless the set of
+        currencies with minimum holdings changed, in which case the columns
+        are re-attached.
+        """
+        self.portfolio_constraints = portfolio_constraints
+
+        min_holding_currencies = frozenset(portfolio_constraints.min_holdings)
+        if min_holding_currencies != self._min_holding_currencies:
+            self._min_holding_currencies = min_holding_currencies
+            for slot, opp in list(self.opportunities.items()):
+                self.update_opportunity(slot, opp)
+
+        for slot, opp in self.opportunities.items():
+            self.set_upper_bound(
+                slot,
+                portfolio_constraints.max_position_size.get(
+                    opp.base_currency, float("inf")
+                ),
+            )
+        self._dirty_rows.update(self._rows)
+
+    def sync(self, opportunities: List[ArbitrageOpportunity]) -> List[int]:
+        """
+        Make the model columns match a new list of opportunities
+
+        Opportunities are matched to existing columns by currency path;
+        matched columns are updated in place, the others are added or
+        removed.
+
+        Returns:
+            Slot of every opportunity, in list order
+        """
+        live = {}
+        for slot, key in self._slot_keys.items():
+            live.setdefault(key, []).append(slot)
+
+        matched = [
+            live[opp.currency_path].pop() if live.get(opp.currency_path) else None
+            for opp in opportunities
+        ]
+        for unmatched in live.values():
+            for slot in unmatched:
+                self.remove_opportunity(slot)
+
+        # Update and add in list order, so rows see columns in that order
+        slots = []
+        for slot, opp in zip(matched, opportunities):
+            if slot is None:
+                slot = self.add_opportunity(opp)
+            else:
+                self.update_opportunity(slot, opp)
+            slots.append(slot)
+
+        self.order = slots
+        return slots
+
+    def solve(
+        self,
+        opportunities: Optional[
+            Union[List[ArbitrageOpportunity], OpportunityBatch]
+        ] = None,
+        warm_start: bool = True,
+        time_budget: Optional[float] = None,
+    ) -> Dict:
+        """
+        Update the model and re-solve it
+
+        Args:
+            opportunities: Opportunities of the new cycle (keep the current
+                columns if None)
+            warm_start: Start CBC from the previous solution
+            time_budget: Wall-clock budget in seconds for updating and
+                solving, as in TriangularArbitrageOptimizer.solve
+
+        Returns:
+            Dictionary containing optimization results, as
+            TriangularArbitrageOptimizer.solve
+        """
+        build_start = time.perf_counter()
+        deadline = None if time_budget is None else build_start + time_budget
+        if opportunities is not None:
+            if isinstance(opportunities, OpportunityBatch):
+                opportunities = opportunities.to_list()
+            self.sync(opportunities)
+        self._refresh_rows()
+        build_time = time.perf_counter() - build_start
+
+        if not self.order:
+            logger.warning("No arbitrage opportunities provided")
+            return {"status": "No opportunities", "investments": {}}
+
+        # Only a feasible previous solution is a useful starting point
+        warm_start = warm_start and self.solution.get("status") in FEASIBLE_STATUSES
+        variables = [self.slots[slot] for slot in self.order]
+        self.variables = {
+            f"invest_opp_{i}": variable for i, variable in enumerate(variables)
+        }
+
+        logger.info("Solving optimization problem...")
+        solve_start = time.perf_counter()
+        time_limit = None if deadline is None else deadline - solve_start
+        if time_limit is not None and time_limit <= 0:
+            self.result = LPSolution("Not Solved", np.zeros(len(variables)), None)
+        else:
+            backend = CBCBackend(msg=False, warm_start=warm_start)
+            self.result = backend.solve_problem(
+                self.problem, variables, list(self._active_rows), time_limit
+            )
+
+        if deadline is not None and self.result.status == "Not Solved":
+            self.result = self._fallback_result(
+                LinearProgram.from_pulp(self.problem, variables)
+            )
+        solve_time = time.perf_counter() - solve_start
+
+        self.solution = self._extract_solution(
+            [self.opportunities[slot] for slot in self.order], self.result
+        )
+        self.solution.update(
+            self._sensitivity_report(
+                *self._problem_rows(list(self._active_rows)), self.result
+            )
+        )
+        self.solution["build_time"] = build_time
+        self.solution["solve_time"] = solve_time
+        return self.solution
+
+    def _attach(self, slot: int, opp: ArbitrageOpportunity):
+        """Write the coefficients of opp into the column of a slot"""
+        variable = self.slots[slot]
+        constraints = self.portfolio_constraints
+        rows = []
+
+        self.problem.objective[variable] = opp.expected_profit * opp.confidence_score
+        self.set_upper_bound(
+            slot, constraints.max_position_size.get(opp.base_currency, float("inf"))
+        )
+
+        for pair, liquidity in opp.liquidity.items():
+            name = "liquidity_" + pair.replace("/", "_")
+            self._row(name)[variable] = self._estimate_liquidity_consumption(opp, pair)
+            self._row_liquidity.setdefault(name, {})[slot] = liquidity
+            rows.append(name)
+
+        name = f"balance_{opp.base_currency}"
+        self._row(name)[variable] = 1
+        rows.append(name)
+
+        # Minimum holdings, as -(net change) <= current - minimum
+        path = opp.currency_path
+        for position, currency in enumerate(path):
+            if currency not in self._min_holding_currencies:
+                continue
+            coefficient = 1 if position == 0 else -0.5 * opp.expected_profit
+            name = f"min_holding_{currency}"
+            self._row(name)[variable] = coefficient
+            rows.append(name)
+
+        self._row("total_exposure")[variable] = 1
+        rows.append("total_exposure")
+
+        self.opportunities[slot] = opp
+        self._slot_keys[slot] = path
+        self._slot_rows[slot] = rows
+        self._dirty_rows.update(rows)
+
+    def _detach(self, slot: int):
+        """Remove the coefficients of the column of a slot"""
+        variable = self.slots[slot]
+        self.problem.objective.pop(variable, None)
+        for name in self._slot_rows.pop(slot, []):
+            self._rows[name].expr.pop(variable, None)
+            self._row_liquidity.get(name, {}).pop(slot, None)
+            self._dirty_rows.add(name)
+        self.opportunities.pop(slot, None)
+        self._slot_keys.pop(slot, None)
+
+    def _row(self, name: str) -> pl.LpAffineExpression:
+        """Expression of a row, creating the (inactive) row if needed"""
+        row = self._rows.get(name)
+        if row is None:
+            row = pl.LpConstraint(
+                pl.LpAffineExpression(), sense=pl.LpConstraintLE, name=name
+            )
+            self._rows[name] = row
+        return row.expr
+
+    def _row_rhs(self, name: str) -> Optional[float]:
+        """Right-hand side of a row, or None if the row should be inactive"""
+        constraints = self.portfolio_constraints
+        if name in self._row_liquidity:
+            # Columns are attached in opportunity order, so the last value
+            # is the latest for the 'latest' policy
+            liquidity = np.fromiter(self._row_liquidity[name].values(), dtype=float)
+            rhs = aggregate_liquidity(
+                np.zeros(len(liquidity), dtype=np.int64),
+                liquidity,
+                1,
+                self.liquidity_policy,
+            )[0]
+            return rhs if rhs > 0 else None
+        if name.startswith("balance_"):
+            rhs = constraints.initial_balances.get(name[len("balance_") :], 0)
+            return rhs if rhs > 0 else None
+        if name.startswith("min_holding_"):
+            currency = name[len("min_holding_") :]
+            if currency not in constraints.min_holdings:
+                return None
+            return (
+                constraints.initial_balances.get(currency, 0)
+                - constraints.min_holdings[currency]
+            )
+        return sum(constraints.initial_balances.values()) * constraints.risk_tolerance
+
+    def _refresh_rows(self):
+        """
+        Refresh right-hand sides and (de)activate the rows that changed
+
+        Rows stay in the problem once added. A row emptied by removed
+        opportunities is relaxed in place to 0 <= 0 and reactivated by
+        changing its rhs back. PuLP has no call to remove a row, so only a
+        row that still has columns but no limit any more (zero balance,
+        no liquidity, minimum holding dropped) rebuilds the problem around
+        the same objective, variables and row objects.
+        """
+        added, rebuild = [], False
+        for name in self._dirty_rows:
+            row = self._rows[name]
+            rhs = self._row_rhs(name) if len(row.expr) else None
+            if rhs is None:
+                self._active_rows.pop(name, None)
+                if name in self._placed_rows:
+                    if len(row.expr):
+                        rebuild = True
+                    else:
+                        row.changeRHS(0.0)
+                continue
+
+            row.changeRHS(rhs)
+            if name not in self._active_rows:
+                self._active_rows[name] = None
+                if name not in self._placed_rows:
+                    added.append(name)
+        self._dirty_rows.clear()
+
+        if rebuild:
+            problem = pl.LpProblem(self.problem.name, pl.LpMaximize)
+            problem.setObjective(self.problem.objective)
+            self.problem = problem
+            self._placed_rows.clear()
+            added = list(self._active_rows)
+        for name in added:
+            self.problem.addConstraint(self._rows[name], name)
+            self._placed_rows.add(name)
+
+
+def calculate_triangular_arbitrage_profit(
+    rate_ab: float,
+    rate_bc: float,
+    rate_ca: float,
+    fees: Tuple[float, float, float] = (0.001, 0.001, 0.001),
+) -> float:
+    """
+    Calculate the expected profit from a triangular arbitrage opportunity
+
+    Args:
+        rate_ab: Exchange rate from currency A to B
+        rate_bc: Exchange rate from currency B to C
+        rate_ca: Exchange rate from currency C to A
         fees: Transaction fees for each trade (default 0.1% each)
 
     Returns:
@@ -370,3 +2890,102 @@ def calculate_triangular_arbitrage_profit(
     profit = final_amount - 1.0
 
     return profit
+
+
+def calculate_cycle_profits(
+    rates: np.ndarray, fees: np.ndarray, log_space: bool = False
+) -> np.ndarray:
+    """
+    Calculate the expected profit of many arbitrage cycles at once
+
+    Args:
+        rates: Conversion rate of every leg, shape (N, K)
+        fees: Transaction fee of every leg, shape (N, K)
+        log_space: Accumulate log(rate * (1 - fee)) instead of multiplying,
+            which avoids overflow/underflow on long chains of extreme rates
+
+    Returns:
+        Expected profit fraction of every cycle, shape (N,)
+    """
+    rates = np.asarray(rates, dtype=float)
+    fees = np.asarray(fees, dtype=float)
+
+    if log_space:
+        return np.expm1(np.sum(np.log(rates) + np.log1p(-fees), axis=-1))
+
+    return np.prod(rates * (1 - fees), axis=-1) - 1.0
+
+
+def calculate_triangular_arbitrage_profit_batch(
+    rate_ab: np.ndarray,
+    rate_bc: np.ndarray,
+    rate_ca: np.ndarray,
+    fees: np.ndarray,
+    log_space: bool = False,
+) -> np.ndarray:
+    """
+    Vectorized calculate_triangular_arbitrage_profit
+
+    Args:
+        rate_ab: Exchange rates from currency A to B, shape (N,)
+        rate_bc: Exchange rates from currency B to C, shape (N,)
+        rate_ca: Exchange rates from currency C to A, shape (N,)
+        fees: Transaction fees of the three trades, shape (N, 3)
+        log_space: Compute the product of the legs in log space
+
+    Returns:
+        Expected profit percentage of every triangle, shape (N,)
+    """
+    rates = np.column_stack([rate_ab, rate_bc, rate_ca])
+    return calculate_cycle_profits(rates, fees, log_space=log_space)
+
+
+def _cvar(profits: np.ndarray, alpha: float) -> Tuple[float, float]:
+    """
+    Value at risk and CVaR of equally likely scenario profits
+
+    Returns:
+        Tuple (VaR, CVaR): the alpha quantile of the profits and the maximum
+        over eta of eta - E[(eta - profit)+] / alpha, attained at the VaR
+    """
+    ordered = np.sort(profits)
+    value_at_risk = float(ordered[max(int(np.ceil(alpha * len(ordered))) - 1, 0)])
+    shortfall = np.maximum(value_at_risk - ordered, 0.0).mean()
+    return value_at_risk, value_at_risk - float(shortfall) / alpha
+
+
+def aggregate_liquidity(
+    groups: np.ndarray, liquidity: np.ndarray, num_groups: int, policy: str = "max"
+) -> np.ndarray:
+    """
+    Combine leg liquidity per group (trading pair) in one vectorized pass
+
+    Args:
+        groups: Group index of every leg, in 0..num_groups-1
+        liquidity: Reported liquidity of every leg
+        num_groups: Number of groups
+        policy: 'max', 'min', 'latest' (value of the last leg of the group)
+            or 'sum'
+
+    Returns:
+        (num_groups,) aggregated liquidity, 0 for groups without legs
+    """
+    if policy == "sum":
+        return np.bincount(groups, weights=liquidity, minlength=num_groups)
+
+    if policy == "latest":
+        last = np.full(num_groups, -1, dtype=np.int64)
+        np.maximum.at(last, groups, np.arange(len(groups)))
+        return np.where(last >= 0, liquidity[last], 0.0)
+
+    if policy == "max":
+        result = np.full(num_groups, -np.inf)
+        np.maximum.at(result, groups, liquidity)
+    elif policy == "min":
+        result = np.full(num_groups, np.inf)
+        np.minimum.at(result, groups, liquidity)
+    else:
+        raise ValueError(f"Unknown liquidity policy: {policy}")
+
+    result[np.isinf(result)] = 0.0
+    return result
@@ -0,0 +1,178 @@
+"""
+Currency and Trading Pair Registry
+
+This module assigns dense integer ids to currencies and trading pairs so that
+the detector, the optimizer and the simulator can index NumPy arrays instead
+of building and hashing "BASE/QUOTE" strings in their hot paths.
+"""
+
+import numpy as np
+from typing import Dict, Iterable, List, Tuple
+
+
+class CurrencyRegistry:
+    """
+    Dense integer ids for currencies and ordered currency pairs
+
+    Pair "A/B" and its inverse "B/A" are always registered together and get
+    consecutive ids, so the inverse of pair id p is p ^ 1. The pair that was
+    registered first is the canonical orientation (even id).
+    """
+
+    def __init__(self, currencies: Iterable[str] = ()):
+        """
+        Initialize the registry
+
+        Args:
+            currencies: Currencies to register up front, in id order
+        """
+        self.currencies: List[str] = []
+        self._currency_ids: Dict[str, int] = {}
+
+        self.pair_keys: List[str] = []
+        self._pair_ids: Dict[str, int] = {}
+        self._pair_first: List[int] = []
+        self._pair_second: List[int] = []
+
+        # _pair_matrix[a, b] is the id of pair "a/b" (-1 if not registered)
+        self._pair_matrix = np.full((16, 16), -1, dtype=np.int64)
+        self._triangle_pairs: Dict[Tuple[str, str, str], Tuple[str, str, str]] = {}
+
+        for currency in currencies:
+            self.register(currency)
+
+    def __len__(self) -> int:
+        return len(self.currencies)
+
+    @property
+    def num_pairs(self) -> int:
+        """Number of registered pairs (both orientations counted)"""
+        return len(self.pair_keys)
+
+    def register(self, currency: str) -> int:
+        """Return the id of a currency, registering it if needed"""
+        currency_id = self._currency_ids.get(currency)
+        if currency_id is not None:
+            return currency_id
+
+        currency_id = len(self.currencies)
+        self.currencies.append(currency)
+        self._currency_ids[currency] = currency_id
+
+        # Grow the pair matrix geometrically
+        size = self._pair_matrix.shape[0]
+        if currency_id >= size:
+            grown = np.full((2 * size, 2 * size), -1, dtype=np.int64)
+            grown[:size, :size] = self._pair_matrix
+            self._pair_matrix = grown
+
+        return currency_id
+
+    def register_many(self, currencies: Iterable[str]) -> np.ndarray:
+        """Return the ids of several currencies, registering new ones"""
+        return np.array([self.register(c) for c in currencies], dtype=np.int64)
+
+    def currency_id(self, currency: str) -> int:
+        """Id of an already registered currency"""
+        return self._currency_ids[currency]
+
+    def pair_id(self, first: int, second: int) -> int:
+        """Id of pair "first/second" given currency ids, registering if needed"""
+        pair_id = self._pair_matrix[first, second]
+        if pair_id >= 0:
+            return int(pair_id)
+        if first == second:
+            raise ValueError(
+                f"Pair of a currency with itself: {self.currencies[first]}"
+            )
+
+        pair_id = len(self.pair_keys)
+        for a, b in ((first, second), (second, first)):
+            key = f"{self.currencies[a]}/{self.currencies[b]}"
+            self._pair_matrix[a, b] = len(self.pair_keys)
+            self._pair_ids[key] = len(self.pair_keys)
+            self.pair_keys.append(key)
+            self._pair_first.append(a)
+            self._pair_second.append(b)
+
+        return pair_id
+
+    def pair_ids(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """Vectorized pair_id over arrays of currency ids"""
+        first = np.asarray(first, dtype=np.int64)
+        second = np.asarray(second, dtype=np.int64)
+        ids = self._pair_matrix[first, second]
+
+        missing = ids < 0
+        if np.any(missing):
+            if np.any(first[missing] == second[missing]):
+                raise ValueError("Pair of a currency with itself")
+            for a, b in set(zip(first[missing].tolist(), second[missing].tolist())):
+                self.pair_id(a, b)
+            ids = self._pair_matrix[first, second]
+
+        return ids
+
+    def pair_id_for_key(self, key: str) -> int:
+        """Id of a "FIRST/SECOND" pair key, registering it if needed"""
+        pair_id = self._pair_ids.get(key)
+        if pair_id is not None:
+            return pair_id
+
+        first, second = key.split("/")
+        return self.pair_id(self.register(first), self.register(second))
+
+    def pair_key(self, pair_id: int) -> str:
+        """Pair key string ("FIRST/SECOND") of a pair id"""
+        return self.pair_keys[pair_id]
+
+    def pair_currencies(self, pair_id: int) -> Tuple[int, int]:
+        """Currency ids (first, second) of a pair id"""
+        return self._pair_first[pair_id], self._pair_second[pair_id]
+
+    @staticmethod
+    def inverse(pair_id: int) -> int:
+        """Id of the inverse pair"""
+        return pair_id ^ 1
+
+    @staticmethod
+    def canonical(pair_id: int) -> int:
+        """Id of the canonical orientation of a pair"""
+        return pair_id & ~1
+
+    def triangle_pair_ids(self, triangles: np.ndarray) -> np.ndarray:
+        """
+        Pair ids of the legs of triangles given as (N, 3) currency ids
+
+        Returns:
+            (N, 3) pair ids for intermediate/base, quote/intermediate and
+            quote/base
+        """
+        base, intermediate, quote = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+        return np.column_stack(
+            [
+                self.pair_ids(intermediate, base),
+                self.pair_ids(quote, intermediate),
+                self.pair_ids(quote, base),
+            ]
+        )
+
+    def triangle_pairs(
+        self, base: str, intermediate: str, quote: str
+    ) -> Tuple[str, str, str]:
+        """Cached pair keys of a triangle, in leg order (as triangle_pair_ids)"""
+        triangle = (base, intermediate, quote)
+        pairs = self._triangle_pairs.get(triangle)
+        if pairs is None:
+            b, i, q = (self.register(c) for c in triangle)
+            pairs = (
+                self.pair_keys[self.pair_id(i, b)],
+                self.pair_keys[self.pair_id(q, i)],
+                self.pair_keys[self.pair_id(q, b)],
+            )
+            self._triangle_pairs[triangle] = pairs
+        return pairs
+
+
+# Registry shared by the detector, the optimizer and the simulator
+DEFAULT_REGISTRY = CurrencyRegistry()
@@ -0,0 +1,57 @@
+"""
+Benchmark of the decomposition backend against the monolithic simplex
+
+Solves the sparse arbitrage LP with one block per base currency, in this
+process and with one worker per block, and compares both with the dense
+simplex over the whole model. The parallel path only pays off with at least
+as many cores as blocks; the core count is printed with the results.
+"""
+
+import os
+import time
+
+from arbitrage_detector import FakeArbitrageAnalyzer
+from arbitrage_optimizer import TriangularArbitrageOptimizer
+from lp_solvers import DecompositionBackend, NumpySimplexBackend
+from market_simulator import CryptoMarketSimulator
+
+
+def best_time(solve, repeats: int = 5) -> float:
+    """Best wall-clock time of several runs"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        solve()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark(sizes=(2_000, 6_000, 20_000), seed: int = 0):
+    """Print solve times per model size"""
+    print(f"CPU cores: {os.cpu_count()}")
+    print(f"{'columns':>8} {'blocks':>6} {'simplex':>9} {'in-proc':>9} {'workers':>9}")
+
+    constraints = CryptoMarketSimulator(seed=seed).generate_portfolio_constraints()
+    for size in sizes:
+        batch = FakeArbitrageAnalyzer(seed=seed).generate_opportunity_batch(size)
+        model = TriangularArbitrageOptimizer(constraints).build_sparse_model(batch)
+        blocks = batch.triangles[:, 0]
+        num_blocks = len(set(blocks.tolist()))
+
+        monolithic = best_time(lambda: NumpySimplexBackend().solve(model))
+        serial = DecompositionBackend(workers=1)
+        in_process = best_time(lambda: serial.solve(model, blocks=blocks))
+        with DecompositionBackend(
+            workers=num_blocks, min_parallel_columns=0
+        ) as parallel:
+            parallel.solve(model, blocks=blocks)  # Start the workers
+            pooled = best_time(lambda: parallel.solve(model, blocks=blocks))
+
+        print(
+            f"{model.num_columns:>8} {num_blocks:>6} {monolithic:>9.4f} "
+            f"{in_process:>9.4f} {pooled:>9.4f}"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -89,6 +89,13 @@ def debug_constraints():
             )
             print(f"  Max investment per opportunity: {max_investment_per_opp:,.4f}")
 
+    # Which constraints actually limit the allocation
+    solution = optimizer.solve(opportunities)
+    print(f"\n=== BINDING CONSTRAINTS ({solution['status']}) ===")
+    shadow_prices = solution.get("shadow_prices", {})
+    for name in solution.get("binding_constraints", []):
+        print(f"{name}: shadow price {shadow_prices.get(name, 0.0):.6f}")
+
 
 if __name__ == "__main__":
     debug_constraints()
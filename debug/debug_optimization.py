@@ -63,6 +63,16 @@ def debug_optimization_detailed():
         else:
             print(f"{var_name}: Not found")
 
+    # Binding constraints and their shadow prices, straight from the solve
+    print(f"\n=== BINDING CONSTRAINTS ===")
+    for name in solution.get("binding_constraints", []):
+        price = solution.get("shadow_prices", {}).get(name)
+        price_text = "n/a" if price is None else f"{price:.6f}"
+        print(
+            f"{name}: slack={solution['slacks'][name]:.6f} "
+            f"| shadow price={price_text}"
+        )
+
     # Check constraint slack
     print(f"\n=== CONSTRAINT ANALYSIS ===")
     total_portfolio_value = sum(base_constraints.initial_balances.values())
@@ -0,0 +1,338 @@
+"""
+Sparse Linear Program Representation
+
+This module holds linear programs as NumPy arrays (sparse COO/CSR constraint
+matrix, objective, right-hand sides and bounds) so that large arbitrage models
+can be assembled with vectorized code and handed to a solver in bulk instead
+of being built term by term out of PuLP expressions.
+"""
+
+import pulp as pl
+import numpy as np
+from typing import List, Optional, Tuple
+from dataclasses import dataclass
+
+
+@dataclass
+class LinearProgram:
+    """
+    maximize objective @ x  subject to  A @ x <= rhs,  0 <= x <= upper_bounds
+
+    A is stored in COO form (row_indices, column_indices, values); duplicate
+    entries are summed. Columns flagged in integer_columns must take integer
+    values; only CBC enforces this, the other backends solve the LP
+    relaxation.
+    """
+
+    objective: np.ndarray  # (n,)
+    row_indices: np.ndarray  # (nnz,)
+    column_indices: np.ndarray  # (nnz,)
+    values: np.ndarray  # (nnz,)
+    rhs: np.ndarray  # (m,)
+    upper_bounds: np.ndarray  # (n,), np.inf for unbounded columns
+    row_names: List[str]
+    column_names: List[str]
+    integer_columns: Optional[np.ndarray] = None  # (n,) bool, None if all continuous
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.rhs)
+
+    @property
+    def num_columns(self) -> int:
+        return len(self.objective)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.values)
+
+    @property
+    def is_mip(self) -> bool:
+        """Whether some column is integer"""
+        return self.integer_columns is not None and bool(np.any(self.integer_columns))
+
+    def to_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Constraint matrix in CSR form
+
+        Returns:
+            Tuple (indptr, indices, data) with the entries of row r in
+            indices/data[indptr[r]:indptr[r + 1]]
+        """
+        order = np.argsort(self.row_indices, kind="stable")
+        indptr = np.zeros(self.num_rows + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(self.row_indices, minlength=self.num_rows), out=indptr[1:]
+        )
+        return indptr, self.column_indices[order], self.values[order]
+
+    def to_csc(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Constraint matrix in CSC form
+
+        Returns:
+            Tuple (indptr, indices, data) with the entries of column c in
+            indices/data[indptr[c]:indptr[c + 1]]
+        """
+        order = np.argsort(self.column_indices, kind="stable")
+        indptr = np.zeros(self.num_columns + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(self.column_indices, minlength=self.num_columns),
+            out=indptr[1:],
+        )
+        return indptr, self.row_indices[order], self.values[order]
+
+    def to_dense(self) -> np.ndarray:
+        """Constraint matrix as a dense (m, n) array"""
+        flat = self.row_indices * self.num_columns + self.column_indices
+        matrix = np.bincount(
+            flat, weights=self.values, minlength=self.num_rows * self.num_columns
+        )
+        return matrix.reshape(self.num_rows, self.num_columns)
+
+    def activity(self, x: np.ndarray) -> np.ndarray:
+        """Row activities A @ x"""
+        return np.bincount(
+            self.row_indices,
+            weights=self.values * x[self.column_indices],
+            minlength=self.num_rows,
+        )
+
+    def restrict(self, rows: np.ndarray, columns: np.ndarray) -> "LinearProgram":
+        """
+        Submodel over a subset of rows and columns
+
+        Entries in other columns are dropped, i.e. those columns are taken to
+        be zero.
+
+        Args:
+            rows: Rows to keep, in submodel order
+            columns: Columns to keep, in submodel order
+
+        Returns:
+            LinearProgram over the given rows and columns
+        """
+        row_map = np.full(self.num_rows, -1, dtype=np.int64)
+        row_map[rows] = np.arange(len(rows))
+        column_map = np.full(self.num_columns, -1, dtype=np.int64)
+        column_map[columns] = np.arange(len(columns))
+        sub_rows = row_map[self.row_indices]
+        sub_columns = column_map[self.column_indices]
+        keep = (sub_rows >= 0) & (sub_columns >= 0)
+
+        return LinearProgram(
+            objective=self.objective[columns],
+            row_indices=sub_rows[keep],
+            column_indices=sub_columns[keep],
+            values=self.values[keep],
+            rhs=self.rhs[rows],
+            upper_bounds=self.upper_bounds[columns],
+            row_names=[self.row_names[r] for r in np.asarray(rows).tolist()],
+            column_names=[self.column_names[j] for j in np.asarray(columns).tolist()],
+            integer_columns=(
+                None if self.integer_columns is None else self.integer_columns[columns]
+            ),
+        )
+
+    def to_pulp(
+        self, name: str = "Linear_Program"
+    ) -> Tuple[pl.LpProblem, List[pl.LpVariable]]:
+        """
+        Build the equivalent PuLP problem in bulk, one affine expression per row
+
+        Args:
+            name: Name of the PuLP problem
+
+        Returns:
+            Tuple (problem, variables) with variables in column order
+        """
+        problem = pl.LpProblem(name, pl.LpMaximize)
+        integer = (
+            np.zeros(self.num_columns, dtype=bool)
+            if self.integer_columns is None
+            else self.integer_columns
+        )
+        variables = [
+            problem.add_variable(
+                column,
+                lowBound=0,
+                upBound=None if np.isinf(bound) else float(bound),
+                cat="Integer" if is_integer else "Continuous",
+            )
+            for column, bound, is_integer in zip(
+                self.column_names, self.upper_bounds.tolist(), integer.tolist()
+            )
+        ]
+
+        problem += pl.LpAffineExpression(zip(variables, self.objective.tolist()))
+
+        indptr, indices, data = self.to_csr()
+        indices, data = indices.tolist(), data.tolist()
+        for row, (row_name, bound) in enumerate(zip(self.row_names, self.rhs.tolist())):
+            start, end = indptr[row], indptr[row + 1]
+            expression = pl.LpAffineExpression(
+                zip((variables[k] for k in indices[start:end]), data[start:end])
+            )
+            problem.addConstraint(
+                pl.LpConstraint(expression, sense=pl.LpConstraintLE, rhs=bound),
+                name=row_name,
+            )
+
+        return problem, variables
+
+    @classmethod
+    def from_pulp(
+        cls, problem: pl.LpProblem, variables: List[pl.LpVariable]
+    ) -> "LinearProgram":
+        """
+        Convert a PuLP problem with nonnegative variables
+
+        '>=' rows are negated and '==' rows split into two '<=' rows, so the
+        result may have more rows than the problem. A minimization objective
+        is negated. Terms of variables not listed are dropped, so those
+        variables must be fixed at zero. Integer variables are flagged in
+        integer_columns.
+
+        Args:
+            problem: PuLP problem
+            variables: Variables defining the column order
+
+        Returns:
+            LinearProgram over the given variables
+        """
+        column = {variable.name: j for j, variable in enumerate(variables)}
+        sense = 1.0 if problem.sense == pl.LpMaximize else -1.0
+        objective = np.zeros(len(variables))
+        for variable, coefficient in problem.objective.items():
+            if variable.name in column:
+                objective[column[variable.name]] = sense * coefficient
+
+        builder = LinearProgramBuilder(
+            objective,
+            upper_bounds=np.array(
+                [
+                    np.inf if variable.upBound is None else variable.upBound
+                    for variable in variables
+                ],
+                dtype=float,
+            ),
+            column_names=[variable.name for variable in variables],
+            integer_columns=np.array(
+                [variable.cat == pl.LpInteger for variable in variables], dtype=bool
+            ),
+        )
+
+        unnamed = 0
+        for constraint in problem.constraints():
+            # Unnamed rows get PuLP's automatic names _C1, _C2, ...
+            name = constraint.name
+            if name is None:
+                unnamed += 1
+                name = f"_C{unnamed}"
+            terms = [
+                (column[variable.name], coefficient)
+                for variable, coefficient in constraint.items()
+                if variable.name in column
+            ]
+            columns = [j for j, _ in terms]
+            values = np.array([coefficient for _, coefficient in terms], dtype=float)
+            rhs = -constraint.constant
+            signs = {
+                pl.LpConstraintLE: [1.0],
+                pl.LpConstraintGE: [-1.0],
+                pl.LpConstraintEQ: [1.0, -1.0],
+            }[constraint.sense]
+            for sign in signs:
+                builder.add_rows(
+                    np.zeros(len(columns), dtype=np.int64),
+                    columns,
+                    sign * values,
+                    [sign * rhs],
+                    [name if len(signs) == 1 else f"{name}_{int(sign)}"],
+                )
+
+        return builder.build()
+
+
+class LinearProgramBuilder:
+    """Accumulates blocks of constraint rows and assembles a LinearProgram"""
+
+    def __init__(
+        self,
+        objective: np.ndarray,
+        upper_bounds: Optional[np.ndarray] = None,
+        column_names: Optional[List[str]] = None,
+        integer_columns: Optional[np.ndarray] = None,
+    ):
+        """
+        Initialize the builder
+
+        Args:
+            objective: Objective coefficients, one per column
+            upper_bounds: Column upper bounds (unbounded if None)
+            column_names: Column names (x_0, x_1, ... if None)
+            integer_columns: Mask of the integer columns (all continuous if
+                None)
+        """
+        self.objective = np.asarray(objective, dtype=float)
+        n = len(self.objective)
+        self.upper_bounds = (
+            np.full(n, np.inf)
+            if upper_bounds is None
+            else np.asarray(upper_bounds, dtype=float)
+        )
+        self.column_names = (
+            column_names if column_names is not None else [f"x_{j}" for j in range(n)]
+        )
+        self.integer_columns = (
+            None if integer_columns is None else np.asarray(integer_columns, dtype=bool)
+        )
+
+        self._rows = []
+        self._columns = []
+        self._values = []
+        self._rhs = []
+        self._row_names = []
+        self._num_rows = 0
+
+    def add_rows(
+        self,
+        rows: np.ndarray,
+        columns: np.ndarray,
+        values: np.ndarray,
+        rhs: np.ndarray,
+        names: List[str],
+    ):
+        """
+        Append a block of rows
+
+        Args:
+            rows: Row of every entry, numbered 0..len(rhs)-1 within the block
+            columns: Column of every entry
+            values: Coefficient of every entry
+            rhs: Right-hand side of every row in the block
+            names: Name of every row in the block
+        """
+        self._rows.append(np.asarray(rows, dtype=np.int64) + self._num_rows)
+        self._columns.append(np.asarray(columns, dtype=np.int64))
+        self._values.append(np.asarray(values, dtype=float))
+        self._rhs.append(np.asarray(rhs, dtype=float))
+        self._row_names.extend(names)
+        self._num_rows += len(rhs)
+
+    def build(self) -> LinearProgram:
+        """Assemble the accumulated rows into a LinearProgram"""
+        empty_int = np.zeros(0, dtype=np.int64)
+        return LinearProgram(
+            objective=self.objective,
+            row_indices=np.concatenate(self._rows) if self._rows else empty_int,
+            column_indices=(
+                np.concatenate(self._columns) if self._columns else empty_int
+            ),
+            values=np.concatenate(self._values) if self._values else np.zeros(0),
+            rhs=np.concatenate(self._rhs) if self._rhs else np.zeros(0),
+            upper_bounds=self.upper_bounds,
+            row_names=self._row_names,
+            column_names=self.column_names,
+            integer_columns=self.integer_columns,
+        )
@@ -0,0 +1,896 @@
+"""
+Solver Backends for the Arbitrage LP
+
+This module provides interchangeable solvers for LinearProgram models: CBC
+through PuLP (a subprocess that exchanges the model through temporary files)
+and an in-process dense simplex written in NumPy, which avoids the process
+and file round trip for small and medium models. Every backend returns an
+LPSolution with PuLP status strings, so results can be compared and consumed
+the same way regardless of the solver.
+"""
+
+import os
+import time
+import pulp as pl
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Union
+from dataclasses import dataclass, replace
+
+from lp_model import LinearProgram
+
+# Status of a feasible but not proven optimal solution returned because the
+# time limit was reached, and of the heuristic allocation used when no
+# solver result is available in time
+TIME_LIMITED = "Time Limited Feasible"
+FALLBACK = "Fallback"
+
+# Statuses whose allocation satisfies the model and can be executed
+FEASIBLE_STATUSES = ("Optimal", TIME_LIMITED, FALLBACK)
+
+
+@dataclass
+class LPSolution:
+    """Solution of a LinearProgram"""
+
+    status: str  # PuLP status string: 'Optimal', 'Infeasible', 'Unbounded', ...
+    x: np.ndarray  # (n,) column values (zeros if not solved)
+    objective_value: Optional[float]
+    duals: Optional[np.ndarray] = None  # (m,) row shadow prices
+    reduced_costs: Optional[np.ndarray] = None  # (n,)
+    slacks: Optional[np.ndarray] = None  # (m,) rhs - A @ x
+    iterations: int = 0
+    solver: Optional[str] = None  # Name of the backend that produced it
+
+
+class SolverBackend:
+    """Interface of the LP solver backends"""
+
+    name = "base"
+
+    def solve(
+        self, model: LinearProgram, time_limit: Optional[float] = None
+    ) -> LPSolution:
+        """
+        Solve a linear program
+
+        Args:
+            model: Model to solve (maximization)
+            time_limit: Wall-clock limit in seconds (None for no limit); a
+                feasible solution found when it expires is returned with
+                status TIME_LIMITED
+
+        Returns:
+            LPSolution with column values in model column order
+        """
+        raise NotImplementedError
+
+
+class CBCBackend(SolverBackend):
+    """CBC (bundled with PuLP) run as a subprocess"""
+
+    name = "cbc"
+
+    def __init__(
+        self,
+        msg: bool = True,
+        time_limit: Optional[float] = None,
+        warm_start: bool = False,
+    ):
+        """
+        Initialize the backend
+
+        Args:
+            msg: Show the CBC log
+            time_limit: CBC time limit in seconds (None for no limit)
+            warm_start: Start CBC from the current variable values
+        """
+        self.msg = msg
+        self.time_limit = time_limit
+        self.warm_start = warm_start
+
+    def solve(
+        self, model: LinearProgram, time_limit: Optional[float] = None
+    ) -> LPSolution:
+        problem, variables = model.to_pulp()
+        return self.solve_problem(problem, variables, model.row_names, time_limit)
+
+    def solve_problem(
+        self,
+        problem: pl.LpProblem,
+        variables: List[pl.LpVariable],
+        row_names: Optional[List[str]] = None,
+        time_limit: Optional[float] = None,
+        initial_values: Optional[np.ndarray] = None,
+    ) -> LPSolution:
+        """
+        Solve an existing PuLP problem
+
+        CBC checks its time limit itself, so model transfer and process
+        start-up are not covered by it and it may be overrun. For a MILP a
+        solution found before the limit is returned with status
+        TIME_LIMITED.
+
+        Args:
+            problem: PuLP problem (all rows '<=')
+            variables: Variables in the order of the returned values
+            row_names: Constraint names in the order of the returned duals and
+                slacks (None to skip them)
+            time_limit: Time limit in seconds (the backend's if None)
+            initial_values: Values of the variables to warm-start CBC from,
+                e.g. a MILP incumbent (current values if None)
+
+        Returns:
+            LPSolution
+        """
+        time_limit = self.time_limit if time_limit is None else time_limit
+        if initial_values is not None:
+            for variable, value in zip(variables, initial_values.tolist()):
+                variable.setInitialValue(value)
+        status = problem.solve(
+            pl.PULP_CBC_CMD(
+                msg=self.msg,
+                timeLimit=time_limit,
+                warmStart=self.warm_start or initial_values is not None,
+            )
+        )
+        x = np.array([variable.value() or 0.0 for variable in variables])
+
+        # CBC reports a solution found before the time limit as optimal;
+        # only the solution status tells whether optimality was proven
+        status = pl.LpStatus[status]
+        if status == "Optimal" and problem.sol_status != pl.LpSolutionOptimal:
+            status = TIME_LIMITED if problem.valid(1e-7) else "Not Solved"
+
+        duals = slacks = None
+        if row_names is not None and status == "Optimal":
+            rows = [problem.get_constraint_by_name(name) for name in row_names]
+            duals = np.array([row.pi or 0.0 for row in rows])
+            slacks = np.array([row.slack or 0.0 for row in rows])
+
+        return LPSolution(
+            status=status,
+            x=x,
+            objective_value=pl.value(problem.objective),
+            duals=duals,
+            reduced_costs=(
+                np.array([variable.dj or 0.0 for variable in variables])
+                if status == "Optimal"
+                else None
+            ),
+            slacks=slacks,
+            solver=self.name,
+        )
+
+
+class NumpySimplexBackend(SolverBackend):
+    """
+    In-process dense bounded-variable simplex (two-phase, primal)
+
+    Keeps the full tableau B^-1 [A | I | artificials] in memory, so it suits
+    models with up to a few thousand rows and columns. Column upper bounds
+    are handled implicitly (nonbasic columns sit at either bound), so they do
+    not add rows.
+    """
+
+    name = "simplex"
+
+    def __init__(self, max_iterations: int = 50_000, tolerance: float = 1e-9):
+        """
+        Initialize the backend
+
+        Args:
+            max_iterations: Pivot limit across both phases
+            tolerance: Pivot, optimality and feasibility tolerance
+        """
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+
+    def solve(
+        self, model: LinearProgram, time_limit: Optional[float] = None
+    ) -> LPSolution:
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        m, n = model.num_rows, model.num_columns
+        b = np.asarray(model.rhs, dtype=float)
+
+        # Rows with a negative rhs are negated so the starting basis is
+        # nonnegative; their slack gets coefficient -1 and an artificial
+        # column starts in the basis instead
+        sign = np.where(b < 0, -1.0, 1.0)
+        artificial_rows = np.flatnonzero(sign < 0)
+        k = len(artificial_rows)
+        total = n + m + k
+
+        tableau = np.zeros((m, total))
+        tableau[:, :n] = model.to_dense() * sign[:, None]
+        tableau[np.arange(m), n + np.arange(m)] = sign
+        tableau[artificial_rows, n + m + np.arange(k)] = 1.0
+
+        upper = np.full(total, np.inf)
+        upper[:n] = model.upper_bounds
+        basis = n + np.arange(m)
+        basis[artificial_rows] = n + m + np.arange(k)
+        values = b * sign  # values of the basic columns
+        at_upper = np.zeros(total, dtype=bool)
+
+        state = _SimplexState(tableau, values, basis, upper, at_upper)
+        iterations = 0
+
+        # Phase 1: drive the artificial columns to zero
+        if k:
+            cost = np.zeros(total)
+            cost[n + m :] = -1.0
+            reduced = cost - cost[basis] @ tableau
+            outcome, iterations = self._iterate(
+                state, reduced, total, iterations, deadline
+            )
+            infeasibility = values[basis >= n + m].sum()
+            if outcome != "Optimal" or infeasibility > self.tolerance * max(
+                1.0, np.abs(b).max()
+            ):
+                status = "Infeasible" if outcome == "Optimal" else "Not Solved"
+                return LPSolution(
+                    status, np.zeros(n), None, iterations=iterations, solver=self.name
+                )
+            self._remove_artificials(state, n + m)
+
+        # Phase 2: optimize the model objective over the original columns
+        cost = np.zeros(total)
+        cost[:n] = model.objective
+        reduced = cost - cost[basis] @ tableau
+        outcome, iterations = self._iterate(state, reduced, n + m, iterations, deadline)
+        if outcome not in ("Optimal", TIME_LIMITED):
+            return LPSolution(
+                outcome, np.zeros(n), None, iterations=iterations, solver=self.name
+            )
+
+        # Phase 2 only visits feasible bases, so an interrupted solve still
+        # returns a feasible allocation
+        solution = np.where(at_upper, upper, 0.0)
+        solution[basis] = values
+        x = solution[:n]
+
+        return LPSolution(
+            status=outcome,
+            x=x,
+            objective_value=float(model.objective @ x),
+            duals=-reduced[n : n + m],
+            reduced_costs=reduced[:n],
+            slacks=solution[n : n + m],
+            iterations=iterations,
+            solver=self.name,
+        )
+
+    def _iterate(
+        self,
+        state: "_SimplexState",
+        reduced: np.ndarray,
+        allowed: int,
+        iterations: int,
+        deadline: Optional[float] = None,
+    ):
+        """
+        Primal simplex iterations until optimal for the given reduced costs
+
+        Args:
+            state: Tableau state, updated in place
+            reduced: Reduced costs, updated in place
+            allowed: Only columns below this index may enter the basis
+            iterations: Iterations done so far
+            deadline: time.perf_counter() value at which to stop with
+                status TIME_LIMITED (None for no limit)
+
+        Returns:
+            Tuple (status, iterations)
+        """
+        tol = self.tolerance
+        tableau, values, basis = state.tableau, state.values, state.basis
+        upper, at_upper = state.upper, state.at_upper
+        is_basic = np.zeros(len(reduced), dtype=bool)
+        is_basic[basis] = True
+        degenerate_streak = 0
+
+        while True:
+            # Improving nonbasic columns: increase from the lower bound or
+            # decrease from the upper bound
+            gain = np.where(at_upper[:allowed], -reduced[:allowed], reduced[:allowed])
+            gain[is_basic[:allowed]] = 0.0
+            candidates = np.flatnonzero(gain > tol)
+            if not len(candidates):
+                return "Optimal", iterations
+            if iterations >= self.max_iterations:
+                return "Not Solved", iterations
+            if deadline is not None and time.perf_counter() >= deadline:
+                return TIME_LIMITED, iterations
+            iterations += 1
+
+            # Dantzig's rule, switching to Bland's rule while degenerate
+            # pivots repeat to avoid cycling
+            if degenerate_streak > 50:
+                entering = candidates[0]
+            else:
+                entering = candidates[np.argmax(gain[candidates])]
+            direction = -1.0 if at_upper[entering] else 1.0
+            column = tableau[:, entering] * direction
+
+            # Ratio test: basic values move by -step * column
+            steps = np.full(len(values), np.inf)
+            decreasing = column > tol
+            steps[decreasing] = values[decreasing] / column[decreasing]
+            increasing = column < -tol
+            steps[increasing] = (
+                upper[basis[increasing]] - values[increasing]
+            ) / -column[increasing]
+            np.maximum(steps, 0.0, out=steps)
+
+            step = steps.min() if len(steps) else np.inf
+            row = -1
+            if np.isfinite(step):
+                # Among tied rows prefer the largest pivot for stability, or
+                # the lowest basic column under Bland's rule
+                tied = np.flatnonzero(steps <= step + tol)
+                if degenerate_streak > 50:
+                    row = int(tied[np.argmin(basis[tied])])
+                else:
+                    row = int(tied[np.argmax(np.abs(column[tied]))])
+                step = steps[row]
+            if upper[entering] <= step:
+                # Bound flip: the entering column moves to its other bound
+                step = upper[entering]
+                if np.isinf(step):
+                    return "Unbounded", iterations
+                values -= step * column
+                at_upper[entering] = not at_upper[entering]
+                degenerate_streak = 0
+                continue
+            if np.isinf(step):
+                return "Unbounded", iterations
+
+            degenerate_streak = degenerate_streak + 1 if step <= tol else 0
+            leaving = basis[row]
+            entering_value = (upper[entering] if at_upper[entering] else 0.0) + (
+                direction * step
+            )
+            values -= step * column
+            at_upper[leaving] = column[row] < 0
+            at_upper[entering] = False
+            is_basic[leaving] = False
+            is_basic[entering] = True
+
+            _pivot(tableau, reduced, row, entering)
+            values[row] = entering_value
+            basis[row] = entering
+
+    def _remove_artificials(self, state: "_SimplexState", first_artificial: int):
+        """Pivot basic artificial columns (at zero) out of the basis"""
+        tableau, basis = state.tableau, state.basis
+        dummy = np.zeros(tableau.shape[1])
+        for row in np.flatnonzero(basis >= first_artificial).tolist():
+            candidates = np.flatnonzero(
+                np.abs(tableau[row, :first_artificial]) > self.tolerance
+            )
+            if not len(candidates):
+                # Redundant row: the artificial stays basic at zero and no
+                # later pivot can change it
+                continue
+            entering = candidates[np.argmax(np.abs(tableau[row, candidates]))]
+            entering_value = state.upper[entering] if state.at_upper[entering] else 0.0
+            _pivot(tableau, dummy, row, entering)
+            state.values[row] = entering_value
+            state.at_upper[entering] = False
+            basis[row] = entering
+
+
+class GreedyBackend(SolverBackend):
+    """
+    Closed-form fast path for capacity-structured models
+
+    Rows whose coefficients are all 1 (total exposure, per-base balance,
+    per-opportunity position limits) form a laminar family: any two are
+    either disjoint or nested. Over such rows and the column bounds, the
+    greedy allocation in order of decreasing objective coefficient is
+    optimal, and it can be computed in O(N log N) by clipping prefix sums,
+    innermost rows first. If the allocation also satisfies every other row
+    (liquidity, minimum holdings) it is optimal for the whole model;
+    otherwise, or if the capacity rows are not laminar, the model is handed
+    to the fallback backend.
+    """
+
+    name = "greedy"
+
+    def __init__(
+        self,
+        fallback: Union[str, SolverBackend] = "cbc",
+        cross_check: bool = False,
+        tolerance: float = 1e-9,
+    ):
+        """
+        Initialize the backend
+
+        Args:
+            fallback: Backend used when the fast path does not apply
+            cross_check: Also solve every model with the fallback and raise
+                if the objectives disagree (for tests)
+            tolerance: Relative feasibility tolerance of the row check
+        """
+        self.fallback = get_backend(fallback)
+        self.cross_check = cross_check
+        self.tolerance = tolerance
+
+    def solve(
+        self, model: LinearProgram, time_limit: Optional[float] = None
+    ) -> LPSolution:
+        start = time.perf_counter()
+        x = self.allocate(model)
+        if x is not None:
+            activity = model.activity(x)
+            slacks = model.rhs - activity
+            if np.any(slacks < -self.tolerance * np.maximum(1.0, np.abs(model.rhs))):
+                x = None
+
+        if x is None:
+            if time_limit is not None:
+                time_limit -= time.perf_counter() - start
+            return self.fallback.solve(model, time_limit)
+
+        solution = LPSolution(
+            status="Optimal",
+            x=x,
+            objective_value=float(model.objective @ x),
+            slacks=slacks,
+            solver=self.name,
+        )
+
+        if self.cross_check:
+            reference = self.fallback.solve(model)
+            if reference.status != "Optimal" or not np.isclose(
+                solution.objective_value, reference.objective_value, rtol=1e-6
+            ):
+                raise RuntimeError(
+                    f"Greedy allocation disagrees with {self.fallback.name}: "
+                    f"{solution.objective_value} vs "
+                    f"{reference.status} {reference.objective_value}"
+                )
+
+        return solution
+
+    @staticmethod
+    def allocate(model: LinearProgram) -> Optional[np.ndarray]:
+        """
+        Greedy allocation over the unit-coefficient rows and column bounds
+
+        Returns:
+            (n,) allocation, or None if the unit rows are not laminar or some
+            profitable column is unbounded by them
+        """
+        indptr, indices, data = model.to_csr()
+        sizes = np.diff(indptr)
+        row_of_entry = np.repeat(np.arange(model.num_rows), sizes)
+        non_unit = np.bincount(
+            row_of_entry, weights=data != 1.0, minlength=model.num_rows
+        )
+        capacity_rows = np.flatnonzero((sizes > 0) & (non_unit == 0) & (model.rhs >= 0))
+
+        # Laminarity: visiting rows from the largest, all columns of a row
+        # must currently belong to the same (smallest enclosing) row
+        owner = np.full(model.num_columns, -1, dtype=np.int64)
+        order = capacity_rows[np.argsort(-sizes[capacity_rows], kind="stable")]
+        for row in order.tolist():
+            columns = indices[indptr[row] : indptr[row + 1]]
+            owners = owner[columns]
+            if np.any(owners != owners[0]):
+                return None
+            owner[columns] = row
+
+        # Greedy by decreasing objective: start every profitable column at
+        # its bound, then clip prefix sums against each row, innermost first
+        rank = np.empty(model.num_columns, dtype=np.int64)
+        rank[np.argsort(-model.objective, kind="stable")] = np.arange(model.num_columns)
+        x = np.where(model.objective > 0, model.upper_bounds, 0.0)
+        for row in order[::-1].tolist():
+            columns = indices[indptr[row] : indptr[row + 1]]
+            columns = columns[np.argsort(rank[columns])]
+            allocated = x[columns]
+            finite = np.where(np.isinf(allocated), model.rhs[row], allocated)
+            before = np.cumsum(finite) - finite
+            x[columns] = np.minimum(finite, np.maximum(model.rhs[row] - before, 0.0))
+
+        if np.any(np.isinf(x)):
+            return None
+        return x
+
+
+class DecompositionBackend(SolverBackend):
+    """
+    Lagrangian decomposition over column blocks, solved in worker processes
+
+    Columns are split into blocks (the optimizer uses one block per base
+    currency). Rows whose columns all lie in one block are local to it; the
+    others (total exposure, liquidity of pairs traded from several bases,
+    ...) couple the blocks. Each iteration prices the coupling rows into the
+    objective and solves the blocks independently in parallel, which gives
+    an upper bound. Prices follow projected subgradient steps (Polyak step
+    towards the best feasible objective).
+
+    Feasible allocations are recovered from the block solutions without
+    extra solves: the latest one and the running average of all of them
+    satisfy the local rows, and count whenever they also satisfy the
+    coupling rows. The restricted master problem, the full model over the
+    columns any block has used, is only solved once the blocks stop adding
+    columns (and again at the end if they added some since), so it runs in
+    the parent process about once per solve and over few columns. Its
+    allocation, duals and slacks are returned once bound and allocation
+    agree to the tolerance, or the prices stop improving the bound.
+
+    Every worker is a single process holding the same blocks for the whole
+    solve, so the blocks are shipped once per solve and each iteration only
+    sends prices. The workers are started on the first parallel solve and
+    reused by later ones; close the backend (or use it as a context manager)
+    to stop them. Models with a single block or fewer than
+    min_parallel_columns columns are solved in this process, where starting
+    workers and shipping the blocks would cost more than the solve.
+    """
+
+    name = "decomposition"
+
+    def __init__(
+        self,
+        subsolver: Union[str, SolverBackend] = "simplex",
+        workers: Optional[int] = None,
+        max_iterations: int = 50,
+        tolerance: float = 1e-6,
+        min_parallel_columns: int = 5000,
+    ):
+        """
+        Initialize the backend
+
+        Args:
+            subsolver: Backend solving the blocks and the restricted master
+            workers: Worker processes (one per block, up to the CPU count, if
+                None; 1 solves the blocks in this process)
+            max_iterations: Limit on price updates
+            tolerance: Relative gap between bound and allocation at which the
+                allocation is reported optimal
+            min_parallel_columns: Models with fewer columns are solved in
+                this process
+        """
+        self.subsolver = get_backend(subsolver)
+        self.workers = workers
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+        self.min_parallel_columns = min_parallel_columns
+        self._pool: List[ProcessPoolExecutor] = []
+
+    def __enter__(self) -> "DecompositionBackend":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the worker processes, if any were started"""
+        for worker in self._pool:
+            worker.shutdown()
+        self._pool = []
+
+    def _get_pool(self, workers: int) -> List[ProcessPoolExecutor]:
+        """The single-process workers, started (or resized) on first use"""
+        if len(self._pool) != workers:
+            self.close()
+            self._pool = [
+                ProcessPoolExecutor(
+                    max_workers=1,
+                    initializer=_init_block_worker,
+                    initargs=(self.subsolver,),
+                )
+                for _ in range(workers)
+            ]
+        return self._pool
+
+    def solve(
+        self,
+        model: LinearProgram,
+        time_limit: Optional[float] = None,
+        blocks: Optional[np.ndarray] = None,
+    ) -> LPSolution:
+        """
+        Solve a linear program by decomposition
+
+        Args:
+            model: Model to solve (maximization)
+            time_limit: Wall-clock limit in seconds (None for no limit)
+            blocks: (n,) block label of every column (one block if None)
+
+        Returns:
+            LPSolution with the restricted master's allocation, duals and
+            slacks; status TIME_LIMITED if the gap did not close
+        """
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        if blocks is None:
+            blocks = np.zeros(model.num_columns, dtype=np.int64)
+        _, blocks = np.unique(blocks, return_inverse=True)
+        num_blocks = int(blocks.max()) + 1 if model.num_columns else 0
+
+        # A row is local if all its entries lie in one block
+        entry_block = blocks[model.column_indices]
+        first = np.full(model.num_rows, -1, dtype=np.int64)
+        first[model.row_indices[::-1]] = entry_block[::-1]
+        local = np.ones(model.num_rows, dtype=bool)
+        local[model.row_indices[entry_block != first[model.row_indices]]] = False
+        coupling = model.restrict(np.flatnonzero(~local), np.arange(model.num_columns))
+
+        # Coupling rows with nonnegative entries and rhs bound every column
+        # in them; the bounds keep the priced blocks bounded
+        bounding = coupling.rhs >= 0
+        bounding[coupling.row_indices[coupling.values < 0]] = False
+        entries = bounding[coupling.row_indices] & (coupling.values > 0)
+        implied = model.upper_bounds.copy()
+        np.minimum.at(
+            implied,
+            coupling.column_indices[entries],
+            coupling.rhs[coupling.row_indices[entries]] / coupling.values[entries],
+        )
+
+        columns = [np.flatnonzero(blocks == k) for k in range(num_blocks)]
+        submodels = []
+        for k in range(num_blocks):
+            submodel = model.restrict(np.flatnonzero(local & (first == k)), columns[k])
+            submodel.upper_bounds = implied[columns[k]]
+            submodels.append(submodel)
+
+        workers = self.workers or min(num_blocks, os.cpu_count() or 1)
+        if (
+            workers > 1
+            and num_blocks > 1
+            and model.num_columns >= self.min_parallel_columns
+        ):
+            pool = self._get_pool(min(workers, num_blocks))
+
+            # Block k lives on worker k % workers for the whole solve
+            assigned = [
+                {k: submodels[k] for k in range(w, num_blocks, len(pool))}
+                for w in range(len(pool))
+            ]
+            for future in [
+                worker.submit(_load_blocks, blocks)
+                for worker, blocks in zip(pool, assigned)
+            ]:
+                future.result()
+
+            def solve_blocks(objectives, limit):
+                futures = [
+                    pool[k % len(pool)].submit(_solve_block, k, objective, limit)
+                    for k, objective in enumerate(objectives)
+                ]
+                return [future.result() for future in futures]
+
+        else:
+
+            def solve_blocks(objectives, limit):
+                return [
+                    self.subsolver.solve(replace(submodel, objective=objective), limit)
+                    for submodel, objective in zip(submodels, objectives)
+                ]
+
+        return self._dual_ascent(model, coupling, columns, deadline, solve_blocks)
+
+    def _dual_ascent(
+        self,
+        model: LinearProgram,
+        coupling: LinearProgram,
+        columns: List[np.ndarray],
+        deadline: Optional[float],
+        solve_blocks,
+    ) -> LPSolution:
+        """
+        Price update loop of solve; solve_blocks(objectives, time_limit)
+        returns the block solutions for one objective per block
+        """
+        n = model.num_columns
+        prices = np.zeros(coupling.num_rows)
+        best_bound, best_value = np.inf, -np.inf
+        support = np.zeros(n, dtype=bool)
+        average, average_activity = np.zeros(n), np.zeros(coupling.num_rows)
+        master, master_columns = None, -1
+        step, stalled = 1.0, 0
+        status = "Not Solved"
+        iterations = 0
+        slack = 1e-9 * np.maximum(1.0, np.abs(coupling.rhs))
+
+        def remaining() -> Optional[float]:
+            if deadline is None:
+                return None
+            return max(deadline - time.perf_counter(), 0.0)
+
+        def solve_master():
+            """Restricted master over the support; (columns, result) or None"""
+            used = np.flatnonzero(support)
+            result = self.subsolver.solve(
+                model.restrict(np.arange(model.num_rows), used), remaining()
+            )
+            return (used, result) if result.status == "Optimal" else None
+
+        while iterations < self.max_iterations:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            iterations += 1
+
+            # Upper bound: the blocks with the coupling rows priced out
+            reduced = model.objective - np.bincount(
+                coupling.column_indices,
+                weights=coupling.values * prices[coupling.row_indices],
+                minlength=n,
+            )
+            results = solve_blocks([reduced[block] for block in columns], remaining())
+            outcomes = {result.status for result in results}
+            if outcomes != {"Optimal"}:
+                if "Infeasible" in outcomes:
+                    status = "Infeasible"
+                elif "Unbounded" in outcomes:
+                    status = "Unbounded"
+                break
+
+            x = np.zeros(n)
+            for block, result in zip(columns, results):
+                x[block] = result.x
+            grew = bool(np.any(x[~support] > 0))
+            support |= x > 0
+            bound = float(reduced @ x + prices @ coupling.rhs)
+            if bound < best_bound - 1e-12 * max(1.0, abs(bound)):
+                best_bound, stalled = bound, 0
+            else:
+                stalled += 1
+
+            # Feasible allocation: the block solutions, or their average, if
+            # they also satisfy the coupling rows
+            activity = coupling.activity(x)
+            average += (x - average) / iterations
+            average_activity += (activity - average_activity) / iterations
+            for candidate, used in ((x, activity), (average, average_activity)):
+                if np.all(used <= coupling.rhs + slack):
+                    best_value = max(best_value, float(model.objective @ candidate))
+            if not grew and master_columns != support.sum():
+                master, master_columns = solve_master(), int(support.sum())
+                if master is not None:
+                    best_value = max(best_value, master[1].objective_value)
+            if best_bound - best_value <= self.tolerance * max(1.0, abs(best_bound)):
+                break
+
+            # Projected subgradient step on the coupling prices; stop once
+            # the step no longer moves the bound
+            subgradient = activity - coupling.rhs
+            subgradient[(prices <= 0) & (subgradient < 0)] = 0.0
+            norm = float(subgradient @ subgradient)
+            if norm == 0:
+                break
+            if stalled >= 5:
+                step, stalled = step / 2, 0
+                if step < self.tolerance:
+                    break
+            target = best_value if np.isfinite(best_value) else 0.0
+            prices = np.maximum(
+                prices + step * (bound - target) / norm * subgradient, 0.0
+            )
+
+        if iterations and master_columns != support.sum():
+            master = solve_master()
+        if master is None:
+            return LPSolution(
+                status, np.zeros(n), None, iterations=iterations, solver=self.name
+            )
+
+        used, result = master
+        x = np.zeros(n)
+        x[used] = result.x
+        duals = result.duals
+        gap = best_bound - result.objective_value
+        return LPSolution(
+            status=(
+                "Optimal"
+                if gap <= self.tolerance * max(1.0, abs(best_bound))
+                else TIME_LIMITED
+            ),
+            x=x,
+            objective_value=result.objective_value,
+            duals=duals,
+            reduced_costs=(
+                None
+                if duals is None
+                else model.objective
+                - np.bincount(
+                    model.column_indices,
+                    weights=model.values * duals[model.row_indices],
+                    minlength=n,
+                )
+            ),
+            slacks=model.rhs - model.activity(x),
+            iterations=iterations,
+            solver=self.name,
+        )
+
+
+@dataclass
+class _SimplexState:
+    """Mutable tableau state shared by the simplex phases"""
+
+    tableau: np.ndarray  # (m, total) B^-1 [A | I | artificials]
+    values: np.ndarray  # (m,) values of the basic columns
+    basis: np.ndarray  # (m,) basic column of every row
+    upper: np.ndarray  # (total,) column upper bounds
+    at_upper: np.ndarray  # (total,) nonbasic columns at their upper bound
+
+
+def _pivot(tableau: np.ndarray, reduced: np.ndarray, row: int, column: int):
+    """Pivot the tableau and the reduced costs on (row, column) in place"""
+    pivot_row = tableau[row] / tableau[row, column]
+    factors = tableau[:, column].copy()
+    factors[row] = 0.0
+    tableau -= np.outer(factors, pivot_row)
+    tableau[row] = pivot_row
+    reduced -= reduced[column] * pivot_row
+
+
+def fallback_allocation(model: LinearProgram) -> np.ndarray:
+    """
+    Cheap allocation for when no solver result is available in time
+
+    The greedy allocation over the capacity rows (see GreedyBackend), scaled
+    down uniformly until every row holds. This is feasible whenever all
+    right-hand sides are nonnegative; zero if the greedy allocation does not
+    apply.
+    """
+    x = GreedyBackend.allocate(model)
+    if x is None:
+        return np.zeros(model.num_columns)
+
+    activity = model.activity(x)
+    binding = (activity > model.rhs) & (activity > 0)
+    if np.any(binding):
+        scale = np.min(np.maximum(model.rhs[binding], 0.0) / activity[binding])
+        x = x * scale
+    return x
+
+
+# Block subsolver and subproblems of the DecompositionBackend held by a
+# worker process
+_worker_subsolver = None
+_worker_blocks = {}
+
+
+def _init_block_worker(subsolver: SolverBackend):
+    """Worker initializer storing the block subsolver"""
+    global _worker_subsolver
+    _worker_subsolver = subsolver
+
+
+def _load_blocks(blocks: Dict[int, LinearProgram]):
+    """Replace the block subproblems held by the worker (worker task)"""
+    global _worker_blocks
+    _worker_blocks = blocks
+
+
+def _solve_block(
+    k: int, objective: np.ndarray, time_limit: Optional[float]
+) -> LPSolution:
+    """Solve block k with the given objective (worker task)"""
+    return _worker_subsolver.solve(
+        replace(_worker_blocks[k], objective=objective), time_limit
+    )
+
+
+# Registered backends, selectable by name
+SOLVER_BACKENDS = {
+    CBCBackend.name: CBCBackend,
+    NumpySimplexBackend.name: NumpySimplexBackend,
+    GreedyBackend.name: GreedyBackend,
+    DecompositionBackend.name: DecompositionBackend,
+}
+
+
+def get_backend(backend: Union[str, SolverBackend]) -> SolverBackend:
+    """Resolve a backend name (see SOLVER_BACKENDS) or pass an instance through"""
+    if isinstance(backend, SolverBackend):
+        return backend
+    if backend not in SOLVER_BACKENDS:
+        raise ValueError(f"Unknown solver backend: {backend}")
+    return SOLVER_BACKENDS[backend]()
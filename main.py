@@ -8,7 +8,7 @@ using PuLP linear programming with fake data from an external analyzer.
 import numpy as np
 import logging
 from typing import Dict, List
-from arbitrage_optimizer import TriangularArbitrageOptimizer, PortfolioConstraints
+from arbitrage_optimizer import PersistentArbitrageOptimizer, PortfolioConstraints
 from arbitrage_detector import FakeArbitrageAnalyzer
 from market_simulator import CryptoMarketSimulator
 
@@ -48,8 +48,8 @@ class ArbitrageSystem:
             total_portfolio_value=portfolio_value, risk_profile=risk_profile
         )
 
-        # Initialize optimizer
-        self.optimizer = TriangularArbitrageOptimizer(self.base_constraints)
+        # Initialize optimizer (kept across cycles and updated in place)
+        self.optimizer = PersistentArbitrageOptimizer(self.base_constraints)
 
         logger.info(
             f"Initialized arbitrage system with ${portfolio_value:,.2f} portfolio"
@@ -97,7 +97,7 @@ class ArbitrageSystem:
         )
 
         # Step 3: Update optimizer with current constraints
-        self.optimizer = TriangularArbitrageOptimizer(current_constraints)
+        self.optimizer.update_constraints(current_constraints)
 
         # Step 4: Solve optimization problem
         logger.info("Solving optimization problem...")
@@ -0,0 +1,224 @@
+"""
+Tests for the arbitrage detectors
+"""
+
+import asyncio
+import itertools
+import random
+
+import numpy as np
+
+from arbitrage_detector import (
+    FakeArbitrageAnalyzer,
+    IncrementalTriangleEngine,
+    NegativeCycleDetector,
+    TriangleScanner,
+)
+from arbitrage_optimizer import (
+    OpportunityBatch,
+    calculate_triangular_arbitrage_profit,
+)
+
+
+def test_vectorized_generation_matches_scalar_semantics():
+    analyzer = FakeArbitrageAnalyzer(seed=7)
+
+    batch = analyzer.generate_opportunity_batch(2_000)
+    profits = batch.expected_profit
+    scores = batch.scores
+
+    assert len(profits) > 0
+    assert np.all(profits > 0)
+    assert np.all(np.diff(scores) <= 0)
+
+    opportunities = analyzer.generate_arbitrage_opportunities(200, vectorized=True)
+    for opp in opportunities:
+        assert (
+            len({opp.base_currency, opp.intermediate_currency, opp.quote_currency}) == 3
+        )
+        assert opp.base_currency in analyzer.stable_coins
+
+        pair1 = f"{opp.intermediate_currency}/{opp.base_currency}"
+        pair2 = f"{opp.quote_currency}/{opp.intermediate_currency}"
+        pair3 = f"{opp.quote_currency}/{opp.base_currency}"
+        expected = calculate_triangular_arbitrage_profit(
+            opp.exchange_rates[pair1],
+            opp.exchange_rates[pair2],
+            1.0 / opp.exchange_rates[pair3],
+            (
+                opp.transaction_fees[pair1],
+                opp.transaction_fees[pair2],
+                opp.transaction_fees[pair3],
+            ),
+        )
+        assert np.isclose(opp.expected_profit, expected)
+
+
+def test_triangle_scanner_matches_brute_force():
+    analyzer = FakeArbitrageAnalyzer(seed=3)
+    snapshot = analyzer.generate_market_snapshot(num_synthetic_currencies=5)
+    size = len(snapshot.currencies)
+
+    expected = set()
+    for a, b, c in itertools.permutations(range(size), 3):
+        if a < b and a < c:
+            growth = (
+                snapshot.rates[a, b]
+                * snapshot.rates[b, c]
+                * snapshot.rates[c, a]
+                * (1 - snapshot.fees[a, b])
+                * (1 - snapshot.fees[b, c])
+                * (1 - snapshot.fees[c, a])
+            )
+            if growth > 1:
+                expected.add((a, b, c))
+
+    result = TriangleScanner(snapshot, block_size=4).scan()
+    assert {tuple(t) for t in result["triangles"].tolist()} == expected
+    assert np.all(np.diff(result["expected_profit"]) <= 0)
+
+    for opp in TriangleScanner(snapshot).find_opportunities(max_results=5):
+        pairs = list(opp.exchange_rates)
+        profit = calculate_triangular_arbitrage_profit(
+            opp.exchange_rates[pairs[0]],
+            opp.exchange_rates[pairs[1]],
+            1.0 / opp.exchange_rates[pairs[2]],
+            tuple(opp.transaction_fees[pair] for pair in pairs),
+        )
+        assert np.isclose(opp.expected_profit, profit)
+
+
+def test_negative_cycle_detector_finds_longer_cycles():
+    analyzer = FakeArbitrageAnalyzer(seed=3)
+    snapshot = analyzer.generate_market_snapshot()
+    detector = NegativeCycleDetector(snapshot, max_length=5)
+
+    cycles = detector.find_cycles()
+    lengths = {len(cycle) for cycle, _ in cycles}
+    assert lengths == {3, 4, 5}
+    assert len({cycle for cycle, _ in cycles}) == len(cycles)
+
+    # Triangles are found exhaustively
+    triangles = {cycle for cycle, _ in cycles if len(cycle) == 3}
+    scanned = TriangleScanner(snapshot).scan()["triangles"].tolist()
+    assert triangles == {tuple(t) for t in scanned}
+
+    for cycle, profit in cycles:
+        growth = 1.0
+        for a, b in zip(cycle, cycle[1:] + cycle[:1]):
+            growth *= snapshot.rates[a, b] * (1 - snapshot.fees[a, b])
+        assert np.isclose(growth - 1.0, profit)
+
+    opportunities = detector.find_opportunities(max_cycles=10)
+    assert len(opportunities) == 10
+    for opp in opportunities:
+        assert len(opp.leg_pairs()) == len(opp.currency_path)
+        assert set(opp.leg_pairs()) == set(opp.exchange_rates)
+
+
+def test_negative_cycle_detector_against_brute_force():
+    snapshot = FakeArbitrageAnalyzer(seed=2).generate_market_snapshot(
+        num_synthetic_currencies=0
+    )
+    gains = snapshot.rates * (1 - snapshot.fees)
+    size = len(snapshot.currencies)
+
+    # Every simple cycle of 3..5 legs, rooted at its lowest currency
+    profitable = {}
+    for length in range(3, 6):
+        for root in range(size):
+            for rest in itertools.permutations(range(root + 1, size), length - 1):
+                cycle = (root,) + rest
+                growth = np.prod(
+                    [gains[a, b] for a, b in zip(cycle, cycle[1:] + cycle[:1])]
+                )
+                if growth > 1:
+                    profitable[cycle] = growth - 1
+
+    # Every profitable simple cycle is found, also across walk blocks
+    detector = NegativeCycleDetector(snapshot, max_length=5, block_size=7)
+    found = dict(detector.find_cycles())
+    assert set(found) == set(profitable)
+    assert all(np.isclose(profit, profitable[cycle]) for cycle, profit in found.items())
+
+    strict = dict(detector.find_cycles(min_profit=0.003))
+    assert set(strict) == {c for c, profit in profitable.items() if profit >= 0.003}
+
+
+def test_incremental_engine_tracks_full_rescan():
+    analyzer = FakeArbitrageAnalyzer(seed=5)
+    snapshot = analyzer.generate_market_snapshot(num_synthetic_currencies=10)
+    engine = IncrementalTriangleEngine(snapshot)
+
+    for from_currency, to_currency, rate in analyzer.generate_rate_ticks(
+        snapshot, 500, volatility=0.01
+    ):
+        affected = engine.triangles_for_pair(from_currency, to_currency)
+        assert len(affected) == len(snapshot.currencies) - 2
+        engine.update_rate(from_currency, to_currency, rate)
+
+    live = engine.profitable_triangles()
+    scanned = TriangleScanner(snapshot).scan()
+    assert live["triangles"].tolist() == scanned["triangles"].tolist()
+    assert np.allclose(live["expected_profit"], scanned["expected_profit"])
+
+
+def test_top_k_matches_head_of_full_sort():
+    analyzer = FakeArbitrageAnalyzer(seed=13)
+    state = (random.getstate(), np.random.get_state())
+
+    for vectorized in (False, True):
+        random.setstate(state[0])
+        np.random.set_state(state[1])
+        full = analyzer.generate_arbitrage_opportunities(3_000, vectorized=vectorized)
+
+        random.setstate(state[0])
+        np.random.set_state(state[1])
+        top = analyzer.generate_arbitrage_opportunities(
+            3_000, vectorized=vectorized, top_k=25
+        )
+
+        assert top == full[:25]
+
+
+def test_batch_market_update_returns_survivors_and_mask():
+    analyzer = FakeArbitrageAnalyzer(seed=17)
+    batch = analyzer.generate_opportunity_batch(5_000)
+
+    updated, survived = analyzer.simulate_batch_update(batch)
+
+    assert survived.shape == (len(batch),)
+    assert len(updated) == int(survived.sum())
+    assert np.all(updated.expected_profit > 0)
+    assert np.array_equal(updated.triangles, batch.triangles[survived])
+
+    # Rates moved by at most the combined market and leg shocks
+    ratio = updated.exchange_rates / batch.exchange_rates[survived]
+    assert np.all((ratio > 0.995 * 0.998) & (ratio < 1.005 * 1.002))
+
+    # The list API accepts batches too
+    assert isinstance(analyzer.simulate_market_update(batch), OpportunityBatch)
+
+
+def test_streaming_discovery_yields_filtered_chunks():
+    analyzer = FakeArbitrageAnalyzer(seed=19)
+
+    chunks = list(
+        analyzer.stream_opportunities(
+            2_000, chunk_size=300, min_score=0.01, as_batches=True
+        )
+    )
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert all(np.all(chunk.scores >= 0.01) for chunk in chunks)
+
+    async def consume():
+        found = []
+        async for opportunity in analyzer.astream_opportunities(
+            2_000, chunk_size=300, buffer_size=2
+        ):
+            found.append(opportunity)
+        return found
+
+    found = asyncio.run(consume())
+    assert len(found) > 0
+    assert all(opp.expected_profit > 0 for opp in found)
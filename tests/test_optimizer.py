@@ -0,0 +1,598 @@
+"""
+Tests for the optimizer module helpers
+"""
+
+from dataclasses import replace
+
+import numpy as np
+
+from arbitrage_detector import FakeArbitrageAnalyzer, NegativeCycleDetector
+from currency_registry import CurrencyRegistry
+from lp_model import LinearProgramBuilder
+from lp_solvers import CBCBackend, LPSolution, NumpySimplexBackend
+from market_simulator import CryptoMarketSimulator
+from arbitrage_optimizer import (
+    LIQUIDITY_POLICIES,
+    ArbitrageOpportunity,
+    CurrencyNetwork,
+    OpportunityBatch,
+    PersistentArbitrageOptimizer,
+    PortfolioConstraints,
+    TriangularArbitrageOptimizer,
+    aggregate_liquidity,
+    calculate_cycle_profits,
+    calculate_triangular_arbitrage_profit,
+    calculate_triangular_arbitrage_profit_batch,
+)
+
+
+def test_batch_profit_matches_scalar_profit():
+    rng = np.random.default_rng(0)
+    rate_ab = rng.uniform(0.5, 2.0, 100)
+    rate_bc = rng.uniform(0.5, 2.0, 100)
+    rate_ca = 1.0 / (rate_ab * rate_bc) * rng.uniform(0.98, 1.02, 100)
+    fees = rng.uniform(0.0005, 0.002, (100, 3))
+
+    expected = [
+        calculate_triangular_arbitrage_profit(ab, bc, ca, tuple(fee))
+        for ab, bc, ca, fee in zip(rate_ab, rate_bc, rate_ca, fees)
+    ]
+
+    for log_space in (False, True):
+        profits = calculate_triangular_arbitrage_profit_batch(
+            rate_ab, rate_bc, rate_ca, fees, log_space=log_space
+        )
+        assert profits.shape == (100,)
+        assert np.allclose(profits, expected)
+
+
+def test_log_space_cycle_profit_is_stable_on_long_chains():
+    # 100 huge legs followed by 100 tiny ones: the running product overflows
+    rates = np.repeat([[1e200, 1e-200]], 100, axis=1)
+    fees = np.zeros_like(rates)
+
+    assert np.allclose(calculate_cycle_profits(rates, fees, log_space=True), 0.0)
+
+
+def test_opportunity_batch_round_trip_and_views():
+    analyzer = FakeArbitrageAnalyzer(seed=11)
+    opportunities = analyzer.generate_arbitrage_opportunities(50)
+
+    batch = OpportunityBatch.from_opportunities(opportunities)
+    assert len(batch) == len(opportunities)
+    assert batch.to_list() == opportunities
+    assert batch[3] == opportunities[3]
+
+    head = batch[:10]
+    assert np.shares_memory(head.expected_profit, batch.expected_profit)
+
+    ranked = batch.filter(batch.expected_profit > 0.015).sort_by_score()
+    assert np.all(ranked.expected_profit > 0.015)
+    assert np.all(np.diff(ranked.scores) <= 0)
+
+    doubled = OpportunityBatch.concatenate([batch, batch])
+    assert len(doubled) == 2 * len(batch)
+
+
+def test_sparse_builder_matches_pulp_builder():
+    constraints = CryptoMarketSimulator(seed=11).generate_portfolio_constraints(
+        100_000, "moderate"
+    )
+    batch = FakeArbitrageAnalyzer(seed=11).generate_opportunity_batch(200)
+
+    sparse = TriangularArbitrageOptimizer(constraints).solve(batch, builder="sparse")
+    reference = TriangularArbitrageOptimizer(constraints).solve(
+        batch.to_list(), builder="pulp"
+    )
+
+    assert sparse["status"] == reference["status"] == "Optimal"
+    assert np.isclose(
+        sparse["objective_value"], reference["objective_value"], rtol=1e-6
+    )
+    assert sparse["build_time"] >= 0 and sparse["solve_time"] >= 0
+
+
+def test_persistent_optimizer_matches_rebuilt_model_across_cycles():
+    simulator = CryptoMarketSimulator(seed=3)
+    base_constraints = simulator.generate_portfolio_constraints()
+    analyzer = FakeArbitrageAnalyzer(seed=3)
+    optimizer = PersistentArbitrageOptimizer(base_constraints)
+
+    opportunities = analyzer.generate_arbitrage_opportunities(80)
+    problem = None
+    # Shrinking and growing cycles exercise both slot release and reuse
+    for keep, new in ((60, 20), (30, 10), (70, 30)):
+        simulator.update_market_conditions()
+        constraints = simulator.get_dynamic_constraints(base_constraints)
+        updated = analyzer.simulate_market_update(opportunities)
+        opportunities = updated[:keep] + analyzer.generate_arbitrage_opportunities(new)
+
+        optimizer.update_constraints(constraints)
+        persistent = optimizer.solve(opportunities)
+        rebuilt = TriangularArbitrageOptimizer(constraints).solve(
+            opportunities, builder="pulp"
+        )
+
+        assert persistent["status"] == "Optimal"
+        assert np.isclose(
+            persistent["objective_value"], rebuilt["objective_value"], rtol=1e-6
+        )
+        # Emptied rows are relaxed in place and no longer reported, as if
+        # the problem had been rebuilt
+        assert set(persistent["slacks"]) == set(rebuilt["slacks"])
+        assert problem is None or optimizer.problem is problem
+        problem = optimizer.problem
+        # Columns are recycled instead of accumulating
+        assert len(optimizer.slots) <= 100
+
+
+def test_aggregate_liquidity_policies():
+    groups = np.array([0, 1, 0, 2, 0])
+    liquidity = np.array([5.0, 2.0, 9.0, 4.0, 1.0])
+
+    assert aggregate_liquidity(groups, liquidity, 4, "max").tolist() == [9, 2, 4, 0]
+    assert aggregate_liquidity(groups, liquidity, 4, "min").tolist() == [1, 2, 4, 0]
+    assert aggregate_liquidity(groups, liquidity, 4, "latest").tolist() == [1, 2, 4, 0]
+    assert aggregate_liquidity(groups, liquidity, 4, "sum").tolist() == [15, 2, 4, 0]
+
+
+def test_liquidity_policy_is_consistent_across_builders():
+    constraints = CryptoMarketSimulator(seed=5).generate_portfolio_constraints()
+    opportunities = FakeArbitrageAnalyzer(seed=5).generate_arbitrage_opportunities(120)
+
+    for policy in LIQUIDITY_POLICIES:
+        objectives = [
+            TriangularArbitrageOptimizer(constraints, liquidity_policy=policy).solve(
+                opportunities, builder=builder
+            )["objective_value"]
+            for builder in ("sparse", "pulp")
+        ]
+        objectives.append(
+            PersistentArbitrageOptimizer(constraints, liquidity_policy=policy).solve(
+                opportunities
+            )["objective_value"]
+        )
+        assert np.allclose(objectives, objectives[0], rtol=1e-6)
+
+
+def test_currency_index_lists_every_leg():
+    constraints = CryptoMarketSimulator(seed=2).generate_portfolio_constraints()
+    opportunities = FakeArbitrageAnalyzer(seed=2).generate_arbitrage_opportunities(40)
+    index = TriangularArbitrageOptimizer(constraints).build_currency_index(
+        opportunities
+    )
+
+    assert sum(len(legs) for legs in index.values()) == 3 * len(opportunities)
+    for currency, legs in index.items():
+        for i, position in legs:
+            assert opportunities[i].currency_path[position] == currency
+
+
+def test_column_generation_matches_full_solve():
+    constraints = CryptoMarketSimulator(seed=0).generate_portfolio_constraints()
+    batch = FakeArbitrageAnalyzer(seed=0).generate_opportunity_batch(3000)
+    optimizer = TriangularArbitrageOptimizer(constraints)
+
+    full = optimizer.solve(batch, backend="simplex")
+    generated = optimizer.solve_column_generation(
+        batch, initial_columns=1, columns_per_round=1
+    )
+    assert generated["status"] == "Optimal"
+    assert generated["rounds"] > 1
+    assert generated["working_set_size"] < len(batch)
+    assert np.isclose(generated["objective_value"], full["objective_value"])
+    assert set(generated["investments"]) == set(full["investments"])
+
+    # Stopping while columns are still entering proves nothing
+    capped = optimizer.solve_column_generation(
+        batch, initial_columns=1, columns_per_round=1, max_rounds=1
+    )
+    assert capped["status"] == "Time Limited Feasible"
+    assert not capped["proven_optimal"]
+    assert "reduced_costs" not in capped
+    assert capped["objective_value"] < full["objective_value"]
+
+
+def test_pricing_matches_full_model_reduced_costs():
+    constraints = CryptoMarketSimulator(seed=1).generate_portfolio_constraints()
+    batch = FakeArbitrageAnalyzer(seed=1).generate_opportunity_batch(500)
+    optimizer = TriangularArbitrageOptimizer(constraints)
+    full_model = optimizer.build_sparse_model(batch)
+
+    # Duals of a working set, spread over the full model's rows by name
+    working = optimizer.build_sparse_model(batch[:50])
+    result = NumpySimplexBackend().solve(working)
+    duals = dict(zip(working.row_names, result.duals))
+    y = np.array([duals.get(name, 0.0) for name in full_model.row_names])
+    expected = full_model.objective - np.bincount(
+        full_model.column_indices,
+        weights=full_model.values * y[full_model.row_indices],
+        minlength=full_model.num_columns,
+    )
+
+    reduced = optimizer._reduced_costs(batch, batch.pair_ids(), working, result)
+    assert np.allclose(reduced, expected)
+
+
+def test_sensitivity_report_is_keyed_by_stable_names():
+    constraints = CryptoMarketSimulator(seed=1).generate_portfolio_constraints()
+    opportunities = FakeArbitrageAnalyzer(seed=1).generate_arbitrage_opportunities(60)
+
+    solutions = [
+        TriangularArbitrageOptimizer(constraints).solve(
+            opportunities, builder=builder, backend="simplex"
+        )
+        for builder in ("sparse", "pulp")
+    ]
+    solutions.append(PersistentArbitrageOptimizer(constraints).solve(opportunities))
+
+    reference = solutions[0]
+    assert "total_exposure" in reference["shadow_prices"]
+    assert all(
+        name.startswith(("liquidity_", "balance_", "min_holding_", "total_exposure"))
+        for name in reference["shadow_prices"]
+    )
+    for solution in solutions:
+        assert solution["shadow_prices"].keys() == reference["shadow_prices"].keys()
+        assert solution["binding_constraints"] == reference["binding_constraints"]
+        for name, price in reference["shadow_prices"].items():
+            assert np.isclose(solution["shadow_prices"][name], price, atol=1e-9)
+        assert np.allclose(
+            list(solution["reduced_costs"].values()),
+            list(reference["reduced_costs"].values()),
+            atol=1e-9,
+        )
+
+    # The shadow price of a binding row predicts the effect of a small change
+    # of its right-hand side
+    name = reference["binding_constraints"][0]
+    assert name == "total_exposure"
+    bumped = PortfolioConstraints(
+        initial_balances=constraints.initial_balances,
+        min_holdings=constraints.min_holdings,
+        max_position_size=constraints.max_position_size,
+        risk_tolerance=constraints.risk_tolerance * 1.001,
+    )
+    delta = sum(constraints.initial_balances.values()) * (
+        bumped.risk_tolerance - constraints.risk_tolerance
+    )
+    resolved = TriangularArbitrageOptimizer(bumped).solve(
+        opportunities, backend="simplex"
+    )
+    assert np.isclose(
+        resolved["objective_value"] - reference["objective_value"],
+        reference["shadow_prices"][name] * delta,
+        rtol=1e-6,
+    )
+
+
+def test_risk_frontier_matches_individual_solves():
+    constraints = CryptoMarketSimulator(seed=1).generate_portfolio_constraints()
+    batch = FakeArbitrageAnalyzer(seed=1).generate_opportunity_batch(500)
+    optimizer = TriangularArbitrageOptimizer(constraints)
+    frontier = optimizer.risk_frontier(batch)
+    model = optimizer.build_sparse_model(batch)
+
+    assert frontier["solves"] <= 2 * len(frontier["risk_tolerance"])
+    assert np.all(np.diff(frontier["marginal_profit"]) < 0)  # Concave
+    for risk in np.linspace(0.0, 1.0, 11):
+        solution = TriangularArbitrageOptimizer(
+            PortfolioConstraints(
+                initial_balances=constraints.initial_balances,
+                min_holdings=constraints.min_holdings,
+                max_position_size=constraints.max_position_size,
+                risk_tolerance=risk,
+            )
+        ).solve(batch, backend="simplex")
+        assert np.isclose(
+            np.interp(risk, frontier["risk_tolerance"], frontier["objective_value"]),
+            solution["objective_value"],
+            atol=1e-6,
+        )
+
+        # Interpolated allocations are optimal too
+        x = np.array(
+            [
+                np.interp(risk, frontier["risk_tolerance"], column)
+                for column in frontier["allocations"].T
+            ]
+        )
+        rhs = model.rhs.copy()
+        rhs[model.row_names.index("total_exposure")] = risk * sum(
+            constraints.initial_balances.values()
+        )
+        assert np.all(model.activity(x) <= rhs + 1e-6)
+        assert np.isclose(model.objective @ x, solution["objective_value"], atol=1e-6)
+
+
+def test_stochastic_cvar_matches_scenario_formulation():
+    constraints = CryptoMarketSimulator(seed=1).generate_portfolio_constraints()
+    analyzer = FakeArbitrageAnalyzer(seed=1)
+    batch = analyzer.generate_opportunity_batch(100)
+    scenarios = analyzer.generate_profit_scenarios(batch, 200)
+    optimizer = TriangularArbitrageOptimizer(constraints)
+    model = optimizer.build_sparse_model(batch)
+    num_scenarios = len(scenarios)
+
+    expected = optimizer.solve_stochastic(batch, scenarios, backend="simplex")
+    deterministic = NumpySimplexBackend().solve(
+        replace(model, objective=scenarios.mean(axis=0))
+    )
+    assert np.isclose(expected["objective_value"], deterministic.objective_value)
+
+    # Explicit formulation: columns x, eta + L and one shortfall per scenario,
+    # with shortfall_s >= eta - scenarios[s] @ x
+    alpha, weight = 0.1, 0.5
+    loss_bound = -scenarios.min() * model.rhs[model.row_names.index("total_exposure")]
+    builder = LinearProgramBuilder(
+        np.concatenate(
+            [
+                (1 - weight) * scenarios.mean(axis=0),
+                [weight],
+                np.full(num_scenarios, -weight / (alpha * num_scenarios)),
+            ]
+        ),
+        upper_bounds=np.concatenate(
+            [model.upper_bounds, np.full(1 + num_scenarios, np.inf)]
+        ),
+    )
+    builder.add_rows(
+        model.row_indices,
+        model.column_indices,
+        model.values,
+        model.rhs,
+        model.row_names,
+    )
+    coefficients = np.column_stack(
+        [-scenarios, np.ones(num_scenarios), -np.eye(num_scenarios)]
+    )
+    rows, columns = np.nonzero(coefficients)
+    builder.add_rows(
+        rows,
+        columns,
+        coefficients[rows, columns],
+        np.full(num_scenarios, loss_bound),
+        [f"shortfall_{s}" for s in range(num_scenarios)],
+    )
+    explicit = CBCBackend(msg=False).solve(builder.build())
+
+    solution = optimizer.solve_stochastic(
+        batch,
+        scenarios,
+        risk_measure="cvar",
+        alpha=alpha,
+        risk_weight=weight,
+        backend=CBCBackend(msg=False),
+    )
+    assert solution["status"] == "Optimal"
+    assert np.isclose(
+        solution["objective_value"],
+        explicit.objective_value - weight * loss_bound,
+        rtol=1e-6,
+    )
+    assert solution["cvar"] >= expected["cvar"] - 1e-9
+
+    report = optimizer.scenario_budget(
+        batch,
+        analyzer.generate_profit_scenarios,
+        scenario_counts=(50, 200),
+        risk_measure="cvar",
+        backend=CBCBackend(msg=False),
+    )
+    assert [row["num_scenarios"] for row in report] == [50, 200]
+    assert all(row["active_scenarios"] < row["num_scenarios"] for row in report)
+
+
+def test_slippage_refinement_matches_fine_grid():
+    constraints = CryptoMarketSimulator(seed=1).generate_portfolio_constraints()
+    batch = FakeArbitrageAnalyzer(seed=1).generate_opportunity_batch(100)
+    optimizer = TriangularArbitrageOptimizer(constraints)
+
+    linear = optimizer.solve(batch, backend="simplex")
+    linear_x = optimizer.result.x
+    fine = optimizer.solve_with_slippage(
+        batch, initial_segments=200, max_refinements=0, tolerance=1.0
+    )
+    adaptive = optimizer.solve_with_slippage(batch)
+
+    assert adaptive["status"] == "Optimal"
+    assert adaptive["converged"]
+    assert adaptive["segments"] < fine["segments"] / 10
+    assert np.isclose(adaptive["objective_value"], fine["objective_value"], rtol=1e-4)
+    assert np.isclose(
+        adaptive["expected_profit"], adaptive["objective_value"], rtol=1e-6
+    )
+    assert np.isclose(
+        sum(inv["slippage"] for inv in adaptive["investments"].values()),
+        adaptive["slippage_cost"],
+        rtol=1e-3,
+    )
+
+    # Ignoring slippage concentrates capital and realizes less
+    model = optimizer.build_sparse_model(batch)
+    pairs, rows = np.unique(batch.pair_ids().ravel(), return_inverse=True)
+    depth = aggregate_liquidity(rows, batch.liquidity.ravel(), len(pairs))
+    flow = np.bincount(rows, weights=np.repeat(linear_x, 3), minlength=len(pairs))
+    realized = model.objective @ linear_x - np.sum(flow**2 / (2 * depth))
+    assert linear["objective_value"] > adaptive["objective_value"] > realized
+
+
+def test_slippage_keeps_last_solved_refinement():
+    constraints = CryptoMarketSimulator(seed=1).generate_portfolio_constraints()
+    batch = FakeArbitrageAnalyzer(seed=1).generate_opportunity_batch(100)
+    optimizer = TriangularArbitrageOptimizer(constraints)
+    coarse = optimizer.solve_with_slippage(batch, max_refinements=0)
+
+    class FailingRefinements(NumpySimplexBackend):
+        """Solves the first model only, as if refinements ran out of time"""
+
+        calls = 0
+
+        def solve(self, model, time_limit=None):
+            self.calls += 1
+            if self.calls > 1:
+                return LPSolution("Not Solved", np.zeros(model.num_columns), None)
+            return super().solve(model, time_limit)
+
+    kept = optimizer.solve_with_slippage(batch, backend=FailingRefinements())
+    assert coarse["status"] == kept["status"] == "Optimal"
+    assert not coarse["converged"] and not kept["converged"]
+    assert kept["refinements"] == coarse["refinements"] == 0
+    assert kept["segments"] == coarse["segments"]
+    assert np.isclose(kept["objective_value"], coarse["objective_value"])
+    assert kept["investments"].keys() == coarse["investments"].keys()
+
+
+def test_slippage_tolerates_flows_past_the_last_breakpoint():
+    # CBC round-off leaves a pair's flow just above the exposure breakpoint
+    constraints = CryptoMarketSimulator(seed=12).generate_portfolio_constraints()
+    opportunities = FakeArbitrageAnalyzer(seed=12).generate_arbitrage_opportunities(80)
+    optimizer = TriangularArbitrageOptimizer(constraints)
+
+    solution = optimizer.solve_with_slippage(
+        opportunities, backend=CBCBackend(msg=False)
+    )
+    assert solution["status"] == "Optimal"
+    assert solution["converged"]
+    assert solution["slippage_cost"] > 0
+
+
+def test_network_model_shares_legs_and_conserves_flow():
+    analyzer = FakeArbitrageAnalyzer(seed=3)
+    snapshot = analyzer.generate_market_snapshot(num_synthetic_currencies=5)
+    opportunities = NegativeCycleDetector(snapshot, max_length=4).find_opportunities()
+    constraints = CryptoMarketSimulator(seed=1).generate_portfolio_constraints()
+    optimizer = TriangularArbitrageOptimizer(constraints, registry=analyzer.registry)
+
+    solution = optimizer.solve_network(opportunities, backend="simplex")
+    network = optimizer.network
+    legs = {
+        (opp.currency_path[k], opp.currency_path[(k + 1) % len(opp.currency_path)])
+        for opp in opportunities
+        for k in range(len(opp.currency_path))
+    }
+    assert len(network) == len(legs)
+    assert len(network) < sum(len(opp.currency_path) for opp in opportunities)
+
+    # Net changes follow from the flows leg by leg; no holding is sold down
+    assert solution["status"] == "Optimal" and solution["flows"]
+    flows = optimizer.result.x
+    changes = {}
+    for name, flow, gain in zip(network.arc_names(), flows, network.gains):
+        tail, head = name.split("_")
+        changes[tail] = changes.get(tail, 0.0) - flow
+        changes[head] = changes.get(head, 0.0) + gain * flow
+    for currency, change in solution["net_changes"].items():
+        assert np.isclose(change, changes[currency], atol=1e-9)
+        assert change >= -1e-9 * max(1.0, flows.max())
+    values = network.values[analyzer.registry.register_many(list(changes))]
+    assert np.isclose(
+        solution["objective_value"], values @ np.array(list(changes.values()))
+    )
+
+    cbc = optimizer.solve_network(opportunities, backend=CBCBackend(msg=False))
+    assert np.isclose(cbc["objective_value"], solution["objective_value"])
+
+
+def test_network_from_batch_matches_list():
+    analyzer = FakeArbitrageAnalyzer(seed=1)
+    batch = analyzer.generate_opportunity_batch(50)
+    from_batch = CurrencyNetwork.from_opportunities(batch)
+    from_list = CurrencyNetwork.from_opportunities(batch.to_list(), batch.registry)
+
+    for field in ("tails", "heads", "gains", "fees", "liquidity", "values"):
+        assert np.allclose(getattr(from_batch, field), getattr(from_list, field))
+    assert from_batch.numeraire == from_list.numeraire
+
+
+def test_milp_heuristic_and_branch_and_bound_match_explicit_model():
+    analyzer = FakeArbitrageAnalyzer(seed=5)
+    batch = analyzer.generate_opportunity_batch(300)
+    constraints = CryptoMarketSimulator(seed=5).generate_portfolio_constraints()
+    constraints.max_position_size = {c: 300.0 for c in constraints.max_position_size}
+    optimizer = TriangularArbitrageOptimizer(constraints, registry=analyzer.registry)
+    cbc = CBCBackend(msg=False)
+
+    heuristic = optimizer.solve_milp(batch, 100.0, 0.2, mip_backend=None)
+    solution = optimizer.solve_milp(batch, 100.0, 0.2, mip_backend=cbc)
+
+    # Explicit big-M model over all opportunities, without reduced-cost fixing
+    lp = optimizer.build_sparse_model(batch)
+    n = lp.num_columns
+    builder = LinearProgramBuilder(
+        np.concatenate([lp.objective, np.full(n, -0.6)]),
+        upper_bounds=np.concatenate([lp.upper_bounds, np.ones(n)]),
+        integer_columns=np.arange(2 * n) >= n,
+    )
+    builder.add_rows(lp.row_indices, lp.column_indices, lp.values, lp.rhs, lp.row_names)
+    index = np.arange(n)
+    for name, coefficients in (("on", [1.0, -300.0]), ("min", [-1.0, 100.0])):
+        builder.add_rows(
+            np.repeat(index, 2),
+            np.column_stack([index, n + index]).ravel(),
+            np.tile(coefficients, n),
+            np.zeros(n),
+            [f"{name}_{i}" for i in index],
+        )
+    reference = cbc.solve(builder.build())
+
+    assert solution["status"] == reference.status == "Optimal"
+    assert np.isclose(solution["objective_value"], reference.objective_value)
+    assert heuristic["status"] in ("Optimal", "Time Limited Feasible")
+    assert heuristic["objective_value"] <= solution["objective_value"] + 1e-6
+    assert heuristic["objective_value"] >= 0.95 * solution["objective_value"]
+    assert solution["objective_value"] <= heuristic["bound"] + 1e-6
+
+    for result in (heuristic, solution):
+        amounts = [inv["amount"] for inv in result["investments"].values()]
+        assert result["trades"] == len(amounts) > 0
+        assert min(amounts) >= 100.0 - 1e-6 and max(amounts) <= 300.0 + 1e-6
+        assert np.isclose(result["fixed_fees"], 0.6 * len(amounts))
+        assert np.isclose(result["expected_profit"], result["objective_value"])
+
+    # Without minimum orders and fees the MILP is the plain LP
+    plain = optimizer.solve(batch, backend=cbc)
+    free = optimizer.solve_milp(batch, mip_backend=cbc)
+    assert np.isclose(free["objective_value"], plain["objective_value"])
+
+
+def test_network_exposure_counts_each_entered_position_once():
+    # USDT -> BTC -> ETH -> USDT returns 1.004 per USDT before fees
+    pairs = ("BTC/USDT", "ETH/BTC", "ETH/USDT")
+    opportunity = ArbitrageOpportunity(
+        base_currency="USDT",
+        intermediate_currency="BTC",
+        quote_currency="ETH",
+        exchange_rates=dict(zip(pairs, (1 / 50000, 50000 / 3000, 1 / 3012))),
+        liquidity={pair: 1e9 for pair in pairs},
+        transaction_fees={pair: 0.001 for pair in pairs},
+        expected_profit=0.001,
+        confidence_score=1.0,
+    )
+    constraints = PortfolioConstraints(
+        initial_balances={"USDT": 6000.0, "BTC": 2000.0, "ETH": 2000.0},
+        min_holdings={},
+        max_position_size={"USDT": 1e6, "BTC": 1e6, "ETH": 1e6},
+        risk_tolerance=0.2,
+    )
+    registry = CurrencyRegistry()
+    optimizer = TriangularArbitrageOptimizer(constraints, registry=registry)
+    solution = optimizer.solve_network([opportunity], backend="simplex")
+    network = optimizer.network
+
+    # The cycle's 0.4% premium is spread evenly over its three legs
+    premium = 1.004 ** (1 / 3)
+    values = network.values[registry.register_many(["USDT", "BTC", "ETH"])]
+    assert np.allclose(values, [1.0, 50000 * premium, 3000 * premium**2])
+    names = network.arc_names()
+    assert [names[a] for a in np.flatnonzero(network.entries)] == ["USDT_BTC"]
+
+    # Only the entered 2000 USDT (20% of 10000) count against the exposure,
+    # not the value of every leg, so the whole cycle is traded once
+    gain = 1.004 * 0.999**3
+    assert solution["status"] == "Optimal"
+    assert np.isclose(solution["flows"]["USDT_BTC"], 2000.0)
+    legs = [2000.0 * (premium * 0.999) ** k for k in range(3)]
+    assert np.isclose(solution["total_traded"], sum(legs))
+    assert np.isclose(solution["net_changes"]["USDT"], 2000.0 * (gain - 1))
+    assert np.isclose(solution["objective_value"], 2000.0 * (gain - 1))
@@ -0,0 +1,47 @@
+"""
+Tests for the currency and pair registry
+"""
+
+import numpy as np
+import pytest
+
+from currency_registry import CurrencyRegistry
+
+
+def test_pair_ids_are_dense_and_paired_with_their_inverse():
+    registry = CurrencyRegistry(["USDT", "BTC", "ETH"])
+    usdt, btc, eth = (registry.currency_id(c) for c in ("USDT", "BTC", "ETH"))
+
+    btc_usdt = registry.pair_id(btc, usdt)
+    assert registry.pair_key(btc_usdt) == "BTC/USDT"
+    assert registry.pair_key(registry.inverse(btc_usdt)) == "USDT/BTC"
+    assert registry.canonical(registry.inverse(btc_usdt)) == btc_usdt
+    assert registry.pair_id_for_key("USDT/BTC") == registry.inverse(btc_usdt)
+
+    triangles = np.array([[usdt, btc, eth], [usdt, eth, btc]])
+    ids = registry.triangle_pair_ids(triangles)
+    assert [registry.pair_key(p) for p in ids[0]] == ["BTC/USDT", "ETH/BTC", "ETH/USDT"]
+    assert registry.triangle_pairs("USDT", "BTC", "ETH") == (
+        "BTC/USDT",
+        "ETH/BTC",
+        "ETH/USDT",
+    )
+    assert sorted(set(ids.ravel().tolist()) | {p ^ 1 for p in ids.ravel()}) == list(
+        range(registry.num_pairs)
+    )
+
+    # The pair matrix grows with the currency universe
+    for k in range(40):
+        registry.register(f"SYN{k}")
+    assert registry.pair_key(registry.pair_id(42, 0)) == "SYN39/USDT"
+
+
+def test_pair_of_a_currency_with_itself_is_rejected():
+    registry = CurrencyRegistry(["USDT", "BTC"])
+    with pytest.raises(ValueError):
+        registry.pair_id(1, 1)
+    with pytest.raises(ValueError):
+        registry.pair_id_for_key("BTC/BTC")
+    with pytest.raises(ValueError):
+        registry.pair_ids(np.array([0, 1]), np.array([1, 1]))
+    assert registry.num_pairs == 0
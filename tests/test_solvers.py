@@ -0,0 +1,183 @@
+"""
+Tests for the LP solver backends
+"""
+
+import numpy as np
+
+from arbitrage_detector import FakeArbitrageAnalyzer
+from arbitrage_optimizer import (
+    PersistentArbitrageOptimizer,
+    TriangularArbitrageOptimizer,
+)
+from lp_model import LinearProgramBuilder
+from lp_solvers import (
+    FALLBACK,
+    TIME_LIMITED,
+    CBCBackend,
+    DecompositionBackend,
+    GreedyBackend,
+    NumpySimplexBackend,
+)
+from market_simulator import CryptoMarketSimulator
+
+
+def random_program(rng, m, n):
+    """Random bounded LP; some rows have a negative rhs (needs phase 1)"""
+    matrix = rng.normal(size=(m, n)) * (rng.random((m, n)) < 0.5)
+    rows, columns = np.nonzero(matrix)
+    builder = LinearProgramBuilder(
+        rng.normal(size=n), upper_bounds=rng.uniform(0.5, 5.0, n)
+    )
+    builder.add_rows(
+        rows,
+        columns,
+        matrix[rows, columns],
+        rng.normal(size=m) * 5 + 2,
+        [f"row_{i}" for i in range(m)],
+    )
+    return builder.build()
+
+
+def test_simplex_matches_cbc_on_random_programs():
+    rng = np.random.default_rng(0)
+    simplex, cbc = NumpySimplexBackend(), CBCBackend(msg=False)
+
+    for _ in range(30):
+        model = random_program(rng, rng.integers(1, 20), rng.integers(1, 30))
+        ours, reference = simplex.solve(model), cbc.solve(model)
+
+        assert ours.status == reference.status
+        if ours.status == "Optimal":
+            assert np.isclose(ours.objective_value, reference.objective_value)
+            assert np.all(model.to_dense() @ ours.x <= model.rhs + 1e-7)
+            assert np.all((ours.x >= -1e-9) & (ours.x <= model.upper_bounds + 1e-9))
+            assert np.allclose(ours.duals, reference.duals, atol=1e-6)
+
+
+def test_optimizer_backends_agree():
+    constraints = CryptoMarketSimulator(seed=1).generate_portfolio_constraints()
+    opportunities = FakeArbitrageAnalyzer(seed=1).generate_arbitrage_opportunities(60)
+
+    solutions = [
+        TriangularArbitrageOptimizer(constraints).solve(
+            opportunities, builder=builder, backend=backend
+        )
+        for builder in ("sparse", "pulp")
+        for backend in ("cbc", "simplex", "greedy", "decomposition")
+    ]
+
+    for solution in solutions:
+        assert solution["status"] == "Optimal"
+        assert np.isclose(
+            solution["objective_value"], solutions[0]["objective_value"], rtol=1e-6
+        )
+
+
+def test_greedy_fast_path_is_cross_checked_against_cbc():
+    used = set()
+    for seed in range(6):
+        constraints = CryptoMarketSimulator(seed=seed).generate_portfolio_constraints()
+        batch = FakeArbitrageAnalyzer(seed=seed).generate_opportunity_batch(150)
+        model = TriangularArbitrageOptimizer(constraints).build_sparse_model(batch)
+
+        # Raises if the greedy allocation is not optimal
+        solution = GreedyBackend(
+            fallback=CBCBackend(msg=False), cross_check=True
+        ).solve(model)
+        used.add(solution.solver)
+
+    assert "greedy" in used
+
+
+def test_time_budget_returns_incumbent_or_fallback():
+    constraints = CryptoMarketSimulator(seed=1).generate_portfolio_constraints()
+    opportunities = FakeArbitrageAnalyzer(seed=1).generate_opportunity_batch(60)
+    optimizer = TriangularArbitrageOptimizer(constraints)
+    model = optimizer.build_sparse_model(opportunities)
+
+    # An exhausted deadline stops the simplex before it proves optimality
+    result = NumpySimplexBackend().solve(model, time_limit=0.0)
+    assert result.status in (TIME_LIMITED, "Not Solved")
+
+    solutions = [
+        optimizer.solve(opportunities, backend="simplex", time_budget=0.0),
+        PersistentArbitrageOptimizer(constraints).solve(opportunities, time_budget=0.0),
+    ]
+    for solution in solutions:
+        assert solution["status"] == FALLBACK
+        assert not solution["proven_optimal"]
+
+        x = np.zeros(model.num_columns)
+        for key, investment in solution["investments"].items():
+            x[int(key.split("_")[1])] = investment["amount"]
+        assert np.all(model.to_dense() @ x <= model.rhs + 1e-6)
+
+    solution = optimizer.solve(opportunities, backend="simplex", time_budget=10.0)
+    assert solution["status"] == "Optimal"
+    assert solution["proven_optimal"]
+
+
+def test_decomposition_by_base_currency_matches_cbc():
+    for seed in (0, 1, 3):
+        constraints = CryptoMarketSimulator(seed=seed).generate_portfolio_constraints()
+        batch = FakeArbitrageAnalyzer(seed=seed).generate_opportunity_batch(500)
+        model = TriangularArbitrageOptimizer(constraints).build_sparse_model(batch)
+        reference = CBCBackend(msg=False).solve(model)
+
+        # Two workers and no size threshold force the worker processes even
+        # on a single core; they are started once and reused
+        pools = []
+        with DecompositionBackend(workers=2, min_parallel_columns=0) as backend:
+            for _ in range(2):
+                solution = backend.solve(model, blocks=batch.triangles[:, 0])
+                assert solution.status == reference.status == "Optimal"
+                assert np.isclose(
+                    solution.objective_value, reference.objective_value, rtol=1e-6
+                )
+                assert np.all(model.activity(solution.x) <= model.rhs + 1e-6)
+                pools.append(list(backend._pool))
+        assert len(pools[0]) == 2 and pools[0] == pools[1]
+        assert backend._pool == []
+
+
+def test_decomposition_solves_small_models_in_process():
+    constraints = CryptoMarketSimulator(seed=0).generate_portfolio_constraints()
+    batch = FakeArbitrageAnalyzer(seed=0).generate_opportunity_batch(200)
+    model = TriangularArbitrageOptimizer(constraints).build_sparse_model(batch)
+
+    backend = DecompositionBackend(workers=2)
+    solution = backend.solve(model, blocks=batch.triangles[:, 0])
+    assert solution.status == "Optimal"
+    assert backend._pool == []
+
+
+def test_decomposition_solves_the_master_once_blocks_settle():
+    constraints = CryptoMarketSimulator(seed=0).generate_portfolio_constraints()
+    batch = FakeArbitrageAnalyzer(seed=0).generate_opportunity_batch(6000)
+    model = TriangularArbitrageOptimizer(constraints).build_sparse_model(batch)
+
+    class CountingSimplex(NumpySimplexBackend):
+        """Records the shape of every model it solves"""
+
+        def __init__(self):
+            super().__init__()
+            self.shapes = []
+
+        def solve(self, model, time_limit=None):
+            self.shapes.append((model.num_rows, model.num_columns))
+            return super().solve(model, time_limit)
+
+    subsolver = CountingSimplex()
+    solution = DecompositionBackend(subsolver, workers=1).solve(
+        model, blocks=batch.triangles[:, 0]
+    )
+    reference = NumpySimplexBackend().solve(model)
+    assert solution.status == "Optimal"
+    assert np.isclose(solution.objective_value, reference.objective_value, rtol=1e-6)
+
+    # Everything but the restricted master parallelizes over the three
+    # blocks; the master is solved at most twice and over few columns
+    masters = [cols for rows, cols in subsolver.shapes if rows == model.num_rows]
+    assert len(subsolver.shapes) - len(masters) == 3 * solution.iterations
+    assert 1 <= len(masters) <= 2
+    assert max(masters) < model.num_columns / 100